@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 from pathlib import Path
 import os
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -76,11 +77,23 @@ WSGI_APPLICATION = 'automation_db.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # django.db.backends.sqlite3 with WAL and immediate transactions (see SQLITE below)
+        'ENGINE': 'automation_db.sqlite_backend',
+        'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        'OPTIONS': {
+            # Seconds a connection waits for another one's write lock
+            'timeout': float(os.environ.get('SQLITE_BUSY_TIMEOUT', '30')),
+        },
     }
 }
 
+# Several gunicorn and uvicorn workers share the database file
+SQLITE = {
+    'JOURNAL_MODE': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'SYNCHRONOUS': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'IMMEDIATE_TRANSACTIONS': os.environ.get('SQLITE_IMMEDIATE_TRANSACTIONS', 'true').lower() == 'true',
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -128,6 +141,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 # REST Framework settings
 REST_FRAMEWORK = {
@@ -144,3 +158,55 @@ MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
 
 # Whitenoise settings
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+# Search analytics (in-process counters flushed in aggregate to search_query_stats)
+SEARCH_ANALYTICS = {
+    'ENABLED': True,
+    'SAMPLE_RATE': float(os.environ.get('SEARCH_ANALYTICS_SAMPLE_RATE', '1.0')),
+    'FLUSH_INTERVAL': int(os.environ.get('SEARCH_ANALYTICS_FLUSH_INTERVAL', '60')),
+    'MAX_QUERIES': 1000,
+}
+
+# On-disk cache for the "similar automations" TF-IDF index, shared by all workers
+SIMILARITY_INDEX_PATH = os.path.join(BASE_DIR, 'cache', 'similarity_index.pickle')
+SIMILARITY_INDEX = {
+    'REFRESH_INTERVAL': int(os.environ.get('SIMILARITY_REFRESH_INTERVAL', '5')),
+    'SAVE_INTERVAL': 300,
+}
+
+# Background CSV import jobs. Set IMPORT_JOBS_IN_PROCESS=false to leave jobs
+# to `python manage.py run_import_jobs` instead of the web workers' thread pool.
+# PARSE_WORKERS processes parse and validate rows for each running job
+# (0, the default, or 1 parses in the job's own thread; set
+# IMPORT_PARSE_WORKERS to opt in to a process pool). A running job without
+# progress for STALE_AFTER seconds is assumed dead and requeued.
+IMPORT_JOBS = {
+    'DIR': os.path.join(BASE_DIR, 'import_jobs'),
+    'RUN_IN_PROCESS': os.environ.get('IMPORT_JOBS_IN_PROCESS', 'true').lower() == 'true',
+    'WORKERS': int(os.environ.get('IMPORT_JOBS_WORKERS', '2')),
+    'PARSE_WORKERS': int(os.environ.get('IMPORT_PARSE_WORKERS', '0')),
+    'STALE_AFTER': int(os.environ.get('IMPORT_JOBS_STALE_AFTER', '600')),
+}
+
+# Limits for gzip/zstd-encoded request bodies (bulk create and CSV imports),
+# against decompression bombs. MAX_SIZE is in decompressed bytes
+REQUEST_DECOMPRESSION = {
+    'MAX_SIZE': int(os.environ.get('REQUEST_DECOMPRESSION_MAX_SIZE', 1024 * 1024 * 1024)),
+    'MAX_RATIO': int(os.environ.get('REQUEST_DECOMPRESSION_MAX_RATIO', '200')),
+}
+
+# Coalesce single-row writes and audit rows of each worker process into
+# shared transactions run by one writer thread (see automations/write_queue.py)
+WRITE_QUEUE = {
+    'ENABLED': os.environ.get('WRITE_QUEUE_ENABLED', 'false').lower() == 'true',
+    'MAX_BATCH': int(os.environ.get('WRITE_QUEUE_MAX_BATCH', '200')),
+    'MAX_DELAY': float(os.environ.get('WRITE_QUEUE_MAX_DELAY', '0.002')),
+}
+
+# Stored responses for requests sent with an Idempotency-Key header (see
+# automations/idempotency.py); run `manage.py cleanup_idempotency_keys` to
+# delete expired ones
+IDEMPOTENCY = {
+    'TTL': int(os.environ.get('IDEMPOTENCY_TTL', 24 * 60 * 60)),
+    'IN_FLIGHT_TIMEOUT': int(os.environ.get('IDEMPOTENCY_IN_FLIGHT_TIMEOUT', 15 * 60)),
+}
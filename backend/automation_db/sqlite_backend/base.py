@@ -0,0 +1,46 @@
+"""
+SQLite backend tuned for several worker processes sharing one database file.
+
+- WAL journal: readers no longer block the writer, nor the writer readers.
+- synchronous=NORMAL: in WAL mode a commit doesn't wait for an fsync; the
+  database stays consistent, and only the last commits before a power loss
+  can be lost.
+- Transactions start with BEGIN IMMEDIATE, taking the write lock up front.
+  A deferred transaction that reads and then writes can't wait for the lock:
+  it fails at once with "database is locked" when another connection has
+  written in between. An immediate one waits up to the busy timeout
+  (OPTIONS 'timeout', in seconds) instead.
+
+Configured through the SQLITE setting.
+"""
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+DEFAULT_SETTINGS = {
+    'JOURNAL_MODE': 'WAL',
+    'SYNCHRONOUS': 'NORMAL',
+    'IMMEDIATE_TRANSACTIONS': True,
+}
+
+
+def get_config():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'SQLITE', {})}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        config = get_config()
+        if not self.is_in_memory_db():
+            if config['JOURNAL_MODE']:
+                conn.execute(f"PRAGMA journal_mode = {config['JOURNAL_MODE']}")
+            if config['SYNCHRONOUS']:
+                conn.execute(f"PRAGMA synchronous = {config['SYNCHRONOUS']}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if get_config()['IMMEDIATE_TRANSACTIONS']:
+            self.cursor().execute("BEGIN IMMEDIATE")
+        else:
+            super()._start_transaction_under_autocommit()
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Automation, Tool, Person, AutomationPersonRole, Environment, TestData, Metrics, Artifacts, AuditLog
+from .models import Automation, Tool, Person, AutomationPersonRole, Environment, TestData, Metrics, Artifacts, AuditLog, SearchQueryStat, ImportJob
 
 
 @admin.register(AuditLog)
@@ -21,6 +21,34 @@ class AuditLogAdmin(admin.ModelAdmin):
         return request.user.is_superuser  # Only superusers can delete audit logs
 
 
+@admin.register(SearchQueryStat)
+class SearchQueryStatAdmin(admin.ModelAdmin):
+    list_display = ['query', 'search_count', 'zero_result_count', 'max_latency_ms', 'period_start', 'period_end']
+    search_fields = ['query']
+    date_hierarchy = 'period_start'
+    ordering = ['-period_start']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'file_name', 'status', 'rows_processed', 'inserted', 'updated', 'unchanged', 'created_at', 'finished_at']
+    list_filter = ['status']
+    search_fields = ['file_name']
+    ordering = ['-created_at']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Tool)
 class ToolAdmin(admin.ModelAdmin):
     list_display = ['id', 'name']
@@ -0,0 +1,198 @@
+"""
+In-process search analytics.
+
+Searches are recorded into in-memory counters and flushed periodically as
+aggregated `SearchQueryStat` rows, so the search request path never writes
+to the database.
+"""
+import atexit
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection
+
+from .models import SearchQueryStat
+
+
+DEFAULT_SETTINGS = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 1.0,      # Fraction of searches recorded (0.0 - 1.0)
+    'FLUSH_INTERVAL': 60,    # Seconds between background flushes, 0 disables the flusher
+    'MAX_QUERIES': 1000,     # Distinct queries tracked per period before folding into OTHER_QUERY
+}
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+OTHER_QUERY = '__other__'
+
+
+def _normalize_query(query):
+    return re.sub(r'\s+', ' ', query.strip().lower())[:500]
+
+
+def _bucket_for(latency_ms):
+    for bound in LATENCY_BUCKETS:
+        if latency_ms <= bound:
+            return str(bound)
+    return 'inf'
+
+
+class _QueryCounter:
+    __slots__ = ('count', 'zero_results', 'total_latency', 'max_latency', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.zero_results = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.histogram = {}
+
+
+class SearchAnalytics:
+    """
+    Thread-safe collector of search frequency, zero-result and latency statistics.
+    """
+
+    def __init__(self, sample_rate=1.0, flush_interval=60, max_queries=1000, enabled=True):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.flush_interval = flush_interval
+        self.max_queries = max_queries
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._period_start = datetime.now(dt_timezone.utc)
+        self._flusher = None
+
+    @classmethod
+    def from_settings(cls):
+        config = {**DEFAULT_SETTINGS, **getattr(settings, 'SEARCH_ANALYTICS', {})}
+        return cls(
+            sample_rate=config['SAMPLE_RATE'],
+            flush_interval=config['FLUSH_INTERVAL'],
+            max_queries=config['MAX_QUERIES'],
+            enabled=config['ENABLED'],
+        )
+
+    def record(self, query, results_count, latency_ms):
+        """
+        Record one search. Only touches in-memory counters.
+
+        Args:
+            query: The raw search query
+            results_count: Number of results returned
+            latency_ms: Time spent serving the search in milliseconds
+        """
+        if not self.enabled or random.random() >= self.sample_rate:
+            return
+
+        key = _normalize_query(query)
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None:
+                if len(self._counters) >= self.max_queries:
+                    key = OTHER_QUERY
+                    counter = self._counters.get(key)
+                if counter is None:
+                    counter = self._counters[key] = _QueryCounter()
+
+            counter.count += 1
+            if not results_count:
+                counter.zero_results += 1
+            counter.total_latency += latency_ms
+            counter.max_latency = max(counter.max_latency, latency_ms)
+            bucket = _bucket_for(latency_ms)
+            counter.histogram[bucket] = counter.histogram.get(bucket, 0) + 1
+
+        self._ensure_flusher()
+
+    def snapshot(self):
+        """Return the not-yet-flushed counters as plain dicts."""
+        with self._lock:
+            return {
+                query: {
+                    'search_count': c.count,
+                    'zero_result_count': c.zero_results,
+                    'total_latency_ms': c.total_latency,
+                    'max_latency_ms': c.max_latency,
+                    'latency_histogram': dict(c.histogram),
+                }
+                for query, c in self._counters.items()
+            }
+
+    def flush(self):
+        """
+        Write the current period as aggregated rows and start a new period.
+
+        Returns:
+            Number of SearchQueryStat rows written
+        """
+        with self._lock:
+            counters = self._counters
+            period_start = self._period_start
+            period_end = self._period_start = datetime.now(dt_timezone.utc)
+            self._counters = {}
+
+        if not counters:
+            return 0
+
+        rows = [
+            SearchQueryStat(
+                period_start=period_start,
+                period_end=period_end,
+                query=query,
+                search_count=c.count,
+                zero_result_count=c.zero_results,
+                total_latency_ms=round(c.total_latency, 3),
+                max_latency_ms=round(c.max_latency, 3),
+                latency_histogram=c.histogram,
+                sample_rate=self.sample_rate,
+            )
+            for query, c in counters.items()
+        ]
+        try:
+            SearchQueryStat.objects.bulk_create(rows, batch_size=500)
+        except Exception as e:
+            # Analytics must never break searching; drop the period on failure
+            print(f"Failed to flush search analytics: {e}")
+            return 0
+        return len(rows)
+
+    def _ensure_flusher(self):
+        if self.flush_interval <= 0 or self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name='search-analytics-flusher', daemon=True
+            )
+            self._flusher.start()
+        atexit.register(self.flush)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            finally:
+                # This thread owns its own connection; don't hold it open between flushes
+                connection.close()
+
+
+_search_analytics = None
+_search_analytics_lock = threading.Lock()
+
+
+def get_search_analytics():
+    """Return the process-wide SearchAnalytics instance, configured from settings."""
+    global _search_analytics
+    if _search_analytics is None:
+        with _search_analytics_lock:
+            if _search_analytics is None:
+                _search_analytics = SearchAnalytics.from_settings()
+    return _search_analytics
@@ -1,4 +1,5 @@
 from .models import AuditLog
+from .write_queue import queue_write
 import json
 
 
@@ -42,7 +43,8 @@ def log_audit_event(action, object_type, object_id=None, object_name=None,
             audit_data['details'] = {'error': 'Details could not be serialized'}
     
     try:
-        AuditLog.objects.create(**audit_data)
+        # With the write queue enabled this doesn't wait for the row to be stored
+        queue_write(AuditLog.objects.create, **audit_data)
     except Exception as e:
         # Log audit failures silently to avoid breaking the main operation
         print(f"Failed to create audit log: {e}")
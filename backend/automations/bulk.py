@@ -0,0 +1,833 @@
+"""
+Set-based writes for automations and their related rows.
+
+Instead of per-row `get_or_create` and `create` calls, tool and person names
+for a whole batch are resolved with one query each. Missing ones are inserted
+with `bulk_create`, followed by the automations and each child table in
+batches, all inside a single transaction.
+"""
+import hashlib
+import json
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from itertools import islice
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import as_serializer_error
+
+from .models import normalize_name, Automation, AutomationLSHBucket, Tool, Person, AutomationPersonRole, Environment, TestData, Metrics, Artifacts
+
+
+NESTED_FIELDS = [
+    'tool_name',
+    'modified_by_name',
+    'people_data',
+    'environments_data',
+    'test_data_data',
+    'metrics_data',
+    'artifacts_data',
+]
+
+BATCH_SIZE = 500
+
+# Keep IN (...) lists well under SQLite's bound-parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+
+def chunked(values, size=LOOKUP_CHUNK_SIZE):
+    """Lists of up to `size` items, taken lazily from any iterable."""
+    values = iter(values)
+    while chunk := list(islice(values, size)):
+        yield chunk
+
+
+def split_nested(data):
+    """Split validated serializer data into (core model fields, nested data)."""
+    core = {key: value for key, value in data.items() if key not in NESTED_FIELDS}
+    nested = {key: data.get(key) for key in NESTED_FIELDS}
+    return core, nested
+
+
+class NameResolver:
+    """
+    Maps names to ids for a model with a unique name key, creating missing rows.
+
+    Names not seen before are looked up with one IN query per chunk, and the
+    missing ones inserted with a single bulk_create. Resolved ids are kept for
+    later batches, but only once the transaction that saw them commits, so a
+    rolled-back batch can't leave ids of rows that no longer exist behind.
+    """
+
+    def __init__(self, model, key_field, key=lambda name: name):
+        self.model = model
+        self.key_field = key_field
+        self.key = key
+        self.ids = {}  # key -> id, committed only
+
+    def _lookup(self, keys):
+        found = {}
+        for chunk in chunked(keys):
+            found.update(self.model.objects.filter(**{f'{self.key_field}__in': chunk}).values_list(self.key_field, 'id'))
+        return found
+
+    def _build(self, name):
+        instance = self.model(name=name)
+        setattr(instance, self.key_field, self.key(name))
+        return instance
+
+    def resolve(self, names, create=True):
+        """
+        Return {name: id} for the non-empty names.
+
+        With create=False nothing is written: names that don't exist yet get
+        distinct negative placeholder ids instead.
+        """
+        keys = {name: self.key(name) for name in names if name}
+        found = {}
+        unknown = {key for key in keys.values() if key not in self.ids}
+        if unknown:
+            found = self._lookup(unknown)
+            missing = unknown - set(found)
+            if missing and not create:
+                placeholders = {key: -i for i, key in enumerate(sorted(missing), 1)}
+                transaction.on_commit(lambda: self.ids.update(found))
+                return {name: self.ids.get(key) or found.get(key) or placeholders[key] for name, key in keys.items()}
+            if missing:
+                # Spelled as the first occurrence in the input
+                first_spelling = {}
+                for name, key in keys.items():
+                    if key in missing:
+                        first_spelling.setdefault(key, name)
+                self.model.objects.bulk_create(
+                    [self._build(name) for name in first_spelling.values()],
+                    batch_size=BATCH_SIZE, ignore_conflicts=True
+                )
+                found.update(self._lookup(missing))
+            transaction.on_commit(lambda: self.ids.update(found))
+        return {name: self.ids.get(key) or found[key] for name, key in keys.items()}
+
+
+class NameCache:
+    """Tool and person ids shared by the batches of one import or request."""
+
+    def __init__(self):
+        self.tools = NameResolver(Tool, 'name')
+        self.people = NameResolver(Person, 'normalized_name', normalize_name)
+
+
+def resolve_tools(names, cache=None, create=True):
+    """Return {name: tool_id}, creating any tools that don't exist yet."""
+    return (cache or NameCache()).tools.resolve(names, create)
+
+
+def resolve_people(names, cache=None, create=True):
+    """
+    Return {name: person_id}, creating any people that don't exist yet.
+
+    Names are matched on normalize_name, so 'alice ' resolves to 'Alice'.
+    """
+    return (cache or NameCache()).people.resolve(names, create)
+
+
+def _people_names(nested):
+    names = [p.get('name') for p in nested['people_data'] or [] if p.get('name') and p.get('role')]
+    names.append(nested['modified_by_name'])
+    names.append((nested['test_data_data'] or {}).get('spoc'))
+    return [name for name in names if name]
+
+
+def child_values(nested, people):
+    """
+    Field values of the child rows for one automation's nested data.
+
+    Returns:
+        dict: model class -> list of {field attname: value} dicts
+    """
+    children = {AutomationPersonRole: [], Environment: [], TestData: [], Metrics: [], Artifacts: []}
+
+    seen_roles = set()
+    for person_data in nested['people_data'] or []:
+        if person_data.get('name') and person_data.get('role'):
+            key = (people[person_data['name']], person_data['role'])
+            if key in seen_roles:
+                continue  # (automation, person, role) is unique
+            seen_roles.add(key)
+            children[AutomationPersonRole].append({'person_id': key[0], 'role': key[1]})
+
+    for env_data in nested['environments_data'] or []:
+        if env_data.get('type'):
+            children[Environment].append({
+                'type': env_data['type'],
+                'vdi': env_data.get('vdi') or '',
+                'service_account': env_data.get('service_account') or '',
+            })
+
+    test_data_data = nested['test_data_data'] or {}
+    if test_data_data.get('spoc'):
+        children[TestData].append({'spoc_id': people[test_data_data['spoc']]})
+
+    metrics_data = nested['metrics_data'] or {}
+    if any(metrics_data.values()):
+        children[Metrics].append({
+            'post_prod_total_cases': metrics_data.get('post_prod_total_cases'),
+            'post_prod_sys_ex_count': metrics_data.get('post_prod_sys_ex_count'),
+            'post_prod_success_rate': metrics_data.get('post_prod_success_rate'),
+        })
+
+    artifacts_data = nested['artifacts_data'] or {}
+    if any(artifacts_data.values()):
+        children[Artifacts].append({
+            'artifacts_link': artifacts_data.get('artifacts_link'),
+            'code_review': artifacts_data.get('code_review'),
+            'demo': artifacts_data.get('demo'),
+            'rampup_issue_list': artifacts_data.get('rampup_issue_list'),
+        })
+
+    return children
+
+
+def prepare_rows(split_rows, names=None, create=True):
+    """
+    Resolve names and hash each row, without building model instances.
+
+    With create=False, unknown tools and people aren't created; rows naming
+    them get placeholder ids and so never hash equal to a stored automation.
+
+    Returns:
+        list: (core values including tool_id, modified_by_id and content_hash,
+        child_values) per row
+    """
+    tools = resolve_tools((nested['tool_name'] for _, nested in split_rows), names, create)
+    people = resolve_people((name for _, nested in split_rows for name in _people_names(nested)), names, create)
+
+    prepared = []
+    for core, nested in split_rows:
+        if nested['tool_name']:
+            core['tool_id'] = tools[nested['tool_name']]
+        if nested['modified_by_name']:
+            core['modified_by_id'] = people[nested['modified_by_name']]
+        children = child_values(nested, people)
+        core['content_hash'] = content_hash(automation_state(core, children))
+        prepared.append((core, children))
+    return prepared
+
+
+def _build_instances(prepared):
+    """
+    Build unsaved automations and child rows from prepared rows.
+
+    Returns:
+        tuple: (list of Automation, {air_id: {model: [instances]}})
+    """
+    automations = []
+    children = {}
+    for core, values in prepared:
+        automation = Automation(**core)
+        automations.append(automation)
+        children[automation.air_id] = {
+            model: [model(automation_id=automation.air_id, **row) for row in rows]
+            for model, rows in values.items()
+        }
+    return automations, children
+
+
+def _insert_children(children, batch_size):
+    by_model = {}
+    for per_automation in children:
+        for model, instances in per_automation.items():
+            by_model.setdefault(model, []).extend(instances)
+    for model, instances in by_model.items():
+        if instances:
+            model.objects.bulk_create(instances, batch_size=batch_size)
+
+
+def bulk_create_automations(rows, batch_size=BATCH_SIZE, names=None):
+    """
+    Create automations and all their related rows with set-based queries.
+
+    Args:
+        rows: Validated AutomationCreateSerializer data (one dict per automation)
+        batch_size: Rows per INSERT statement
+        names: NameCache shared with other batches of the same import
+
+    Returns:
+        list: The created Automation instances, in input order
+    """
+    split_rows = [split_nested(row) for row in rows]
+
+    with transaction.atomic():
+        automations, children = _build_instances(prepare_rows(split_rows, names))
+        Automation.objects.bulk_create(automations, batch_size=batch_size)
+        _insert_children(children.values(), batch_size)
+
+    return automations
+
+
+# Columns an upsert overwrites; created_at is kept from the original insert
+CORE_FIELDS = [
+    field.attname for field in Automation._meta.concrete_fields
+    if field.attname not in ('air_id', 'created_at', 'updated_at', 'content_hash')
+]
+
+CHILD_FIELDS = {
+    AutomationPersonRole: ['person_id', 'role'],
+    Environment: ['type', 'vdi', 'service_account'],
+    TestData: ['spoc_id'],
+    Metrics: ['post_prod_total_cases', 'post_prod_sys_ex_count', 'post_prod_success_rate'],
+    Artifacts: ['artifacts_link', 'code_review', 'demo', 'rampup_issue_list'],
+}
+
+
+# Nullable columns written as '' by child_values, where older rows may hold NULL
+BLANK_AS_EMPTY = {
+    Environment: {'vdi', 'service_account'},
+}
+
+
+def _normalized(model, values, fields):
+    """Values coerced to their stored Python types so input and DB rows compare equal."""
+    normalized = []
+    for name in fields:
+        value = values.get(name)
+        if value is not None:
+            value = model._meta.get_field(name).to_python(value)
+        elif name in BLANK_AS_EMPTY.get(model, ()):
+            value = ''
+        normalized.append(value)
+    return tuple(normalized)
+
+
+def automation_state(core, children):
+    """
+    Comparable snapshot of an automation and its related rows.
+
+    Args:
+        core: Dict of CORE_FIELDS values
+        children: {model: [dicts of CHILD_FIELDS values]}
+    """
+    return (
+        _normalized(Automation, core, CORE_FIELDS),
+        tuple(
+            tuple(sorted(
+                (_normalized(model, child, fields) for child in children.get(model, [])),
+                key=repr
+            ))
+            for model, fields in CHILD_FIELDS.items()
+        ),
+    )
+
+
+def _canonical(value):
+    """JSON stand-in for the non-JSON values of a state, equal for equal values."""
+    if isinstance(value, Decimal):
+        return format(value.normalize(), 'f')
+    if isinstance(value, datetime):
+        if value.utcoffset() is not None:
+            value = value.astimezone(dt_timezone.utc)
+        return value.isoformat()
+    raise TypeError(f'Cannot hash {type(value).__name__}')
+
+
+def content_hash(state):
+    """SHA-256 hex digest of an automation_state."""
+    return hashlib.sha256(json.dumps(state, default=_canonical).encode('utf-8')).hexdigest()
+
+
+def stored_states(air_ids):
+    """Return {air_id: automation_state} for the given automations that exist."""
+    states = {}
+    for chunk in chunked(air_ids):
+        cores = {row['air_id']: row for row in Automation.objects.filter(air_id__in=chunk).values('air_id', *CORE_FIELDS)}
+        children = {air_id: {} for air_id in cores}
+        for model, fields in CHILD_FIELDS.items():
+            for row in model.objects.filter(automation_id__in=list(cores)).values('automation_id', *fields):
+                children[row['automation_id']].setdefault(model, []).append(row)
+        for air_id, core in cores.items():
+            states[air_id] = automation_state(core, children[air_id])
+    return states
+
+
+def stored_hashes(air_ids):
+    """Return {air_id: content_hash} for the given automations that exist (hash may be None)."""
+    hashes = {}
+    for chunk in chunked(air_ids):
+        hashes.update(Automation.objects.filter(air_id__in=chunk).values_list('air_id', 'content_hash'))
+    return hashes
+
+
+def classify_prepared(prepared):
+    """
+    Compare prepare_rows output with the stored automations, with one query per
+    chunk of air_ids (plus a field-by-field comparison for automations without
+    a stored hash).
+
+    Returns:
+        list: Per row, 'new', 'changed', 'unchanged', or 'unhashed' for
+        automations that are unchanged but have no stored hash yet
+    """
+    existing = stored_hashes(core['air_id'] for core, _ in prepared)
+    unhashed = stored_states(air_id for air_id, stored in existing.items() if stored is None)
+
+    statuses = []
+    for core, children in prepared:
+        air_id = core['air_id']
+        if air_id not in existing:
+            statuses.append('new')
+        elif existing[air_id] == core['content_hash']:
+            statuses.append('unchanged')
+        elif air_id in unhashed and unhashed[air_id] == automation_state(core, children):
+            statuses.append('unhashed')
+        else:
+            statuses.append('changed')
+    return statuses
+
+
+def upsert_automations(rows, batch_size=BATCH_SIZE, names=None):
+    """
+    Insert new automations and replace existing ones, keyed on air_id.
+
+    Existing automations whose stored content hash matches the input are left
+    untouched, so writes scale with the number of actual changes. Automations
+    without a hash (edited outside the bulk paths) are compared field by field,
+    and get their hash stored when unchanged. Changed ones have every column
+    overwritten and their related rows replaced. When an air_id repeats in the
+    input, the last row wins.
+
+    Args:
+        rows: Validated AutomationUpsertSerializer data (one dict per automation)
+        batch_size: Rows per statement
+        names: NameCache shared with other batches of the same import
+
+    Returns:
+        dict: 'inserted', 'updated' and 'unchanged' lists of air_ids
+    """
+    split_rows = list({core['air_id']: (core, nested) for core, nested in map(split_nested, rows)}.values())
+
+    with transaction.atomic():
+        prepared = prepare_rows(split_rows, names)
+
+        inserted, updated, unchanged = [], [], []
+        to_write, to_rehash = [], []
+        for (core, children), status in zip(prepared, classify_prepared(prepared)):
+            air_id = core['air_id']
+            if status == 'new':
+                inserted.append(air_id)
+            elif status == 'changed':
+                updated.append(air_id)
+            else:
+                unchanged.append(air_id)
+                if status == 'unhashed':
+                    to_rehash.append(Automation(air_id=air_id, content_hash=core['content_hash']))
+                continue
+            to_write.append((core, children))
+
+        to_write, children = _build_instances(to_write)
+        Automation.objects.bulk_create(
+            to_write,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['air_id'],
+            update_fields=CORE_FIELDS + ['updated_at', 'content_hash'],
+        )
+        if to_rehash:
+            Automation.objects.bulk_update(to_rehash, ['content_hash'], batch_size=batch_size)
+        for chunk in chunked(updated):
+            for model in CHILD_FIELDS:
+                model.objects.filter(automation_id__in=chunk).delete()
+        _insert_children(children.values(), batch_size)
+
+    return {'inserted': inserted, 'updated': updated, 'unchanged': unchanged}
+
+
+# Payload fields a bulk partial update may change; foreign keys are set by name
+UPDATABLE_FIELDS = [
+    field.name for field in Automation._meta.concrete_fields
+    if not field.is_relation and field.name not in ('air_id', 'created_at', 'updated_at', 'content_hash')
+] + ['tool_name', 'modified_by_name']
+
+# Payload field -> (lookup of the current name, column written)
+NAMED_RELATIONS = {
+    'tool_name': ('tool__name', 'tool_id'),
+    'modified_by_name': ('modified_by__name', 'modified_by_id'),
+}
+
+
+def update_automations(updates, batch_size=BATCH_SIZE, names=None):
+    """
+    Apply partial changes to existing automations.
+
+    Only the given core fields are written; related rows are left alone.
+    Automations that already have the requested values are skipped. When an
+    air_id repeats, its change sets are merged in order.
+
+    Rows sharing a change set (such as a filter-based update) are written with
+    `QuerySet.update`, the others with `bulk_update`.
+
+    Args:
+        updates: Iterable of (air_id, validated changes) pairs
+        batch_size: Rows per statement
+        names: NameCache shared with other batches of the same import
+
+    Returns:
+        dict: 'updated', 'unchanged' and 'missing' lists of air_ids, and 'changes'
+        as {air_id: {field: {'old', 'new'}}} for the updated automations
+    """
+    merged = {}
+    for air_id, changes in updates:
+        merged.setdefault(air_id, {}).update(changes)
+    fields = {field for changes in merged.values() for field in changes}
+    column_fields = [field for field in fields if field not in NAMED_RELATIONS]
+    named_fields = {field: F(NAMED_RELATIONS[field][0]) for field in fields if field in NAMED_RELATIONS}
+
+    result = {'updated': [], 'unchanged': [], 'missing': [], 'changes': {}}
+    with transaction.atomic():
+        current = {}
+        for chunk in chunked(merged):
+            current.update(
+                (row['air_id'], row)
+                for row in Automation.objects.filter(air_id__in=chunk).order_by().values('air_id', *column_fields, **named_fields)
+            )
+        tool_ids = resolve_tools((changes.get('tool_name') for changes in merged.values()), names)
+        people_ids = resolve_people((changes.get('modified_by_name') for changes in merged.values()), names)
+        ids_by_field = {'tool_name': tool_ids, 'modified_by_name': people_ids}
+
+        now = timezone.now()
+        groups = {}
+        for air_id, changes in merged.items():
+            row = current.get(air_id)
+            if row is None:
+                result['missing'].append(air_id)
+                continue
+
+            diff = {}
+            for field, value in changes.items():
+                if field in NAMED_RELATIONS:
+                    # A change of case or spacing alone isn't a change
+                    changed = normalize_name(row[field] or '') != normalize_name(value or '')
+                else:
+                    changed = _normalized(Automation, row, [field]) != _normalized(Automation, changes, [field])
+                if changed:
+                    diff[field] = {'old': row[field], 'new': value}
+            if not diff:
+                result['unchanged'].append(air_id)
+                continue
+            result['updated'].append(air_id)
+            result['changes'][air_id] = diff
+
+            values = {}
+            for field, value in changes.items():
+                if field in NAMED_RELATIONS:
+                    values[NAMED_RELATIONS[field][1]] = ids_by_field[field].get(value)
+                else:
+                    values[field] = value
+            groups.setdefault(tuple(sorted(values.items())), []).append(air_id)
+
+        # Rows sharing a change set get one UPDATE ... WHERE air_id IN (...) per
+        # chunk; the rest go through bulk_update, one statement per set of columns.
+        # Both bypass auto_now, so updated_at is set explicitly. Only core fields
+        # are known here, so the content hash is dropped rather than recomputed.
+        singles = {}
+        for items, air_ids in groups.items():
+            if len(air_ids) > 1:
+                for chunk in chunked(air_ids):
+                    Automation.objects.filter(air_id__in=chunk).update(updated_at=now, content_hash=None, **dict(items))
+            else:
+                columns = tuple(column for column, _ in items)
+                singles.setdefault(columns, []).append(Automation(air_id=air_ids[0], updated_at=now, **dict(items)))
+        for columns, automations in singles.items():
+            Automation.objects.bulk_update(
+                automations, list(columns) + ['updated_at', 'content_hash'], batch_size=batch_size
+            )
+
+    return result
+
+
+# Nested payload field -> child model it describes
+NESTED_MODELS = {
+    'people_data': AutomationPersonRole,
+    'environments_data': Environment,
+    'test_data_data': TestData,
+    'metrics_data': Metrics,
+    'artifacts_data': Artifacts,
+}
+
+# Child rows that differ but agree on these fields are updated in place
+# rather than deleted and re-inserted
+CHILD_MATCH_FIELDS = {
+    AutomationPersonRole: ['role'],
+    Environment: ['type'],
+    TestData: [],
+    Metrics: [],
+    Artifacts: [],
+}
+
+
+def _take(rows, predicate):
+    """Remove and return the first (id, values) pair of `rows` matching `predicate`."""
+    for i, (pk, values) in enumerate(rows):
+        if predicate(values):
+            return rows.pop(i)
+    return None
+
+
+def _sync_children(model, air_id, rows):
+    """
+    Make the `model` rows of one automation equal `rows` (child_values dicts).
+
+    Rows that are already there are left alone, rows that only differ outside
+    CHILD_MATCH_FIELDS are updated in the columns that differ, and the rest
+    are deleted or inserted.
+
+    Returns:
+        bool: Whether anything was written
+    """
+    fields = CHILD_FIELDS[model]
+    match = [fields.index(field) for field in CHILD_MATCH_FIELDS[model]]
+    current = [
+        (row['id'], _normalized(model, row, fields))
+        for row in model.objects.filter(automation_id=air_id).order_by('id').values('id', *fields)
+    ]
+
+    unmatched = []
+    for values in (_normalized(model, row, fields) for row in rows):
+        if _take(current, lambda existing: existing == values) is None:
+            unmatched.append(values)
+
+    updates, inserts = [], []
+    for values in unmatched:
+        paired = _take(current, lambda existing: all(existing[i] == values[i] for i in match))
+        if paired is None:
+            inserts.append(values)
+        else:
+            pk, existing = paired
+            updates.append((pk, {
+                field: value for field, value, old in zip(fields, values, existing) if value != old
+            }))
+
+    if current:
+        model.objects.filter(id__in=[pk for pk, _ in current]).delete()
+    for pk, changes in updates:
+        model.objects.filter(id=pk).update(**changes)
+    if inserts:
+        model.objects.bulk_create([model(automation_id=air_id, **dict(zip(fields, values))) for values in inserts])
+    return bool(current or updates or inserts)
+
+
+def update_automation(instance, changes, nested=None, names=None):
+    """
+    Update one automation and its related rows, writing only what differs.
+
+    Core fields are saved only if their value changes. Each nested field given
+    (see NESTED_MODELS) replaces that set of related rows, which is applied as
+    the fewest deletes, updates and inserts; an empty list or dict removes
+    them. Nested fields that aren't given are left alone. Search index
+    triggers therefore only fire for content that actually changed.
+
+    Args:
+        instance: The Automation to update
+        changes: {field: value} of model fields
+        nested: {nested field: value} in AutomationCreateSerializer format
+        names: NameCache for resolving people
+
+    Returns:
+        list: The core and nested field names that changed
+    """
+    changed = [field for field, value in changes.items() if getattr(instance, field) != value]
+    nested = {field: value for field, value in (nested or {}).items() if field in NESTED_MODELS}
+
+    with transaction.atomic():
+        if changed:
+            for field in changed:
+                setattr(instance, field, changes[field])
+            instance.save(update_fields=changed + ['updated_at'])
+
+        if nested:
+            filled = {field: nested.get(field) for field in NESTED_FIELDS}
+            desired = child_values(filled, resolve_people(_people_names(filled), names))
+            changed_nested = [
+                field for field in nested
+                if _sync_children(NESTED_MODELS[field], instance.air_id, desired[NESTED_MODELS[field]])
+            ]
+            if changed_nested and not changed:
+                # The automation row itself is unchanged, but its hash is stale now
+                Automation.objects.filter(air_id=instance.air_id).update(updated_at=timezone.now(), content_hash=None)
+            changed += changed_nested
+
+    return changed
+
+
+# Every table with rows owned by an automation (ON DELETE CASCADE in the models)
+DEPENDENT_MODELS = [AutomationPersonRole, Environment, TestData, Metrics, Artifacts, AutomationLSHBucket]
+
+
+# Each deleted chunk is one transaction; committing is the main per-chunk cost
+DELETE_CHUNK_SIZE = 2000
+
+
+def _delete_chunk(air_ids):
+    """Delete automations and their dependent rows with set-based statements."""
+    deleted = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        for ids in chunked(air_ids):
+            placeholders = ', '.join(['%s'] * len(ids))
+            # The foreign keys are deferred, so the parents can go first. The search
+            # index triggers on the child tables then find no document to rebuild.
+            cursor.execute(f"DELETE FROM {Automation._meta.db_table} WHERE air_id IN ({placeholders})", ids)
+            deleted += cursor.rowcount
+            for model in DEPENDENT_MODELS:
+                cursor.execute(f"DELETE FROM {model._meta.db_table} WHERE automation_id IN ({placeholders})", ids)
+    return deleted
+
+
+def delete_automations(air_ids=None, queryset=None, chunk_size=DELETE_CHUNK_SIZE, on_chunk=None):
+    """
+    Delete automations by air_id or by queryset, with their related rows.
+
+    Work is done in chunks of `chunk_size` automations, each in its own
+    transaction, without loading related rows through Django's cascade
+    collector. Memory use is bounded by the chunk size.
+
+    Args:
+        air_ids: air_ids to delete (unknown ones are ignored)
+        queryset: Automations to delete, used when air_ids is None
+        chunk_size: Automations per transaction
+        on_chunk: Optional callable receiving the air_ids of each deleted chunk
+
+    Returns:
+        int: Number of automations deleted
+    """
+    if air_ids is not None:
+        chunks = (
+            list(Automation.objects.filter(air_id__in=chunk).values_list('air_id', flat=True))
+            for chunk in chunked(air_ids, chunk_size)
+        )
+    else:
+        def matching_chunks():
+            # Re-query after each chunk: deleted rows drop out of the result
+            while True:
+                chunk = list(queryset.order_by().values_list('air_id', flat=True)[:chunk_size])
+                if not chunk:
+                    return
+                yield chunk
+        chunks = matching_chunks()
+
+    total = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        deleted = _delete_chunk(chunk)
+        if on_chunk:
+            on_chunk(chunk)
+        total += deleted
+        if air_ids is None and not deleted:
+            break
+    return total
+
+
+def upsert_row_statuses(rows, names=None):
+    """Upsert rows and return 'inserted', 'updated' or 'unchanged' for each."""
+    result = upsert_automations(rows, names=names)
+    status_by_id = {air_id: key for key in ('inserted', 'updated', 'unchanged') for air_id in result[key]}
+    return [status_by_id[row['air_id']] for row in rows]
+
+
+def create_row_statuses(rows, names=None):
+    """Create rows and return 'created' for each."""
+    return ['created'] * len(bulk_create_automations(rows, names=names))
+
+
+def write_isolated(rows, serializer_class, write, chunk_size=BATCH_SIZE):
+    """
+    Validate and write rows so that a bad row only fails itself.
+
+    Rows are validated one by one. The valid rows of each chunk are written in
+    one transaction. If that write fails, the chunk is retried with a savepoint
+    around each row, so only the offending rows are dropped.
+
+    Args:
+        rows: Raw input dicts; any iterable, consumed one chunk at a time
+        serializer_class: Serializer validating a single row
+        write: Callable writing a list of validated rows and returning a status per row
+        chunk_size: Rows per transaction
+
+    Returns:
+        tuple: (list with one status per row, including 'invalid' and 'failed',
+        list of {'index', 'air_id', 'errors'} for the rows that weren't written)
+    """
+    statuses = []
+    errors = []
+
+    def fail(index, row, status, row_errors):
+        statuses[index] = status
+        air_id = row.get('air_id') if isinstance(row, dict) else None
+        errors.append({'index': index, 'air_id': air_id, 'errors': row_errors})
+
+    # One instance validates every row, as ListSerializer does; building the
+    # fields of a ModelSerializer per row would dominate the run time
+    validator = serializer_class()
+
+    for chunk in chunked(rows, chunk_size):
+        start = len(statuses)
+        statuses.extend([None] * len(chunk))
+        valid = []
+        for index, row in enumerate(chunk, start):
+            try:
+                valid.append((index, validator.run_validation(row)))
+            except ValidationError as e:
+                fail(index, row, 'invalid', as_serializer_error(e))
+        if not valid:
+            continue
+
+        written, failures = write_validated_isolated(valid, write)
+        for index, status in written.items():
+            statuses[index] = status
+        for index, message in failures.items():
+            fail(index, chunk[index - start], 'failed', {'non_field_errors': [message]})
+
+    errors.sort(key=lambda error: error['index'])
+    return statuses, errors
+
+
+def write_validated_isolated(valid, write):
+    """
+    Write already validated rows in one transaction. If that fails, retry with
+    a savepoint around each row, so only the offending rows are dropped.
+
+    Args:
+        valid: List of (key, validated data) pairs
+        write: Callable writing a list of validated rows and returning a status per row
+
+    Returns:
+        tuple: ({key: status} for the written rows, {key: error message} for the failed ones)
+    """
+    try:
+        with transaction.atomic():
+            return dict(zip([key for key, _ in valid], write([data for _, data in valid]))), {}
+    except (DatabaseError, ValueError):
+        pass
+
+    statuses, failures = {}, {}
+    with transaction.atomic():
+        for key, data in valid:
+            try:
+                with transaction.atomic():
+                    statuses[key] = write([data])[0]
+            except (DatabaseError, ValueError) as e:
+                failures[key] = str(e)
+    return statuses, failures
+
+
+def fetch_with_related(air_ids):
+    """Load automations with everything the read serializer needs, in the given order."""
+    loaded = {}
+    for chunk in chunked(air_ids):
+        queryset = Automation.objects.filter(air_id__in=chunk).select_related(
+            'tool', 'modified_by'
+        ).prefetch_related(
+            'people_roles__person', 'environments', 'test_data__spoc', 'metrics', 'artifacts'
+        )
+        loaded.update((automation.air_id, automation) for automation in queryset)
+    return [loaded[air_id] for air_id in air_ids if air_id in loaded]
@@ -0,0 +1,189 @@
+"""
+Server-side CSV import.
+
+The upload is read line by line and parsed incrementally with `csv.DictReader`.
+Rows are validated and upserted in chunks, each in its own transaction, so
+memory use is bounded by the chunk size rather than by the file size.
+
+Parsing and validation are CPU-bound and can run on a pool of worker
+processes, a few chunks ahead of the writer. Results are still consumed in
+file order by the calling thread, which stays the only one writing to the
+database.
+"""
+import codecs
+import csv
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from functools import partial
+from itertools import islice
+
+import django
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import as_serializer_error
+
+from .bulk import NameCache, upsert_automations, upsert_row_statuses, write_validated_isolated
+from .csv_mapping import missing_required_columns, row_to_automation
+from .duplicates import index_automations
+from .serializers import AutomationUpsertSerializer
+
+
+DEFAULT_CHUNK_SIZE = 500
+
+# Parsed chunks each worker may have waiting for the writer; bounds memory
+# when parsing outpaces writing
+CHUNKS_AHEAD_PER_WORKER = 2
+
+
+class ImportCancelled(Exception):
+    """Raised by a progress callback to stop an import between chunks."""
+
+
+def decoded_lines(byte_lines, encoding='utf-8-sig'):
+    """Decode an iterable of byte lines (an upload or request body) to text lines."""
+    return codecs.iterdecode(byte_lines, encoding)
+
+
+def _row_errors(serializer_errors):
+    errors = {}
+    for field, messages in serializer_errors.items():
+        if isinstance(messages, dict):
+            messages = [str(message) for message in messages.values()]
+        errors[field] = [str(message) for message in messages]
+    return errors
+
+
+def parse_chunk(first_row, rows):
+    """
+    Map and validate a chunk of CSV rows. Runs in worker processes, so it
+    must not touch the database.
+
+    Args:
+        first_row: Row number of the first row (1 is the first data row)
+        rows: List of CSV row dicts
+
+    Returns:
+        list: (row number, air_id, validated data or None, errors or None) per row
+    """
+    validator = AutomationUpsertSerializer()
+    parsed = []
+    for number, row in enumerate(rows, first_row):
+        try:
+            payload = row_to_automation(row)
+        except ValueError as e:
+            parsed.append((number, row.get('AIR ID') or row.get('air_id'), None, {'non_field_errors': [str(e)]}))
+            continue
+        try:
+            parsed.append((number, payload.get('air_id'), validator.run_validation(payload), None))
+        except ValidationError as e:
+            parsed.append((number, payload.get('air_id'), None, _row_errors(as_serializer_error(e))))
+    return parsed
+
+
+def _row_chunks(reader, chunk_size):
+    first_row = 1
+    while True:
+        rows = list(islice(reader, chunk_size))
+        if not rows:
+            return
+        yield first_row, rows
+        first_row += len(rows)
+
+
+def parsed_chunks(reader, chunk_size, workers=0):
+    """
+    Yield parse_chunk results for a CSV reader in file order.
+
+    With more than one worker, chunks are parsed in a process pool and at most
+    `workers * CHUNKS_AHEAD_PER_WORKER` of them are in flight; otherwise they
+    are parsed in the calling thread. Close the generator to stop early.
+    """
+    if workers <= 1:
+        for first_row, rows in _row_chunks(reader, chunk_size):
+            yield parse_chunk(first_row, rows)
+        return
+
+    # Workers are spawned rather than forked, so they start without the parent's
+    # threads and database connections. django.setup runs before the first task
+    # (and this module) is unpickled in them.
+    executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup
+    )
+    pending = deque()
+    try:
+        for first_row, rows in _row_chunks(reader, chunk_size):
+            pending.append(executor.submit(parse_chunk, first_row, rows))
+            if len(pending) >= workers * CHUNKS_AHEAD_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def import_csv(lines, chunk_size=DEFAULT_CHUNK_SIZE, progress=None, isolate=False, workers=0):
+    """
+    Import automations from CSV text lines, upserting on AIR ID.
+
+    Rows are processed in chunks. By default, chunks before an invalid one stay
+    committed and the import stops at the first chunk containing invalid rows.
+    With `isolate`, invalid or failing rows are skipped and reported while
+    every other row is written.
+
+    Args:
+        lines: Iterable of text lines (line endings preserved)
+        chunk_size: Rows validated and written per transaction
+        progress: Optional callable receiving the running result after each
+            committed chunk; it may raise ImportCancelled to stop the import
+        isolate: Skip bad rows instead of stopping at them
+        workers: Processes parsing and validating chunks ahead of the writer
+            (0 or 1 parses in the calling thread)
+
+    Returns:
+        dict: Counts of 'rows' (processed), 'inserted', 'updated' and 'unchanged', and
+        'errors' as a list of {'row', 'air_id', 'errors'} (row 1 is the first data row)
+    """
+    result = {'rows': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'errors': []}
+
+    reader = csv.DictReader(lines)
+    missing = missing_required_columns(reader.fieldnames)
+    if missing:
+        result['errors'].append({'row': 0, 'air_id': None, 'errors': {'columns': [f"Missing required columns: {', '.join(missing)}"]}})
+        return result
+
+    names = NameCache()  # Tool and person ids resolved by earlier chunks
+    write = partial(upsert_row_statuses, names=names)
+    with closing(parsed_chunks(reader, chunk_size, workers)) as chunks:
+        for parsed in chunks:
+            invalid = [
+                {'row': number, 'air_id': air_id, 'errors': errors}
+                for number, air_id, data, errors in parsed if errors is not None
+            ]
+            valid = [(number, data) for number, air_id, data, errors in parsed if errors is None]
+
+            if isolate:
+                statuses, failures = write_validated_isolated(valid, write) if valid else ({}, {})
+                air_ids = {number: air_id for number, air_id, data, errors in parsed}
+                invalid += [
+                    {'row': number, 'air_id': air_ids[number], 'errors': {'non_field_errors': [message]}}
+                    for number, message in failures.items()
+                ]
+                result['errors'] += sorted(invalid, key=lambda error: error['row'])
+                written = {'inserted': [], 'updated': [], 'unchanged': []}
+                for number, status in statuses.items():
+                    written[status].append(air_ids[number])
+            else:
+                if invalid:
+                    result['errors'] += invalid
+                    break
+                written = upsert_automations([data for _, data in valid], names=names)
+            result['rows'] += len(parsed)
+
+            index_automations(written['inserted'] + written['updated'])
+            for key in ('inserted', 'updated', 'unchanged'):
+                result[key] += len(written[key])
+            if progress:
+                progress(result)
+
+    return result
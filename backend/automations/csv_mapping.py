@@ -0,0 +1,241 @@
+"""
+Column mapping between automation CSV files and the nested automation payload.
+
+Both the display headers used by exports ("AIR ID", "Tool", "Dev VDI", ...)
+and the snake_case headers of the sample files ("air_id", "tool_name",
+"dev_vdi", ...) are accepted. This module has no Django imports so the
+standalone import scripts can use it as well.
+
+Exports round-trip: every related row is written, so re-importing an export
+through the upsert endpoints leaves the automations as they were. A column
+holding several values (the stakeholders, or the people in one role or the
+environments of one type when an automation has more than one) separates
+them with SEPARATOR; the VDI and service account columns of an environment
+type pair up by position. Importing a file that lacks a relation's columns
+altogether still replaces those related rows with none.
+"""
+from itertools import zip_longest
+
+# (display header, snake_case header, payload field)
+CORE_COLUMNS = [
+    ('AIR ID', 'air_id', 'air_id'),
+    ('Name', 'name', 'name'),
+    ('Type', 'type', 'type'),
+    ('Complexity', 'complexity', 'complexity'),
+    ('Brief Description', 'brief_description', 'brief_description'),
+    ('COE/FED', 'coe_fed', 'coe_fed'),
+    ('Tool', 'tool_name', 'tool_name'),
+    ('Tool Version', 'tool_version', 'tool_version'),
+    ('Process Details', 'process_details', 'process_details'),
+    ('Object Details', 'object_details', 'object_details'),
+    ('Queue', 'queue', 'queue'),
+    ('Shared Folders', 'shared_folders', 'shared_folders'),
+    ('Shared Mailboxes', 'shared_mailboxes', 'shared_mailboxes'),
+    ('QA Handshake', 'qa_handshake', 'qa_handshake'),
+    ('PreProd Deploy Date', 'preprod_deploy_date', 'preprod_deploy_date'),
+    ('Prod Deploy Date', 'prod_deploy_date', 'prod_deploy_date'),
+    ('Warranty End Date', 'warranty_end_date', 'warranty_end_date'),
+    ('Comments', 'comments', 'comments'),
+    ('Documentation', 'documentation', 'documentation'),
+    ('Modified', 'modified', 'modified'),
+    ('Modified By', 'modified_by', 'modified_by_name'),
+    ('Path', 'path', 'path'),
+]
+
+REQUIRED_FIELDS = ['air_id', 'name', 'type']
+
+# (display header, snake_case header, role)
+ROLE_MAPPINGS = [
+    ('Project Manager', 'project_manager', 'project_manager'),
+    ('Project Designer', 'project_designer', 'project_designer'),
+    ('Developer', 'developer', 'developer'),
+    ('Tester', 'tester', 'tester'),
+    ('Business SPOC', 'business_spoc', 'business_spoc'),
+    ('Applications-App Owner', 'app_owner', 'app_owner'),
+]
+
+STAKEHOLDERS_COLUMN = ('Business Stakeholders', 'business_stakeholders')
+SEPARATOR = ';'
+STAKEHOLDER_SEPARATOR = SEPARATOR
+
+# (environment type, VDI headers, service account headers)
+ENV_MAPPINGS = [
+    ('dev', ('Dev VDI', 'dev_vdi'), ('Dev Service Account', 'dev_service_account')),
+    ('qa', ('QA VDI', 'qa_vdi'), ('QA Service Account', 'qa_service_account')),
+    ('uat', ('UAT VDI', 'uat_vdi'), ('UAT Service Account', 'uat_service_account')),
+    ('prod', ('Production VDI', 'prod_vdi'), ('Production Service Account', 'prod_service_account')),
+]
+
+TEST_DATA_SPOC_COLUMN = ('Test Data SPOC', 'test_data_spoc')
+
+# (display header, snake_case header, metrics field, type)
+METRICS_COLUMNS = [
+    ('Post Production Total Cases', 'post_prod_total_cases', 'post_prod_total_cases', int),
+    ('Post Production System Exceptions Count', 'post_prod_sys_ex_count', 'post_prod_sys_ex_count', int),
+    ('Post Production Success Rate', 'post_prod_success_rate', 'post_prod_success_rate', float),
+]
+
+# (display header, snake_case header, artifacts field)
+ARTIFACTS_COLUMNS = [
+    ('Automation Artifacts Link', 'artifacts_link', 'artifacts_link'),
+    ('Code Review with M&E', 'code_review', 'code_review'),
+    ('Automation Demo to M&E', 'demo', 'demo'),
+    ('Rampup/Postprod Issue/Resolution list to M&E', 'rampup_issue_list', 'rampup_issue_list'),
+]
+
+
+def _get(row, headers):
+    """First non-empty stripped value among a column's header spellings."""
+    for header in headers:
+        value = row.get(header)
+        if value and value.strip():
+            return value.strip()
+    return ''
+
+
+def _split(value):
+    """Stripped values of a multi-valued column; empty ones are kept so columns pair up."""
+    return [part.strip() for part in value.split(SEPARATOR)] if value else []
+
+
+def missing_required_columns(headers):
+    """Required payload fields that no header in the file maps to."""
+    headers = set(h.strip() for h in headers or [])
+    return [
+        field for display, snake, field in CORE_COLUMNS
+        if field in REQUIRED_FIELDS and display not in headers and snake not in headers
+    ]
+
+
+def row_to_automation(row):
+    """
+    Convert one CSV row (dict of header -> value) to a nested automation payload.
+
+    Raises:
+        ValueError: If a numeric metrics column can't be parsed
+    """
+    row = {key.strip(): value for key, value in row.items() if key}
+
+    automation = {}
+    for display, snake, field in CORE_COLUMNS:
+        value = _get(row, (display, snake))
+        if value or field in REQUIRED_FIELDS:
+            automation[field] = value
+
+    people = []
+    for display, snake, role in ROLE_MAPPINGS:
+        for name in _split(_get(row, (display, snake))):
+            if name:
+                people.append({'name': name, 'role': role})
+    for stakeholder in _split(_get(row, STAKEHOLDERS_COLUMN)):
+        if stakeholder:
+            people.append({'name': stakeholder, 'role': 'business_stakeholder'})
+    automation['people_data'] = people
+
+    environments = []
+    for env_type, vdi_headers, service_account_headers in ENV_MAPPINGS:
+        pairs = zip_longest(_split(_get(row, vdi_headers)), _split(_get(row, service_account_headers)), fillvalue='')
+        for vdi, service_account in pairs:
+            if vdi or service_account:
+                environments.append({'type': env_type, 'vdi': vdi, 'service_account': service_account})
+    automation['environments_data'] = environments
+
+    spoc = _get(row, TEST_DATA_SPOC_COLUMN)
+    automation['test_data_data'] = {'spoc': spoc} if spoc else {}
+
+    metrics = {}
+    for display, snake, field, cast in METRICS_COLUMNS:
+        value = _get(row, (display, snake))
+        if value:
+            try:
+                metrics[field] = cast(value)
+            except ValueError:
+                raise ValueError(f"Invalid {display}: '{value}'")
+    automation['metrics_data'] = metrics
+
+    automation['artifacts_data'] = {
+        field: _get(row, (display, snake))
+        for display, snake, field in ARTIFACTS_COLUMNS
+        if _get(row, (display, snake))
+    }
+
+    return automation
+
+
+# Column order of exported files; this is also the import format
+EXPORT_HEADERS = [
+    'AIR ID', 'Name', 'Type', 'Complexity', 'Brief Description', 'COE/FED',
+    'Tool', 'Tool Version', 'Process Details', 'Object Details', 'Queue',
+    'Shared Folders', 'Shared Mailboxes', 'QA Handshake', 'PreProd Deploy Date',
+    'Prod Deploy Date', 'Warranty End Date', 'Comments', 'Documentation',
+    'Modified', 'Modified By', 'Path', 'Created At', 'Updated At',
+    'Project Manager', 'Project Designer', 'Developer', 'Tester',
+    'Business SPOC', 'Business Stakeholders', 'Applications-App Owner',
+    'Dev VDI', 'Dev Service Account', 'QA VDI', 'QA Service Account',
+    'UAT VDI', 'UAT Service Account', 'Production VDI', 'Production Service Account', 'Test Data SPOC',
+    'Post Production Total Cases', 'Post Production System Exceptions Count',
+    'Post Production Success Rate', 'Automation Artifacts Link',
+    'Code Review with M&E', 'Automation Demo to M&E',
+    'Rampup/Postprod Issue/Resolution list to M&E',
+]
+
+# Exported but not imported; (display header, record field)
+EXPORT_ONLY_COLUMNS = [('Created At', 'created_at'), ('Updated At', 'updated_at')]
+
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+_ROLE_HEADERS = {role: display for display, snake, role in ROLE_MAPPINGS}
+_ENV_HEADERS = {env_type: (vdi[0], service_account[0]) for env_type, vdi, service_account in ENV_MAPPINGS}
+
+
+def _format(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'utcoffset'):
+        if value.utcoffset() is not None:
+            value = value - value.utcoffset()
+        return value.strftime(DATE_FORMAT)
+    return str(value)
+
+
+def export_row(record):
+    """
+    Convert an automation record to a list of values in EXPORT_HEADERS order.
+
+    Args:
+        record: Dict with the payload fields of CORE_COLUMNS plus 'created_at'
+            and 'updated_at', 'people' as [(role, name)], 'environments' as
+            [(type, vdi, service_account)], 'test_data_spoc', and 'metrics'
+            and 'artifacts' dicts (or None)
+    """
+    values = {display: record.get(field) for display, snake, field in CORE_COLUMNS}
+    for display, field in EXPORT_ONLY_COLUMNS:
+        values[display] = record.get(field)
+
+    multiple = {}
+    for role, name in record.get('people') or []:
+        if role == 'business_stakeholder':
+            multiple.setdefault(STAKEHOLDERS_COLUMN[0], []).append(name)
+        elif role in _ROLE_HEADERS:
+            multiple.setdefault(_ROLE_HEADERS[role], []).append(name)
+
+    for env_type, vdi, service_account in record.get('environments') or []:
+        if env_type in _ENV_HEADERS:
+            vdi_header, service_account_header = _ENV_HEADERS[env_type]
+            multiple.setdefault(vdi_header, []).append(vdi or '')
+            multiple.setdefault(service_account_header, []).append(service_account or '')
+
+    for header, parts in multiple.items():
+        values[header] = f'{SEPARATOR} '.join(parts) if any(parts) else ''
+
+    values[TEST_DATA_SPOC_COLUMN[0]] = record.get('test_data_spoc')
+
+    metrics = record.get('metrics') or {}
+    for display, snake, field, cast in METRICS_COLUMNS:
+        values[display] = metrics.get(field)
+
+    artifacts = record.get('artifacts') or {}
+    for display, snake, field in ARTIFACTS_COLUMNS:
+        values[display] = artifacts.get(field)
+
+    return [_format(values.get(header)) for header in EXPORT_HEADERS]
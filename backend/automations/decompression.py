@@ -0,0 +1,188 @@
+"""
+Streaming decompression of request bodies sent with a Content-Encoding.
+
+Bulk JSON and CSV payloads compress about 10x, so clients may send them with
+`Content-Encoding: gzip` (or `zstd` when the optional `zstandard` package is
+installed). Bodies are inflated piece by piece as the parsers read them and
+never held whole. The decompressed size and the compression ratio are capped
+so that a small "decompression bomb" can't exhaust memory or disk.
+"""
+import io
+import zlib
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+
+try:
+    import zstandard
+except ImportError:  # zstd bodies are refused without it
+    zstandard = None
+
+
+DEFAULT_SETTINGS = {
+    'MAX_SIZE': 1024 * 1024 * 1024,  # Decompressed bytes per request
+    'MAX_RATIO': 200,                # Decompressed / compressed bytes
+}
+
+READ_SIZE = 64 * 1024
+
+# Most output produced from one call to a decompressor
+OUTPUT_SIZE = 256 * 1024
+
+# zstd decompressors can't cap their output per call, so input is fed in
+# slices small enough that even RLE blocks (~32000:1) stay within a few MB
+ZSTD_INPUT_SIZE = 128
+ZSTD_MAX_WINDOW_SIZE = 8 * 1024 * 1024
+
+# The ratio is only checked past this size; tiny bodies of repeated
+# values legitimately compress far better than real payloads
+RATIO_CHECK_MIN_SIZE = 1024 * 1024
+
+
+class BodyTooLarge(ParseError):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Decompressed request body is too large.'
+    default_code = 'body_too_large'
+
+
+class UnsupportedContentEncoding(ParseError):
+    status_code = status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+    default_detail = 'Unsupported Content-Encoding.'
+    default_code = 'unsupported_content_encoding'
+
+
+def get_config():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'REQUEST_DECOMPRESSION', {})}
+
+
+def supported_encodings():
+    return ['gzip', 'zstd'] if zstandard is not None else ['gzip']
+
+
+def is_compressed(content_encoding):
+    return (content_encoding or '').strip().lower() not in ('', 'identity')
+
+
+class StreamDecompressor:
+    """
+    Push decompressor for one Content-Encoding: `feed` compressed bytes as
+    they arrive and get decompressed pieces back, then call `finish`.
+
+    Raises:
+        UnsupportedContentEncoding: For anything but gzip (and zstd if available)
+        BodyTooLarge: When MAX_SIZE or MAX_RATIO is exceeded
+        ParseError: For corrupt or truncated data
+    """
+
+    def __init__(self, content_encoding, max_size=None, max_ratio=None):
+        config = get_config()
+        self.encoding = (content_encoding or '').strip().lower()
+        if self.encoding == 'x-gzip':
+            self.encoding = 'gzip'
+        if self.encoding not in supported_encodings():
+            raise UnsupportedContentEncoding(
+                f"Unsupported Content-Encoding '{content_encoding}'; use one of: {', '.join(supported_encodings())}"
+            )
+        self.max_size = max_size if max_size is not None else config['MAX_SIZE']
+        self.max_ratio = max_ratio if max_ratio is not None else config['MAX_RATIO']
+        self.compressed = 0
+        self.size = 0
+        self._start_member()
+
+    def _start_member(self):
+        # Concatenated gzip members / zstd frames are decoded one after another
+        if self.encoding == 'gzip':
+            self.decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        else:
+            self.decompressor = zstandard.ZstdDecompressor(max_window_size=ZSTD_MAX_WINDOW_SIZE).decompressobj()
+        self.started = False
+
+    def _decompress(self, data):
+        while data:
+            self.started = True
+            if self.encoding == 'gzip':
+                piece = self.decompressor.decompress(data, OUTPUT_SIZE)
+                data = self.decompressor.unconsumed_tail
+            else:
+                piece = self.decompressor.decompress(data[:ZSTD_INPUT_SIZE])
+                data = data[ZSTD_INPUT_SIZE:]
+            if piece:
+                yield piece
+            if self.decompressor.eof:
+                data = self.decompressor.unused_data + data
+                self._start_member()
+
+    def feed(self, data):
+        """Yield the decompressed pieces of the next compressed bytes."""
+        self.compressed += len(data)
+        try:
+            for piece in self._decompress(data):
+                self.size += len(piece)
+                self._check_limits()
+                yield piece
+        except zlib.error as e:
+            raise ParseError(f'Could not decompress the request body: {e}')
+        except Exception as e:
+            if zstandard is not None and isinstance(e, zstandard.ZstdError):
+                raise ParseError(f'Could not decompress the request body: {e}')
+            raise
+
+    def finish(self):
+        """Check that the body didn't end in the middle of a gzip member or zstd frame."""
+        if self.started:
+            raise ParseError('Compressed request body is truncated')
+
+    def _check_limits(self):
+        if self.max_size and self.size > self.max_size:
+            raise BodyTooLarge(f'Decompressed request body exceeds {self.max_size} bytes')
+        if self.max_ratio and self.size > RATIO_CHECK_MIN_SIZE and self.size > self.compressed * self.max_ratio:
+            raise BodyTooLarge(f'Request body compression ratio exceeds {self.max_ratio}:1')
+
+
+class DecompressedStream(io.RawIOBase):
+    """Readable raw stream of the decompressed bytes of a compressed file-like object."""
+
+    def __init__(self, stream, decompressor):
+        self.pieces = self._pieces(stream, decompressor)
+        self.pending = memoryview(b'')
+
+    @staticmethod
+    def _pieces(stream, decompressor):
+        while True:
+            chunk = stream.read(READ_SIZE)
+            if not chunk:
+                break
+            yield from decompressor.feed(chunk)
+        decompressor.finish()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending:
+            piece = next(self.pieces, None)
+            if piece is None:
+                return 0
+            self.pending = memoryview(piece)
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+
+def decompressed(stream, content_encoding):
+    """
+    Wrap a request body stream so it reads decompressed bytes.
+
+    Args:
+        stream: Binary file-like object with read(size), e.g. DRF's request.stream
+        content_encoding: The request's Content-Encoding header, if any
+
+    Returns:
+        The stream itself when the body isn't compressed, otherwise a buffered
+        reader (read, readline and line iteration) over the decompressed bytes
+    """
+    if stream is None or not is_compressed(content_encoding):
+        return stream
+    return io.BufferedReader(DecompressedStream(stream, StreamDecompressor(content_encoding)), READ_SIZE)
@@ -0,0 +1,232 @@
+"""
+Near-duplicate detection with MinHash signatures and LSH banding.
+
+Each automation's normalized text is reduced to a MinHash signature, split
+into bands, and every band is hashed into a bucket stored in
+`AutomationLSHBucket`. Automations sharing any bucket are candidate
+duplicates. Looking candidates up is an indexed `(band, bucket)` query, so it
+does not compare against every row. Candidates are then confirmed with the
+exact Jaccard similarity of their shingles.
+"""
+import hashlib
+import random
+import re
+import zlib
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .models import Automation, AutomationLSHBucket
+
+
+TEXT_FIELDS = ['name', 'type', 'brief_description', 'process_details', 'object_details']
+
+SHINGLE_SIZE = 2           # Words per shingle
+NUM_BANDS = 16
+ROWS_PER_BAND = 4          # 16 x 4 permutations: ~50% Jaccard has even odds of sharing a bucket
+NUM_PERMUTATIONS = NUM_BANDS * ROWS_PER_BAND
+DEFAULT_THRESHOLD = 0.7    # Minimum exact Jaccard similarity reported as a duplicate
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Fixed seed so signatures are stable across processes and restarts
+_rng = random.Random(20250722)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+
+def normalize_text(values):
+    """Lowercased, punctuation-free, whitespace-collapsed text of an automation's TEXT_FIELDS."""
+    text = ' '.join(str(values.get(field) or '') for field in TEXT_FIELDS)
+    return re.sub(r'\s+', ' ', re.sub(r'[^\w\s]', ' ', text.lower())).strip()
+
+
+def shingles(values):
+    """Word n-grams of the normalized text (the whole text when it is shorter)."""
+    words = normalize_text(values).split()
+    if len(words) <= SHINGLE_SIZE:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash(shingle_set):
+    hashes = [zlib.crc32(s.encode('utf-8')) for s in shingle_set]
+    if not hashes:
+        return None
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def band_buckets(signature):
+    """[(band, bucket)] for a MinHash signature."""
+    buckets = []
+    for band in range(NUM_BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(repr(rows).encode('ascii'), digest_size=8).hexdigest()
+        buckets.append((band, digest))
+    return buckets
+
+
+def _chunks(values, size=500):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _texts_by_air_id(air_ids):
+    texts = {}
+    for chunk in _chunks(air_ids):
+        for row in Automation.objects.filter(air_id__in=chunk).values('air_id', *TEXT_FIELDS):
+            texts[row['air_id']] = shingles(row)
+    return texts
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def lsh_buckets(rows):
+    """[(band, bucket)] per row of TEXT_FIELDS values; empty for rows without text."""
+    buckets = []
+    for row in rows:
+        signature = minhash(shingles(row))
+        buckets.append(band_buckets(signature) if signature else [])
+    return buckets
+
+
+def index_rows(rows, buckets=None):
+    """
+    Store the LSH buckets of rows that were just written.
+
+    MinHash is pure Python and slow for large batches, so callers do this
+    after their write transaction commits rather than holding the database
+    write lock for it; `buckets` reuses signatures already computed with
+    `lsh_buckets` for the same rows.
+    """
+    rows = list(rows)
+    if buckets is None:
+        buckets = lsh_buckets(rows)
+    for start in range(0, len(rows), 500):
+        chunk = rows[start:start + 500]
+        instances = [
+            AutomationLSHBucket(automation_id=row['air_id'], band=band, bucket=bucket)
+            for row, row_buckets in zip(chunk, buckets[start:start + 500])
+            for band, bucket in row_buckets
+        ]
+        with transaction.atomic():
+            AutomationLSHBucket.objects.filter(automation_id__in=[row['air_id'] for row in chunk]).delete()
+            AutomationLSHBucket.objects.bulk_create(instances, batch_size=1000)
+
+
+def index_automations(air_ids):
+    """
+    (Re)compute the LSH buckets for the given automations from their stored
+    text. Call it once the write that changed them has committed.
+    """
+    for chunk in _chunks(air_ids):
+        index_rows(Automation.objects.filter(air_id__in=chunk).values('air_id', *TEXT_FIELDS))
+
+
+def find_duplicates_for_rows(rows, threshold=DEFAULT_THRESHOLD, buckets=None):
+    """
+    Find probable duplicates of incoming rows among stored automations and
+    among the rows themselves.
+
+    Args:
+        rows: List of dicts with TEXT_FIELDS and 'air_id'
+        threshold: Minimum Jaccard similarity of shingles
+        buckets: `lsh_buckets(rows)`, when already computed
+
+    Returns:
+        list: One list per row of {'air_id', 'similarity'} dicts, best match first
+    """
+    row_shingles = [shingles(row) for row in rows]
+    row_buckets = buckets if buckets is not None else lsh_buckets(rows)
+
+    # One indexed lookup for all buckets of the whole batch
+    all_buckets = {bucket for buckets in row_buckets for _, bucket in buckets}
+    stored = defaultdict(set)
+    for chunk in _chunks(all_buckets):
+        for band, bucket, air_id in AutomationLSHBucket.objects.filter(
+            bucket__in=chunk
+        ).values_list('band', 'bucket', 'automation_id'):
+            stored[(band, bucket)].add(air_id)
+
+    incoming = defaultdict(set)
+    for index, buckets in enumerate(row_buckets):
+        for key in buckets:
+            incoming[key].add(index)
+
+    stored_candidates = [set() for _ in rows]
+    batch_candidates = [set() for _ in rows]
+    for index, buckets in enumerate(row_buckets):
+        for key in buckets:
+            stored_candidates[index] |= stored.get(key, set())
+            batch_candidates[index] |= incoming[key] - {index}
+
+    candidate_shingles = _texts_by_air_id(set().union(*stored_candidates) if rows else set())
+
+    results = []
+    for index, row in enumerate(rows):
+        matches = {}
+        for air_id in stored_candidates[index]:
+            if air_id == row.get('air_id'):
+                continue
+            similarity = jaccard(row_shingles[index], candidate_shingles.get(air_id))
+            if similarity >= threshold:
+                matches[air_id] = similarity
+        for other in batch_candidates[index]:
+            other_id = rows[other].get('air_id')
+            similarity = jaccard(row_shingles[index], row_shingles[other])
+            if other_id and other_id != row.get('air_id') and similarity >= threshold:
+                matches[other_id] = max(similarity, matches.get(other_id, 0))
+        results.append([
+            {'air_id': air_id, 'similarity': round(similarity, 3)}
+            for air_id, similarity in sorted(matches.items(), key=lambda item: (-item[1], item[0]))
+        ])
+    return results
+
+
+def find_duplicate_pairs(threshold=DEFAULT_THRESHOLD):
+    """
+    Find all pairs of stored automations that are probable duplicates.
+
+    Returns:
+        list: (air_id, air_id, similarity) tuples, most similar first
+    """
+    # Rows sharing their (band, bucket) with another row; a bucket value
+    # repeated in a different band is a coincidence, not a candidate
+    shared = AutomationLSHBucket.objects.filter(
+        band=OuterRef('band'), bucket=OuterRef('bucket')
+    ).exclude(pk=OuterRef('pk'))
+
+    groups = defaultdict(set)
+    for band, bucket, air_id in AutomationLSHBucket.objects.filter(
+        Exists(shared)
+    ).values_list('band', 'bucket', 'automation_id'):
+        groups[(band, bucket)].add(air_id)
+
+    candidate_pairs = set()
+    for members in groups.values():
+        if len(members) > 1:
+            ordered = sorted(members)
+            candidate_pairs.update(
+                (a, b) for i, a in enumerate(ordered) for b in ordered[i + 1:]
+            )
+
+    texts = _texts_by_air_id({air_id for pair in candidate_pairs for air_id in pair})
+    pairs = []
+    for a, b in candidate_pairs:
+        similarity = jaccard(texts.get(a), texts.get(b))
+        if similarity >= threshold:
+            pairs.append((a, b, round(similarity, 3)))
+    pairs.sort(key=lambda pair: (-pair[2], pair[0], pair[1]))
+    return pairs
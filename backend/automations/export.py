@@ -0,0 +1,130 @@
+"""
+Streaming CSV and XLSX exports in the canonical import format.
+
+Automations are read as plain values in chunks, with one query per related
+table per chunk, so no model instances are built. Files are generated (and
+the CSV optionally gzip-compressed) as they are sent, so memory use doesn't
+grow with the number of rows and the download starts at once.
+"""
+import csv
+import io
+import zlib
+
+from django.db.models import F
+from rest_framework.renderers import BaseRenderer
+
+from .csv_mapping import CORE_COLUMNS, EXPORT_HEADERS, METRICS_COLUMNS, ARTIFACTS_COLUMNS, export_row
+from .models import Artifacts, AutomationPersonRole, Environment, Metrics, TestData
+from .xlsx import iter_xlsx
+
+
+EXPORT_CHUNK_SIZE = 2000   # Rows fetched (and related rows prefetched) per query
+ROWS_PER_WRITE = 200       # Rows encoded into each chunk sent to the client
+
+
+class CSVRenderer(BaseRenderer):
+    """Lets content negotiation accept `text/csv` for views returning a streaming CSV response."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+
+class XLSXRenderer(CSVRenderer):
+    media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    format = 'xlsx'
+    charset = None
+
+
+# Core payload fields read from foreign keys rather than columns
+RELATED_CORE_FIELDS = {'tool_name': F('tool__name'), 'modified_by_name': F('modified_by__name')}
+CORE_VALUE_FIELDS = [
+    field for display, snake, field in CORE_COLUMNS if field not in RELATED_CORE_FIELDS
+] + ['created_at', 'updated_at']
+METRICS_FIELDS = [field for display, snake, field, cast in METRICS_COLUMNS]
+ARTIFACTS_FIELDS = [field for display, snake, field in ARTIFACTS_COLUMNS]
+
+
+def _attach_related(records):
+    """Load the related rows of a batch of records (keyed by air_id), one query per table."""
+    air_ids = list(records)
+    for air_id, role, name in AutomationPersonRole.objects.filter(
+        automation_id__in=air_ids
+    ).order_by('id').values_list('automation_id', 'role', 'person__name'):
+        records[air_id]['people'].append((role, name))
+    for air_id, env_type, vdi, service_account in Environment.objects.filter(
+        automation_id__in=air_ids
+    ).order_by('id').values_list('automation_id', 'type', 'vdi', 'service_account'):
+        records[air_id]['environments'].append((env_type, vdi, service_account))
+    for air_id, spoc in TestData.objects.filter(automation_id__in=air_ids).values_list('automation_id', 'spoc__name'):
+        records[air_id]['test_data_spoc'] = spoc
+    for metrics in Metrics.objects.filter(automation_id__in=air_ids).values('automation_id', *METRICS_FIELDS):
+        records[metrics.pop('automation_id')]['metrics'] = metrics
+    for artifacts in Artifacts.objects.filter(automation_id__in=air_ids).values('automation_id', *ARTIFACTS_FIELDS):
+        records[artifacts.pop('automation_id')]['artifacts'] = artifacts
+
+
+def iter_records(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield export records (see `csv_mapping.export_row`) in queryset order."""
+    batch = {}
+    rows = queryset.values(*CORE_VALUE_FIELDS, **RELATED_CORE_FIELDS).iterator(chunk_size=chunk_size)
+    for row in rows:
+        row.update(people=[], environments=[])
+        batch[row['air_id']] = row
+        if len(batch) >= chunk_size:
+            _attach_related(batch)
+            yield from batch.values()
+            batch = {}
+    if batch:
+        _attach_related(batch)
+        yield from batch.values()
+
+
+def iter_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield export rows as lists of strings in EXPORT_HEADERS order."""
+    for record in iter_records(queryset, chunk_size):
+        yield export_row(record)
+
+
+def iter_csv(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the CSV as UTF-8 byte chunks, header first."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def drain():
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    writer.writerow(EXPORT_HEADERS)
+    yield drain()
+
+    pending = 0
+    for row in iter_rows(queryset, chunk_size):
+        writer.writerow(row)
+        pending += 1
+        if pending >= ROWS_PER_WRITE:
+            yield drain()
+            pending = 0
+    if pending:
+        yield drain()
+
+
+def iter_xlsx_export(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the export as an XLSX workbook in byte chunks, with metrics as numeric cells."""
+    metrics_headers = {display for display, snake, field, cast in METRICS_COLUMNS}
+    numeric_columns = [i for i, header in enumerate(EXPORT_HEADERS) if header in metrics_headers]
+    return iter_xlsx(EXPORT_HEADERS, iter_rows(queryset, chunk_size), numeric_columns, sheet_name='Automations')
+
+
+def gzip_stream(chunks, level=6):
+    """Gzip-compress an iterable of byte chunks on the fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,267 @@
+"""
+Idempotency-Key support for POST endpoints that create or import rows.
+
+Clients retry on timeouts. Without a key, a retried bulk create fails with
+duplicate AIR IDs after partially succeeding, and a retried import redoes all
+its work. With an `Idempotency-Key` header the first response is stored
+(zlib-compressed) in the idempotency_keys table for TTL seconds, and a retry
+with the same key gets that response back without the request being
+validated or written again.
+
+- A retry while the first request is still running gets 409 Conflict.
+- A key reused for a different request (another endpoint, query string or
+  body) gets 422. The body is hashed as the endpoint streams it, and what it
+  didn't read is hashed afterwards; the hash is stored with the response and
+  a retry's body is hashed (not parsed) and compared before replaying.
+- 5xx responses and unhandled errors aren't stored, so the request can be
+  retried with the same key. Neither are 409 and 429, which may differ on retry.
+- A request still marked as running after IN_FLIGHT_TIMEOUT seconds is
+  assumed to have died with its worker; the next retry runs it again.
+
+Expired keys are removed by `python manage.py cleanup_idempotency_keys`.
+"""
+import functools
+import hashlib
+import json
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+DEFAULT_SETTINGS = {
+    'TTL': 24 * 60 * 60,           # Seconds a response is kept for retries
+    'IN_FLIGHT_TIMEOUT': 15 * 60,  # Seconds before a running request counts as dead
+}
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+READ_SIZE = 64 * 1024
+
+# Responses that may well differ when the request is retried
+UNSTORED_STATUSES = {status.HTTP_409_CONFLICT, status.HTTP_429_TOO_MANY_REQUESTS}
+
+
+def get_config():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'IDEMPOTENCY', {})}
+
+
+class IdempotencyError(Exception):
+    """The key can't be used for this request; respond with status_code and detail."""
+
+    def __init__(self, status_code, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def request_fingerprint(method, path, query_string='', content_type='', content_length='', content_encoding=''):
+    """Hash of what identifies a request besides its body, which is hashed as it is read."""
+    parts = [method.upper(), path, query_string, content_type, str(content_length or ''), content_encoding]
+    return hashlib.sha256('\n'.join(str(part or '') for part in parts).encode()).hexdigest()
+
+
+def should_store(status_code):
+    return status_code < 500 and status_code not in UNSTORED_STATUSES
+
+
+class HashingStream:
+    """
+    Wraps a request body stream so everything read through it is hashed;
+    `drain` reads (and hashes) whatever the endpoint left unread.
+    """
+
+    def __init__(self, stream, data=b''):
+        self.stream = stream
+        self.digest = hashlib.sha256(data)
+
+    def read(self, *args):
+        return self._update(self.stream.read(*args) if self.stream is not None else b'')
+
+    def readline(self, *args):
+        return self._update(self.stream.readline(*args) if self.stream is not None else b'')
+
+    def _update(self, data):
+        self.digest.update(data)
+        return data
+
+    def drain(self):
+        for _ in iter(lambda: self.read(READ_SIZE), b''):
+            pass
+
+    def hexdigest(self):
+        return self.digest.hexdigest()
+
+
+def _hash_request_body(django_request):
+    """Route a Django request's body through a HashingStream before anything parses it."""
+    if hasattr(django_request, '_body'):
+        # Already read in full, e.g. by a middleware accessing request.body
+        return HashingStream(None, django_request._body)
+    stream = HashingStream(django_request._stream)
+    django_request._stream = stream
+    return stream
+
+
+def begin(key, scope, fingerprint):
+    """
+    Claim an idempotency key before running a request.
+
+    Args:
+        key: The Idempotency-Key header value
+        scope: Method and path of the endpoint, e.g. 'POST /api/automations/'
+        fingerprint: request_fingerprint() of the request
+
+    Returns:
+        tuple: (record, None) when the request should run, and be passed to
+        `complete` or `release` afterwards; (None, record) when a stored
+        response should be replayed with `stored_response`
+
+    Raises:
+        IdempotencyError: For an invalid key, a request still in flight (409)
+        or a key used with a different request (422)
+    """
+    if not key.strip() or len(key) > MAX_KEY_LENGTH:
+        raise IdempotencyError(
+            status.HTTP_400_BAD_REQUEST,
+            f'{HEADER} must be between 1 and {MAX_KEY_LENGTH} characters'
+        )
+
+    config = get_config()
+    now = timezone.now()
+    record = IdempotencyKey.objects.filter(key=key, scope=scope).first()
+    if record is None:
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    key=key,
+                    scope=scope,
+                    fingerprint=fingerprint,
+                    expires_at=now + timedelta(seconds=config['TTL'])
+                )
+            return record, None
+        except IntegrityError:
+            # A concurrent request with the same key got there first
+            record = IdempotencyKey.objects.filter(key=key, scope=scope).first()
+            if record is None:
+                return begin(key, scope, fingerprint)
+
+    expired = record.expires_at <= now
+    stale = record.status_code is None and record.started_at <= now - timedelta(seconds=config['IN_FLIGHT_TIMEOUT'])
+    if expired or stale:
+        # Take the key over; the conditional update lets only one retry win
+        claimed = IdempotencyKey.objects.filter(pk=record.pk, started_at=record.started_at).update(
+            fingerprint=fingerprint,
+            body_hash='',
+            status_code=None,
+            response_body=None,
+            started_at=now,
+            expires_at=now + timedelta(seconds=config['TTL'])
+        )
+        if claimed:
+            record.refresh_from_db()
+            return record, None
+        record.refresh_from_db()
+
+    if record.fingerprint != fingerprint:
+        raise IdempotencyError(
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            f'{HEADER} {key!r} was already used for a different request'
+        )
+    if record.status_code is None:
+        raise IdempotencyError(
+            status.HTTP_409_CONFLICT,
+            f'A request with {HEADER} {key!r} is still in progress; retry later'
+        )
+    return None, record
+
+
+def complete(record, status_code, data, body_hash):
+    """
+    Store the response of a claimed request with the SHA-256 of its request
+    body, or release the key if the response shouldn't be replayed.
+    """
+    if not should_store(status_code):
+        release(record)
+        return
+    body = json.dumps(data, cls=DjangoJSONEncoder).encode() if data is not None else b''
+    IdempotencyKey.objects.filter(pk=record.pk).update(
+        status_code=status_code,
+        response_body=zlib.compress(body),
+        body_hash=body_hash
+    )
+
+
+def check_body(record, body_hash):
+    """Raise IdempotencyError (422) if a retry's body differs from the stored request's."""
+    if record.body_hash != body_hash:
+        raise IdempotencyError(
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            f'{HEADER} {record.key!r} was already used for a request with a different body'
+        )
+
+
+def release(record):
+    """Forget a claimed key so the request can be retried with it."""
+    IdempotencyKey.objects.filter(pk=record.pk, status_code__isnull=True).delete()
+
+
+def stored_response(record):
+    """The (status_code, data) stored for a completed request; data is None for an empty body."""
+    body = zlib.decompress(bytes(record.response_body)) if record.response_body else b''
+    return record.status_code, json.loads(body) if body else None
+
+
+def idempotent(view_method):
+    """
+    Decorator for DRF view methods: honours an Idempotency-Key request header
+    as described above. Replayed responses carry `Idempotent-Replayed: true`.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view_method(self, request, *args, **kwargs)
+
+        fingerprint = request_fingerprint(
+            request.method,
+            request.path,
+            request.META.get('QUERY_STRING', ''),
+            request.META.get('CONTENT_TYPE', ''),
+            request.META.get('CONTENT_LENGTH', ''),
+            request.META.get('HTTP_CONTENT_ENCODING', '')
+        )
+        body = _hash_request_body(request._request)
+        try:
+            record, replay = begin(key, f'{request.method} {request.path}', fingerprint)
+            if replay is not None:
+                body.drain()
+                check_body(replay, body.hexdigest())
+        except IdempotencyError as e:
+            return Response({'error': e.detail}, status=e.status_code)
+
+        if replay is not None:
+            status_code, data = stored_response(replay)
+            return Response(data, status=status_code, headers={REPLAYED_HEADER: 'true'})
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+            if isinstance(response, Response) and should_store(response.status_code):
+                body.drain()
+        except BaseException:
+            release(record)
+            raise
+        if isinstance(response, Response):
+            complete(record, response.status_code, response.data, body.hexdigest())
+        else:
+            release(record)  # Streamed responses can't be stored
+        return response
+    return wrapper
@@ -0,0 +1,413 @@
+"""
+Command-line client importing a CSV file through the REST API.
+
+    cd backend
+    python -m automations.import_client ../samples/example_automation_data.csv \\
+        --url http://127.0.0.1:8000 --endpoint upsert --concurrency 4
+
+Rows are parsed with the csv module and the shared column mapping and sent
+BATCH_SIZE at a time to the bulk create or upsert endpoint, in isolated mode
+so that a bad row only fails itself. Up to CONCURRENCY batches are in flight
+at once. Network errors, timeouts, 5xx, 409 and 429 responses are retried
+with exponential backoff. Each batch carries an Idempotency-Key, so a retry of
+a batch the server did finish gets its stored response instead of writing
+again.
+
+Finished batches are recorded in a checkpoint file next to the CSV; after an
+interrupted run, running the same command again resumes after them. The
+checkpoint is removed once every batch has gone through.
+
+Like csv_mapping, this module has no Django imports; it only needs httpx.
+"""
+import argparse
+import asyncio
+import csv
+import gzip
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+import httpx
+
+from .csv_mapping import missing_required_columns, row_to_automation
+
+
+DEFAULT_URL = 'http://127.0.0.1:8000'
+
+ENDPOINTS = {
+    'bulk': '/api/automations/bulk_create/',
+    'upsert': '/api/automations/upsert/',
+}
+
+BATCH_SIZE = 500
+CONCURRENCY = 4
+MAX_RETRIES = 5
+TIMEOUT = 120     # Seconds per request
+BACKOFF = 0.5     # Seconds before the first retry; doubles after each one
+MAX_BACKOFF = 30
+
+# 409 is an Idempotency-Key whose first request is still running
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class ImportClientError(Exception):
+    """An import that can't start (e.g. a stale checkpoint) or a batch that couldn't be sent."""
+    pass
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_batches(path, batch_size, rejected):
+    """
+    Yield (batch number, [(row number, automation payload), ...]) from a CSV file.
+
+    Rows the column mapping can't convert are appended to `rejected` and not
+    sent. Batches only depend on the file and batch_size, so batch numbers
+    stay the same when an import is resumed.
+    """
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.DictReader(f)
+        missing = missing_required_columns(reader.fieldnames)
+        if missing:
+            raise ImportClientError(f"Missing required columns: {', '.join(missing)}")
+
+        batch = []
+        number = 0
+        for row_number, row in enumerate(reader, start=1):
+            try:
+                batch.append((row_number, row_to_automation(row)))
+            except ValueError as e:
+                rejected.append({'row': row_number, 'air_id': (row.get('AIR ID') or row.get('air_id') or '').strip(), 'errors': str(e)})
+                continue
+            if len(batch) == batch_size:
+                yield number, batch
+                number += 1
+                batch = []
+        if batch:
+            yield number, batch
+
+
+class Checkpoint:
+    """
+    Batches of one import that are done, saved as JSON after each one.
+
+    Also holds the run id that makes the batches' idempotency keys unique,
+    so a resumed run sends the same keys as the interrupted one.
+    """
+
+    def __init__(self, path, digest, endpoint, batch_size, restart=False):
+        self.path = path
+        self.state = None
+        if path and os.path.exists(path) and not restart:
+            with open(path) as f:
+                self.state = json.load(f)
+            if (self.state.get('digest'), self.state.get('endpoint'), self.state.get('batch_size')) != (digest, endpoint, batch_size):
+                raise ImportClientError(
+                    f'Checkpoint {path} belongs to another file, endpoint or batch size; '
+                    f'pass --restart to discard it'
+                )
+        if self.state is None:
+            self.state = {
+                'digest': digest,
+                'endpoint': endpoint,
+                'batch_size': batch_size,
+                'run_id': uuid.uuid4().hex,
+                'batches': {},
+            }
+
+    @property
+    def run_id(self):
+        return self.state['run_id']
+
+    def batch(self, number):
+        return self.state['batches'].get(str(number))
+
+    def record(self, number, result):
+        self.state['batches'][str(number)] = result
+        self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(temp_path, self.path)
+
+    def remove(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class ImportStats:
+    """Counters for the throughput report."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.rows = 0          # Rows sent and answered in this run
+        self.resumed_rows = 0  # Rows of batches finished by an earlier run
+        self.batches = 0
+        self.requests = 0
+        self.retries = 0
+        self.failed_batches = []
+        self.counts = {}
+        self.errors = []
+        self.latencies = []    # Seconds per batch, retries included
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def add_result(self, result):
+        for key, count in result['counts'].items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        self.errors += result['errors']
+
+    def percentile(self, fraction):
+        latencies = sorted(self.latencies)
+        return latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] if latencies else 0
+
+
+class ImportClient:
+    """
+    Sends the batches of a CSV file to the API with bounded concurrency.
+
+    Args:
+        base_url: Backend URL, e.g. http://127.0.0.1:8000
+        endpoint: 'bulk' (create only) or 'upsert' (insert or update on AIR ID)
+        compress: Send gzip-encoded bodies
+        transport: httpx transport to use instead of the network, for tests
+    """
+
+    def __init__(self, base_url=DEFAULT_URL, endpoint='upsert', batch_size=BATCH_SIZE, concurrency=CONCURRENCY,
+                 max_retries=MAX_RETRIES, timeout=TIMEOUT, backoff=BACKOFF, compress=False, progress=None,
+                 transport=None):
+        if endpoint not in ENDPOINTS:
+            raise ImportClientError(f"Unknown endpoint '{endpoint}'; choose from {', '.join(ENDPOINTS)}")
+        if compress and endpoint != 'bulk':
+            raise ImportClientError('Compressed bodies are only accepted by the bulk endpoint')
+        self.base_url = base_url.rstrip('/')
+        self.endpoint = endpoint
+        self.batch_size = max(batch_size, 1)
+        self.concurrency = max(concurrency, 1)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.compress = compress
+        self.progress = progress
+        self.transport = transport
+
+    def import_file(self, path, checkpoint_path=None, restart=False):
+        """Import a CSV file; see `run`."""
+        return asyncio.run(self.run(path, checkpoint_path, restart))
+
+    async def run(self, path, checkpoint_path=None, restart=False):
+        """
+        Import a CSV file, resuming from its checkpoint if there is one.
+
+        Returns:
+            ImportStats: Totals of this run and the resumed one
+        """
+        if not os.path.exists(path):
+            raise ImportClientError(f'File not found: {path}')
+        checkpoint = Checkpoint(
+            checkpoint_path, file_digest(path), self.endpoint, self.batch_size, restart=restart
+        )
+        checkpoint.save()  # Keeps the run id even if no batch gets through
+        stats = ImportStats()
+        rejected = []
+
+        # Bounded, so the file is read only as fast as batches are sent
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        async with httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.concurrency),
+            transport=self.transport
+        ) as client:
+            workers = [
+                asyncio.create_task(self._worker(client, queue, checkpoint, stats))
+                for _ in range(self.concurrency)
+            ]
+            try:
+                for number, batch in read_batches(path, self.batch_size, rejected):
+                    done = checkpoint.batch(number)
+                    if done is not None:
+                        stats.resumed_rows += len(batch)
+                        stats.add_result(done)
+                        continue
+                    await queue.put((number, batch))
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                for worker in workers:
+                    worker.cancel()
+
+        stats.errors = rejected + sorted(stats.errors, key=lambda error: error['row'] or 0)
+        if not stats.failed_batches:
+            checkpoint.remove()
+        return stats
+
+    async def _worker(self, client, queue, checkpoint, stats):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            number, batch = item
+            start = time.perf_counter()
+            try:
+                result = await self._send(client, number, batch, checkpoint.run_id, stats)
+            except Exception as e:
+                # Left out of the checkpoint, so a rerun sends it again
+                stats.failed_batches.append({'batch': number, 'rows': [batch[0][0], batch[-1][0]], 'error': str(e)})
+                continue
+            stats.latencies.append(time.perf_counter() - start)
+            stats.rows += len(batch)
+            stats.batches += 1
+            stats.add_result(result)
+            checkpoint.record(number, result)
+            if self.progress:
+                self.progress(stats)
+
+    async def _send(self, client, number, batch, run_id, stats):
+        """POST one batch, retrying transient failures; returns its counts and row errors."""
+        body = json.dumps([automation for row_number, automation in batch]).encode()
+        headers = {
+            'Content-Type': 'application/json',
+            'Idempotency-Key': f'import-{run_id}-{number}',
+        }
+        if self.compress:
+            body = gzip.compress(body, mtime=0)
+            headers['Content-Encoding'] = 'gzip'
+
+        attempt = 0
+        while True:
+            stats.requests += 1
+            retry_after = None
+            try:
+                response = await client.post(f'{ENDPOINTS[self.endpoint]}?mode=isolated', content=body, headers=headers)
+            except httpx.TransportError as e:
+                error = f'{type(e).__name__}: {e}'
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    return self._batch_result(response, batch)
+                error = f'HTTP {response.status_code}: {response.text[:200]}'
+                retry_after = response.headers.get('Retry-After')
+
+            if attempt >= self.max_retries:
+                raise ImportClientError(f'Gave up after {attempt + 1} attempts; last error: {error}')
+            attempt += 1
+            stats.retries += 1
+            await asyncio.sleep(self._delay(attempt, retry_after))
+
+    def _delay(self, attempt, retry_after=None):
+        if retry_after and retry_after.isdigit():
+            return min(int(retry_after), MAX_BACKOFF)
+        # Full jitter, so concurrent batches don't retry in lockstep
+        return random.uniform(0, min(self.backoff * 2 ** (attempt - 1), MAX_BACKOFF))
+
+    @staticmethod
+    def _batch_result(response, batch):
+        if response.status_code not in (200, 207):
+            raise ImportClientError(f'HTTP {response.status_code}: {response.text[:500]}')
+        data = response.json()
+        errors = [
+            {
+                'row': batch[error['index']][0] if error['index'] < len(batch) else None,
+                'air_id': error.get('air_id'),
+                'errors': error['errors'],
+            }
+            for error in data.get('errors', [])
+        ]
+        return {'counts': data.get('counts', {}), 'errors': errors}
+
+
+def format_report(stats, client):
+    """Summary lines for the end of an import."""
+    rate = stats.rows / stats.elapsed if stats.elapsed else 0
+    lines = [
+        f"{'✓' if not stats.failed_batches else '✗'} {stats.rows} rows in {stats.batches} batches in "
+        f"{stats.elapsed:.2f}s ({rate:.0f} rows/s, {client.concurrency} in flight)",
+    ]
+    if stats.resumed_rows:
+        lines.append(f"  {stats.resumed_rows} rows were already imported by the interrupted run")
+    if stats.counts:
+        lines.append('  ' + ', '.join(f'{count} {status}' for status, count in sorted(stats.counts.items())))
+    lines.append(
+        f"  {stats.requests} requests, {stats.retries} retries, batch latency "
+        f"p50 {stats.percentile(0.5) * 1000:.0f}ms / p95 {stats.percentile(0.95) * 1000:.0f}ms"
+    )
+    for error in stats.errors[:20]:
+        lines.append(f"  ⚠ Row {error['row']} ({error['air_id']}): {error['errors']}")
+    if len(stats.errors) > 20:
+        lines.append(f"  ⚠ ... and {len(stats.errors) - 20} more rejected rows")
+    for failed in stats.failed_batches:
+        lines.append(f"  ✗ Batch {failed['batch']} (rows {failed['rows'][0]}-{failed['rows'][1]}): {failed['error']}")
+    if stats.failed_batches:
+        lines.append('  Run the same command again to retry the failed batches')
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m automations.import_client',
+        description='Import automations from a CSV file through the REST API'
+    )
+    parser.add_argument('path', help='CSV file to import')
+    parser.add_argument('--url', default=os.environ.get('BACKEND_URL', DEFAULT_URL),
+                        help=f'Backend URL (default: $BACKEND_URL or {DEFAULT_URL})')
+    parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='upsert',
+                        help='bulk creates new automations only; upsert also updates existing ones (default: upsert)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help=f'Rows per request (default: {BATCH_SIZE})')
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY,
+                        help=f'Requests in flight at once (default: {CONCURRENCY})')
+    parser.add_argument('--max-retries', type=int, default=MAX_RETRIES,
+                        help=f'Retries per batch after a failed request (default: {MAX_RETRIES})')
+    parser.add_argument('--timeout', type=float, default=TIMEOUT, help=f'Seconds per request (default: {TIMEOUT})')
+    parser.add_argument('--gzip', action='store_true', help='Send gzip-compressed request bodies (bulk endpoint only)')
+    parser.add_argument('--checkpoint', help='Checkpoint file (default: <path>.checkpoint.json)')
+    parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint and import every batch')
+    options = parser.parse_args(argv)
+
+    def progress(stats):
+        rate = stats.rows / stats.elapsed if stats.elapsed else 0
+        print(f"  {stats.rows} rows, {rate:.0f} rows/s, {stats.retries} retries...", end='\r', flush=True)
+
+    try:
+        client = ImportClient(
+            options.url,
+            endpoint=options.endpoint,
+            batch_size=options.batch_size,
+            concurrency=options.concurrency,
+            max_retries=options.max_retries,
+            timeout=options.timeout,
+            compress=options.gzip,
+            progress=progress
+        )
+        stats = client.import_file(
+            options.path,
+            checkpoint_path=options.checkpoint or f'{options.path}.checkpoint.json',
+            restart=options.restart
+        )
+    except ImportClientError as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 2
+
+    print('\r' + ' ' * 60 + '\r' + '\n'.join(format_report(stats, client)))
+    return 1 if stats.failed_batches or stats.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
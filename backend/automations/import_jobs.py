@@ -0,0 +1,281 @@
+"""
+Background CSV import jobs.
+
+An upload is streamed to disk and recorded as a queued `ImportJob`, so the
+HTTP request returns immediately however large the file is. Jobs run on a
+small thread pool inside the backend process or, with RUN_IN_PROCESS
+disabled, in the `run_import_jobs` worker command. Progress is written to the
+job after every committed chunk, and cancellation is checked at the same point.
+
+A running job also writes a heartbeat from a timer thread, so a slow chunk
+doesn't make it look dead. A running job without one for STALE_AFTER seconds
+is taken to have died with its process and `recover_jobs` queues it again;
+imports are upserts, so the chunks it had already committed come out
+unchanged the second time. Every write of a run is tied to the attempt that
+claimed the job, so a run that was recovered while still alive stops at its
+next chunk instead of racing the new one. After MAX_ATTEMPTS starts, or when its
+upload is gone, it is marked as failed instead. The worker command recovers
+jobs on every poll; with in-process jobs, listing or polling jobs does, at
+most every RECOVERY_INTERVAL seconds, and also restarts queued jobs that
+were left behind by a restarted web process.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .csv_import import ImportCancelled, decoded_lines, import_csv
+from .models import ImportJob
+
+
+DEFAULT_SETTINGS = {
+    'DIR': 'import_jobs',    # Where uploads are kept until their job finishes
+    'RUN_IN_PROCESS': True,  # Run jobs on a thread pool in the web process
+    'WORKERS': 2,            # Thread pool size
+    'PARSE_WORKERS': 0,      # Processes parsing and validating rows per job
+    'STALE_AFTER': 10 * 60,  # Seconds without progress before a running job counts as dead
+    'MAX_ATTEMPTS': 3,       # Starts before a job whose worker keeps dying is failed
+}
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+RECOVERY_INTERVAL = 60
+HEARTBEATS_PER_STALE_AFTER = 3
+
+
+class ImportJobLost(Exception):
+    """Raised in a run whose job was recovered and handed to another run."""
+
+
+def _config():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'IMPORT_JOBS', {})}
+
+
+def store_upload(chunks):
+    """
+    Write an upload (iterable of byte chunks) to the import jobs directory.
+
+    Returns:
+        str: Path of the stored file
+    """
+    directory = _config()['DIR']
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{uuid.uuid4().hex}.csv')
+    try:
+        with open(path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+    except BaseException:
+        # E.g. a compressed body that turned out to be corrupt or too large
+        _remove_upload(path)
+        raise
+    return path
+
+
+def create_job(chunks, file_name=None, chunk_size=None, isolate_errors=False):
+    """Store an upload, queue an ImportJob for it and start it when running in process."""
+    job = ImportJob.objects.create(
+        file_name=file_name,
+        file_path=store_upload(chunks),
+        chunk_size=chunk_size or ImportJob._meta.get_field('chunk_size').default,
+        isolate_errors=isolate_errors,
+    )
+    if _config()['RUN_IN_PROCESS']:
+        get_import_executor().submit(_run_in_thread, job.id)
+    return job
+
+
+def _remove_upload(path):
+    try:
+        os.remove(path)
+    except OSError as e:
+        print(f"Failed to remove import upload {path}: {e}")
+
+
+def request_cancel(job):
+    """
+    Cancel a job. Queued jobs are cancelled at once, running ones stop after
+    their current chunk.
+
+    Returns:
+        bool: False if the job had already finished
+    """
+    if ImportJob.objects.filter(pk=job.pk, status='queued').update(
+        status='cancelled', cancel_requested=True, finished_at=timezone.now()
+    ):
+        _remove_upload(job.file_path)
+        return True
+    return bool(ImportJob.objects.filter(pk=job.pk, status='running').update(cancel_requested=True))
+
+
+def run_job(job_id):
+    """
+    Run a queued job to completion in the calling thread.
+
+    Returns:
+        bool: False if the job wasn't queued (already claimed, finished or
+        cancelled) or was recovered and handed to another run meanwhile
+    """
+    # Claim atomically so in-process threads and worker commands never run a job twice
+    now = timezone.now()
+    if not ImportJob.objects.filter(pk=job_id, status='queued').update(
+        status='running', started_at=now, heartbeat_at=now, attempts=F('attempts') + 1
+    ):
+        return False
+    job = ImportJob.objects.get(pk=job_id)
+    # Every later write goes through this, so it only lands while this run owns the job
+    claimed = ImportJob.objects.filter(pk=job_id, status='running', attempts=job.attempts)
+
+    def progress(result):
+        if not claimed.update(
+            heartbeat_at=timezone.now(),
+            rows_processed=result['rows'],
+            inserted=result['inserted'],
+            updated=result['updated'],
+            unchanged=result['unchanged'],
+        ):
+            raise ImportJobLost()
+        if claimed.filter(cancel_requested=True).exists():
+            raise ImportCancelled()
+
+    stop_heartbeat = threading.Event()
+    heartbeat = threading.Thread(
+        target=_beat, args=(claimed, stop_heartbeat), name=f'import-job-{job_id}-heartbeat', daemon=True
+    )
+    heartbeat.start()
+    outcome = {'status': 'completed'}
+    try:
+        with open(job.file_path, 'rb') as f:
+            result = import_csv(
+                decoded_lines(f), chunk_size=job.chunk_size, progress=progress, isolate=job.isolate_errors,
+                workers=_config()['PARSE_WORKERS']
+            )
+        outcome.update(
+            rows_processed=result['rows'],
+            inserted=result['inserted'],
+            updated=result['updated'],
+            unchanged=result['unchanged'],
+        )
+        if result['errors']:
+            outcome.update(
+                # Skipped rows don't fail an isolated import; they're reported in errors
+                status='completed' if job.isolate_errors else 'failed',
+                errors=result['errors'],
+                error_message=f"{len(result['errors'])} invalid rows",
+            )
+    except ImportCancelled:
+        outcome['status'] = 'cancelled'
+    except ImportJobLost:
+        return False
+    except Exception as e:
+        outcome.update(status='failed', error_message=str(e))
+    finally:
+        stop_heartbeat.set()
+        heartbeat.join()
+
+    if not claimed.update(finished_at=timezone.now(), **outcome):
+        # Recovered meanwhile; the upload now belongs to whoever has the job
+        return False
+    _remove_upload(job.file_path)
+    return True
+
+
+def _beat(claimed, stop):
+    """Keep a claimed job's heartbeat fresh until `stop` is set or the job is lost."""
+    interval = _config()['STALE_AFTER'] / HEARTBEATS_PER_STALE_AFTER
+    try:
+        while not stop.wait(interval):
+            if not claimed.update(heartbeat_at=timezone.now()):
+                return
+    except Exception as e:
+        print(f"Import job heartbeat failed: {e}")
+    finally:
+        connection.close()
+
+
+def recover_jobs():
+    """
+    Requeue (or fail, or cancel) running jobs whose process has died and, with
+    in-process jobs, start queued ones that no thread pool is going to run.
+
+    Returns:
+        int: Number of stale jobs recovered
+    """
+    config = _config()
+    cutoff = timezone.now() - timedelta(seconds=config['STALE_AFTER'])
+    stale = ImportJob.objects.filter(status='running').filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+
+    recovered = 0
+    for job in stale:
+        if job.cancel_requested:
+            outcome = {'status': 'cancelled', 'finished_at': timezone.now()}
+        elif job.attempts >= config['MAX_ATTEMPTS'] or not os.path.exists(job.file_path):
+            outcome = {
+                'status': 'failed',
+                'finished_at': timezone.now(),
+                'error_message': f'The import stopped responding after {job.attempts} attempts'
+                if job.attempts >= config['MAX_ATTEMPTS'] else 'The import stopped responding and its upload is gone',
+            }
+        else:
+            outcome = {'status': 'queued', 'started_at': None, 'heartbeat_at': None}
+        # Only if the job hasn't made progress in the meantime
+        if ImportJob.objects.filter(pk=job.pk, status='running', heartbeat_at=job.heartbeat_at).update(**outcome):
+            recovered += 1
+            if outcome['status'] != 'queued' and os.path.exists(job.file_path):
+                _remove_upload(job.file_path)
+
+    if config['RUN_IN_PROCESS']:
+        # Claiming is atomic, so a job another process is also about to run is skipped
+        for job_id in ImportJob.objects.filter(status='queued').order_by('id').values_list('id', flat=True):
+            get_import_executor().submit(_run_in_thread, job_id)
+    return recovered
+
+
+_recovered_at = None
+
+
+def recover_jobs_if_due():
+    """`recover_jobs` at most once every RECOVERY_INTERVAL seconds per process."""
+    global _recovered_at
+    now = time.monotonic()
+    if _recovered_at is not None and now - _recovered_at < RECOVERY_INTERVAL:
+        return
+    _recovered_at = now
+    try:
+        recover_jobs()
+    except Exception as e:
+        print(f"Import job recovery failed: {e}")
+
+
+def _run_in_thread(job_id):
+    try:
+        run_job(job_id)
+    except Exception as e:
+        print(f"Import job {job_id} crashed: {e}")
+    finally:
+        # Pool threads outlive the job; don't leave a connection open on each
+        connection.close()
+
+
+_import_executor = None
+_import_executor_lock = threading.Lock()
+
+
+def get_import_executor():
+    """Return the process-wide thread pool running import jobs."""
+    global _import_executor
+    if _import_executor is None:
+        with _import_executor_lock:
+            if _import_executor is None:
+                _import_executor = ThreadPoolExecutor(
+                    max_workers=_config()['WORKERS'], thread_name_prefix='import-job'
+                )
+    return _import_executor
@@ -0,0 +1,151 @@
+"""
+Dry run of an import: how each incoming row would change the database.
+
+Rows are validated, resolved and hashed exactly as `upsert_automations` does,
+except that unknown tools and people aren't created, and then compared with
+the stored content hashes using bulk IN lookups. Field-level diffs are only
+computed for changed rows, from set-based loads of their stored records.
+Nothing is written.
+"""
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import as_serializer_error
+
+from .bulk import NameCache, chunked, classify_prepared, prepare_rows, split_nested
+from .csv_mapping import CORE_COLUMNS
+from .export import ARTIFACTS_FIELDS, METRICS_FIELDS, iter_records
+from .models import Artifacts, Automation, Metrics, normalize_name
+from .serializers import AutomationUpsertSerializer
+
+
+# Payload fields compared as plain values (tool_name and modified_by_name included)
+CORE_DIFF_FIELDS = [field for display, snake, field in CORE_COLUMNS if field != 'air_id']
+
+MAX_MISSING = 1000  # Stored automations absent from the input listed in the response
+
+
+def _incoming_record(core, nested):
+    """A validated upsert row in the record format of `export.iter_records`."""
+    record = dict(core, tool_name=nested['tool_name'], modified_by_name=nested['modified_by_name'])
+    record['people'] = [
+        (person['role'], person['name'])
+        for person in nested['people_data'] or [] if person.get('name') and person.get('role')
+    ]
+    record['environments'] = [
+        (env['type'], env.get('vdi', ''), env.get('service_account', ''))
+        for env in nested['environments_data'] or [] if env.get('type')
+    ]
+    record['test_data_spoc'] = (nested['test_data_data'] or {}).get('spoc')
+    metrics = nested['metrics_data'] or {}
+    record['metrics'] = {field: metrics.get(field) for field in METRICS_FIELDS} if any(metrics.values()) else None
+    artifacts = nested['artifacts_data'] or {}
+    record['artifacts'] = {field: artifacts.get(field) for field in ARTIFACTS_FIELDS} if any(artifacts.values()) else None
+    return record
+
+
+def _comparable(record):
+    """(field -> value to compare, field -> value to show) for a record, in payload field names."""
+    shown = {field: record.get(field) for field in CORE_DIFF_FIELDS}
+    compared = {}
+    for field, value in shown.items():
+        if field == 'modified_by_name':
+            compared[field] = normalize_name(value) if value else None
+        elif field == 'tool_name' or value in (None, ''):
+            compared[field] = value or None
+        else:
+            compared[field] = Automation._meta.get_field(field).to_python(value)
+
+    people = sorted(record['people'], key=lambda person: (person[0], normalize_name(person[1])))
+    shown['people_data'] = [{'name': name, 'role': role} for role, name in people]
+    compared['people_data'] = [(role, normalize_name(name)) for role, name in people]
+
+    environments = sorted((env_type, vdi or '', service_account or '') for env_type, vdi, service_account in record['environments'])
+    shown['environments_data'] = [
+        {'type': env_type, 'vdi': vdi, 'service_account': service_account}
+        for env_type, vdi, service_account in environments
+    ]
+    compared['environments_data'] = environments
+
+    spoc = record.get('test_data_spoc')
+    shown['test_data_data'] = {'spoc': spoc} if spoc else {}
+    compared['test_data_data'] = normalize_name(spoc) if spoc else None
+
+    for field, model, values in [
+        ('metrics_data', Metrics, record.get('metrics')),
+        ('artifacts_data', Artifacts, record.get('artifacts')),
+    ]:
+        values = {key: value for key, value in (values or {}).items() if value is not None}
+        shown[field] = values
+        compared[field] = {key: model._meta.get_field(key).to_python(value) for key, value in values.items()}
+    return compared, shown
+
+
+def _diff(stored, incoming):
+    stored_compared, stored_shown = _comparable(stored)
+    incoming_compared, incoming_shown = _comparable(incoming)
+    return {
+        field: {'old': stored_shown[field], 'new': incoming_shown[field]}
+        for field in stored_compared
+        if stored_compared[field] != incoming_compared[field]
+    }
+
+
+def preview_import(rows, max_missing=MAX_MISSING):
+    """
+    Classify raw upsert rows without writing anything.
+
+    Args:
+        rows: List of payload dicts in AutomationUpsertSerializer format
+        max_missing: Missing automations to list, or None for all of them
+
+    Returns:
+        dict: 'rows' with one {'index', 'air_id', 'status'} per input row, where
+        status is 'new', 'changed' (with 'changes' as {field: {'old', 'new'}}),
+        'unchanged', 'invalid' (with 'errors') or 'duplicate' (an AIR ID that a
+        later row overrides); 'missing' with up to `max_missing` stored
+        automations the input doesn't mention; and a 'summary' of counts
+    """
+    results = []
+    valid = {}  # air_id -> (index, validated row); the last row for an AIR ID wins, as in upserts
+
+    # One instance validates every row, as ListSerializer does
+    validator = AutomationUpsertSerializer()
+    for index, row in enumerate(rows):
+        air_id = row.get('air_id') if isinstance(row, dict) else None
+        results.append({'index': index, 'air_id': air_id})
+        try:
+            data = validator.run_validation(row)
+        except ValidationError as e:
+            results[index].update(status='invalid', errors=as_serializer_error(e))
+            continue
+        if data['air_id'] in valid:
+            results[valid[data['air_id']][0]]['status'] = 'duplicate'
+        valid[data['air_id']] = (index, data)
+
+    names = NameCache()
+    changed = {}
+    items = list(valid.values())
+    for chunk in chunked(items):
+        split_rows = [split_nested(dict(data)) for _, data in chunk]
+        prepared = prepare_rows(split_rows, names, create=False)
+        for (index, data), (core, nested), status in zip(chunk, split_rows, classify_prepared(prepared)):
+            results[index]['status'] = 'unchanged' if status == 'unhashed' else status
+            if status == 'changed':
+                changed[data['air_id']] = (index, _incoming_record(core, nested))
+
+    for chunk in chunked(list(changed)):
+        for stored in iter_records(Automation.objects.filter(air_id__in=chunk)):
+            index, incoming = changed[stored['air_id']]
+            results[index]['changes'] = _diff(stored, incoming)
+
+    missing = []
+    missing_count = 0
+    for air_id, name in Automation.objects.order_by('air_id').values_list('air_id', 'name').iterator(chunk_size=5000):
+        if air_id not in valid:
+            missing_count += 1
+            if max_missing is None or len(missing) < max_missing:
+                missing.append({'air_id': air_id, 'name': name})
+
+    summary = {'total': len(rows), 'missing': missing_count}
+    for status in ('new', 'changed', 'unchanged', 'invalid', 'duplicate'):
+        summary[status] = sum(1 for result in results if result['status'] == status)
+    return {'summary': summary, 'rows': results, 'missing': missing}
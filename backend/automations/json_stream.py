@@ -0,0 +1,198 @@
+"""
+Incremental parsing of bulk request bodies.
+
+Bulk endpoints accept bodies of up to 100 MB. `json.load` would hold the raw
+text and the whole parsed list at once; the decoders here return each array
+element as soon as it is complete, so rows can be validated and written a
+chunk at a time. Both a plain JSON array and NDJSON (one object per line,
+`application/x-ndjson`) are supported, optionally gzip/zstd-compressed
+(see `decompression`).
+"""
+import codecs
+import json
+import re
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from .decompression import decompressed
+
+
+READ_SIZE = 64 * 1024
+
+# Characters of a single unfinished element kept in the buffer before giving up
+MAX_ELEMENT_SIZE = 10 * 1024 * 1024
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class JSONArrayDecoder:
+    """
+    Push decoder for a top-level JSON array.
+
+    `feed` takes text as it arrives and yields the elements it completed.
+    Raises ValueError on malformed input, after yielding the elements before it.
+    """
+
+    def __init__(self, max_element_size=MAX_ELEMENT_SIZE):
+        self.max_element_size = max_element_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.state = 'start'  # start -> first -> (separator <-> value) -> end
+        self.count = 0
+
+    def feed(self, text, final=False):
+        buffer = self.buffer + text
+        pos = 0
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos == len(buffer):
+                break
+
+            if self.state == 'start':
+                if buffer[pos] != '[':
+                    raise ValueError('Expected a JSON array')
+                pos += 1
+                self.state = 'first'
+            elif self.state == 'separator':
+                if buffer[pos] not in ',]':
+                    raise ValueError(f"Expected ',' or ']' after element {self.count - 1}")
+                self.state = 'value' if buffer[pos] == ',' else 'end'
+                pos += 1
+            elif self.state == 'end':
+                raise ValueError('Unexpected data after the JSON array')
+            elif self.state == 'first' and buffer[pos] == ']':
+                pos += 1
+                self.state = 'end'
+            else:
+                try:
+                    value, end = self.decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError as e:
+                    if final:
+                        raise ValueError(f'Invalid JSON in element {self.count}: {e.msg}')
+                    break  # Most likely incomplete; wait for more text
+                if not final and (end == len(buffer) or (_is_number(value) and buffer[end] in '.eE+-')):
+                    break  # A number could still continue in the next read
+                yield value
+                self.count += 1
+                pos = end
+                self.state = 'separator'
+
+        self.buffer = buffer[pos:]
+        if len(self.buffer) > self.max_element_size:
+            raise ValueError(f'Element {self.count} is larger than {self.max_element_size} characters')
+        if final and self.state != 'end':
+            raise ValueError('Unexpected end of JSON array')
+
+
+class NDJSONDecoder:
+    """Push decoder for newline-delimited JSON; blank lines are skipped."""
+
+    def __init__(self, max_element_size=MAX_ELEMENT_SIZE):
+        self.max_element_size = max_element_size
+        self.buffer = ''
+        self.line = 0
+
+    def feed(self, text, final=False):
+        lines = (self.buffer + text).split('\n')
+        self.buffer = '' if final else lines.pop()
+        if len(self.buffer) > self.max_element_size:
+            raise ValueError(f'Line {self.line + len(lines) + 1} is longer than {self.max_element_size} characters')
+        for line in lines:
+            self.line += 1
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f'Invalid JSON on line {self.line}: {e}')
+
+
+def decoder_for(media_type):
+    """NDJSONDecoder for an NDJSON content type, JSONArrayDecoder otherwise."""
+    if (media_type or '').split(';')[0].strip().lower() == NDJSON_MEDIA_TYPE:
+        return NDJSONDecoder()
+    return JSONArrayDecoder()
+
+
+def iter_elements(stream, decoder, encoding='utf-8', head=b''):
+    """
+    Yield decoded elements from a binary file-like object.
+
+    Args:
+        stream: Object with a read(size) method returning bytes
+        decoder: JSONArrayDecoder or NDJSONDecoder
+        encoding: Text encoding of the stream
+        head: Bytes already read from the stream
+    """
+    text = codecs.getincrementaldecoder(encoding)()
+    chunk = head or stream.read(READ_SIZE)
+    while chunk:
+        yield from decoder.feed(text.decode(chunk))
+        chunk = stream.read(READ_SIZE)
+    yield from decoder.feed(text.decode(b'', final=True), final=True)
+
+
+def _request_stream(stream, parser_context):
+    request = parser_context.get('request')
+    content_encoding = request.META.get('HTTP_CONTENT_ENCODING') if request is not None else None
+    return decompressed(stream, content_encoding)
+
+
+class RowStream:
+    """
+    Rows of a request body, parsed lazily; can be iterated once.
+
+    Parse errors surface as ParseError while iterating.
+    """
+
+    def __init__(self, elements):
+        self.elements = elements
+
+    def __iter__(self):
+        try:
+            yield from self.elements
+        except ValueError as e:
+            raise ParseError(f'JSON parse error - {e}')
+
+
+class JSONArrayStreamParser(JSONParser):
+    """
+    JSON parser returning a RowStream when the body is an array, and the
+    fully parsed value for any other JSON body. Compressed bodies are
+    decompressed as they are read.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if stream is None:
+            raise ParseError('JSON parse error - Expecting value: line 1 column 1 (char 0)')
+        stream = _request_stream(stream, parser_context)
+
+        head = stream.read(READ_SIZE)
+        if head.lstrip()[:1] != b'[':
+            # Not an array; parse the whole body as usual
+            try:
+                return json.loads((head + stream.read()).decode(encoding))
+            except ValueError as e:
+                raise ParseError(f'JSON parse error - {e}')
+        return RowStream(iter_elements(stream, JSONArrayDecoder(), encoding, head))
+
+
+class NDJSONParser(BaseParser):
+    """Parses newline-delimited (and possibly compressed) JSON into a RowStream."""
+    media_type = NDJSON_MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if stream is None:
+            return RowStream(iter(()))
+        return RowStream(iter_elements(_request_stream(stream, parser_context), NDJSONDecoder(), encoding))
@@ -0,0 +1,221 @@
+import io
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+
+# Environment of each mode; workers read it when their settings load
+MODES = {
+    # The previous configuration: rollback journal, deferred transactions
+    'baseline': {
+        'SQLITE_JOURNAL_MODE': 'DELETE',
+        'SQLITE_SYNCHRONOUS': 'FULL',
+        'SQLITE_IMMEDIATE_TRANSACTIONS': 'false',
+        'SQLITE_BUSY_TIMEOUT': '5',
+        'WRITE_QUEUE_ENABLED': 'false',
+    },
+    'tuned': {
+        'SQLITE_JOURNAL_MODE': 'WAL',
+        'SQLITE_SYNCHRONOUS': 'NORMAL',
+        'SQLITE_IMMEDIATE_TRANSACTIONS': 'true',
+        'WRITE_QUEUE_ENABLED': 'false',
+    },
+    'queued': {
+        'SQLITE_JOURNAL_MODE': 'WAL',
+        'SQLITE_SYNCHRONOUS': 'NORMAL',
+        'SQLITE_IMMEDIATE_TRANSACTIONS': 'true',
+        'WRITE_QUEUE_ENABLED': 'true',
+    },
+}
+
+SEARCH_TERMS = ['invoice', 'report', 'payroll', 'vendor', 'reconcile', 'mailbox']
+
+
+def _init_worker(env):
+    # Runs before anything Django is imported in the worker, so the mode's
+    # settings are read from this environment
+    os.environ.update(env)
+    django.setup()
+
+
+def _prepare_database(seed_rows):
+    from django.core.management import call_command
+    from automations.bulk import bulk_create_automations
+
+    call_command('migrate', verbosity=0)
+    bulk_create_automations([
+        {
+            'air_id': f'BENCH{i:06d}',
+            'name': f'{SEARCH_TERMS[i % len(SEARCH_TERMS)].title()} automation {i}',
+            'type': 'Process',
+            'brief_description': f'Benchmark automation {i} that handles {SEARCH_TERMS[i % len(SEARCH_TERMS)]} work',
+        }
+        for i in range(seed_rows)
+    ])
+    call_command('setup_fts', stdout=io.StringIO())
+    connection.close()
+
+
+def _run_worker(worker, threads, duration, seed_rows, weights):
+    """Run a mix of API requests from several threads; returns counts and write latencies."""
+    from django.db import connections
+    from django.test import Client
+    from django.urls import reverse
+    from automations.write_queue import get_write_queue
+
+    lock = threading.Lock()
+    stats = {'create': 0, 'update': 0, 'search': 0, 'locked': 0, 'errors': 0, 'write_ms': [], 'messages': {}}
+
+    def run(thread):
+        client = Client()
+        rng = random.Random(worker * 1000 + thread)
+        operations = list(weights)
+        deadline = time.monotonic() + duration
+        created = 0
+        while time.monotonic() < deadline:
+            operation = rng.choices(operations, [weights[op] for op in operations])[0]
+            start = time.perf_counter()
+            try:
+                if operation == 'create':
+                    created += 1
+                    response = client.post(reverse('automation-list'), json.dumps({
+                        'air_id': f'NEW{worker:02d}{thread:02d}{created:07d}',
+                        'name': f'New automation {worker}-{thread}-{created}',
+                        'type': 'Process',
+                        'people_data': [{'name': f'Developer {rng.randrange(50)}', 'role': 'developer'}],
+                    }), content_type='application/json')
+                elif operation == 'update':
+                    air_id = f'BENCH{rng.randrange(seed_rows):06d}'
+                    response = client.patch(
+                        reverse('automation-detail', kwargs={'air_id': air_id}),
+                        json.dumps({'comments': f'Updated by {worker}-{thread} at {time.time()}'}),
+                        content_type='application/json'
+                    )
+                else:
+                    response = client.get(reverse('automation-search'), {'q': rng.choice(SEARCH_TERMS)})
+                error = None if response.status_code < 400 else response.content.decode(errors='replace')[:200]
+            except Exception as e:
+                error = str(e)[:200]
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            with lock:
+                if error is None:
+                    stats[operation] += 1
+                    if operation != 'search':
+                        stats['write_ms'].append(elapsed_ms)
+                else:
+                    stats['locked' if 'locked' in error else 'errors'] += 1
+                    stats['messages'][error] = stats['messages'].get(error, 0) + 1
+        connections.close_all()
+
+    pool = [threading.Thread(target=run, args=(thread,)) for thread in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    write_queue = get_write_queue()
+    if write_queue is not None:
+        # Wait for queued audit rows, then report how much was coalesced
+        write_queue.submit(int).result()
+        stats['transactions'] = write_queue.transactions
+        stats['queued_writes'] = write_queue.writes
+    return stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark concurrent create, update and search requests from several processes '
+        'against a scratch SQLite database, with and without WAL and the write queue'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4, help='Worker processes (default: 4)')
+        parser.add_argument('--threads', type=int, default=4, help='Request threads per process (default: 4)')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds per mode (default: 10)')
+        parser.add_argument('--seed-rows', type=int, default=2000, help='Automations created before the run (default: 2000)')
+        parser.add_argument(
+            '--modes',
+            default=','.join(MODES),
+            help=f"Comma-separated modes to run (default: {','.join(MODES)})"
+        )
+        parser.add_argument(
+            '--mix',
+            default='create=3,update=4,search=3',
+            help='Relative weights of the operations (default: create=3,update=4,search=3)'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark is for the SQLite configuration only')
+
+        modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip()]
+        unknown = [mode for mode in modes if mode not in MODES]
+        if unknown:
+            raise CommandError(f"Unknown modes: {', '.join(unknown)}; choose from {', '.join(MODES)}")
+        try:
+            weights = {name: float(weight) for name, weight in (item.split('=') for item in options['mix'].split(','))}
+        except ValueError:
+            raise CommandError(f"Invalid --mix: {options['mix']}")
+        if set(weights) - {'create', 'update', 'search'}:
+            raise CommandError('--mix takes create, update and search weights')
+
+        self.stdout.write(
+            f"{options['processes']} processes x {options['threads']} threads, "
+            f"{options['duration']:.0f}s per mode, {options['seed_rows']} seeded automations"
+        )
+        self.stdout.write(f"{'mode':<10}{'writes/s':>10}{'searches/s':>12}{'p95 write':>11}{'locked':>8}{'errors':>8}{'txn/write':>11}")
+        for mode in modes:
+            stats = self.run_mode(mode, options, weights)
+            writes = stats['create'] + stats['update']
+            latencies = sorted(stats['write_ms'])
+            p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+            coalescing = f"{stats['transactions'] / stats['queued_writes']:.2f}" if stats.get('queued_writes') else '-'
+            self.stdout.write(
+                f"{mode:<10}{writes / options['duration']:>10.1f}{stats['search'] / options['duration']:>12.1f}"
+                f"{p95:>9.0f}ms{stats['locked']:>8}{stats['errors']:>8}{coalescing:>11}"
+            )
+            for message, count in sorted(stats['messages'].items(), key=lambda item: -item[1])[:3]:
+                self.stdout.write(self.style.WARNING(f"  ⚠ {count}x {message}"))
+
+    def run_mode(self, mode, options, weights):
+        """Run one mode against a fresh scratch database and sum the workers' stats."""
+        directory = tempfile.mkdtemp(prefix='benchmark_writes_')
+        env = dict(MODES[mode], SQLITE_PATH=os.path.join(directory, 'db.sqlite3'))
+        context = multiprocessing.get_context('spawn')
+        try:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_worker, initargs=(env,)) as pool:
+                pool.submit(_prepare_database, options['seed_rows']).result()
+
+            with ProcessPoolExecutor(
+                max_workers=options['processes'], mp_context=context, initializer=_init_worker, initargs=(env,)
+            ) as pool:
+                futures = [
+                    pool.submit(_run_worker, worker, options['threads'], options['duration'], options['seed_rows'], weights)
+                    for worker in range(options['processes'])
+                ]
+                results = [future.result() for future in futures]
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        total = {'write_ms': [], 'messages': {}}
+        for stats in results:
+            for key, value in stats.items():
+                if key == 'write_ms':
+                    total[key] += value
+                elif key == 'messages':
+                    for message, count in value.items():
+                        total[key][message] = total[key].get(message, 0) + count
+                else:
+                    total[key] = total.get(key, 0) + value
+        return total
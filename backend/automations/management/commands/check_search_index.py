@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from automations import search_index
+
+
+class Command(BaseCommand):
+    help = 'Verify that the FTS5 search index matches the automations data and repair drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repair',
+            action='store_true',
+            help='Re-index documents that are missing, stale or orphaned'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Compare every document and scan for orphans, not only those logged since the last check'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of automations compared per batch (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The FTS5 search index is only available on SQLite')
+
+        repair = options['repair']
+        
+        def report_progress(done, total):
+            self.stdout.write(f'  Checked {done}/{total} automations')
+        
+        try:
+            report = search_index.check_index(
+                batch_size=options['batch_size'],
+                repair=repair,
+                full=options['full'],
+                progress=report_progress if options['verbosity'] > 1 else None
+            )
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        
+        drift = report['missing'] + report['stale'] + report['orphaned']
+        self.stdout.write(f"Checked {report['checked']} automations")
+        self.stdout.write(f"  Missing from index: {report['missing']}")
+        self.stdout.write(f"  Stale in index:     {report['stale']}")
+        self.stdout.write(f"  Orphaned in index:  {report['orphaned']}")
+        
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Search index is consistent'))
+        elif repair:
+            self.stdout.write(self.style.SUCCESS(f"Repaired {report['repaired']} documents"))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'Search index has drifted on {drift} documents; run with --repair to fix'
+            ))
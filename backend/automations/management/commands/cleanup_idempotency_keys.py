@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from automations.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Delete stored Idempotency-Key responses whose TTL has passed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would be deleted without actually deleting'
+        )
+
+    def handle(self, *args, **options):
+        expired = IdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+        count = expired.count()
+        
+        if options['dry_run']:
+            self.stdout.write(
+                self.style.WARNING(f'DRY RUN: Would delete {count} expired idempotency keys')
+            )
+        elif count > 0:
+            expired.delete()
+            self.stdout.write(
+                self.style.SUCCESS(f'Successfully deleted {count} expired idempotency keys')
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS('No expired idempotency keys found')
+            )
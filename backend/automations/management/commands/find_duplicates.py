@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from automations.models import Automation
+from automations.duplicates import index_automations, find_duplicate_pairs, DEFAULT_THRESHOLD
+
+
+class Command(BaseCommand):
+    help = 'Find probable duplicate automations using MinHash LSH signatures'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=DEFAULT_THRESHOLD,
+            help=f'Minimum text similarity (Jaccard) to report (default: {DEFAULT_THRESHOLD})'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute the LSH signatures of every automation first'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            air_ids = list(Automation.objects.values_list('air_id', flat=True))
+            index_automations(air_ids)
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt signatures for {len(air_ids)} automations'))
+        
+        pairs = find_duplicate_pairs(threshold=options['threshold'])
+        if not pairs:
+            self.stdout.write(self.style.SUCCESS('No probable duplicates found'))
+            return
+        
+        for first, second, similarity in pairs:
+            self.stdout.write(f'{first}  {second}  {similarity:.3f}')
+        self.stdout.write(self.style.WARNING(f'Found {len(pairs)} probable duplicate pairs'))
@@ -0,0 +1,67 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from automations.audit import log_audit_event
+from automations.csv_import import DEFAULT_CHUNK_SIZE, decoded_lines, import_csv
+
+
+class Command(BaseCommand):
+    help = 'Import automations from a CSV file, upserting on AIR ID'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file to import')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Rows validated and written per transaction (default: {DEFAULT_CHUNK_SIZE})'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=max((os.cpu_count() or 1) - 1, 0),
+            help='Processes parsing and validating rows; 0 parses in this process (default: CPU count - 1)'
+        )
+        parser.add_argument(
+            '--isolate',
+            action='store_true',
+            help='Skip and report bad rows instead of stopping at the first invalid chunk'
+        )
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['path']):
+            raise CommandError(f"File not found: {options['path']}")
+
+        def progress(result):
+            self.stdout.write(f"  {result['rows']} rows...", ending='\r')
+
+        start = time.perf_counter()
+        with open(options['path'], 'rb') as f:
+            result = import_csv(
+                decoded_lines(f),
+                chunk_size=max(options['chunk_size'], 1),
+                progress=progress,
+                isolate=options['isolate'],
+                workers=options['workers']
+            )
+        elapsed = time.perf_counter() - start
+
+        for error in result['errors'][:20]:
+            self.stdout.write(self.style.WARNING(f"⚠ Row {error['row']} ({error['air_id']}): {error['errors']}"))
+        if len(result['errors']) > 20:
+            self.stdout.write(self.style.WARNING(f"⚠ ... and {len(result['errors']) - 20} more invalid rows"))
+
+        rate = result['rows'] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {result['rows']} rows in {elapsed:.2f}s ({rate:.0f} rows/s): "
+            f"{result['inserted']} inserted, {result['updated']} updated, {result['unchanged']} unchanged"
+        ))
+
+        log_audit_event(
+            action='import',
+            object_type='Automation',
+            object_name=f"CSV import of {result['rows']} automations",
+            details={key: value for key, value in result.items() if key != 'errors'}
+        )
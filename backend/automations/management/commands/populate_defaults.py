@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from automations.models import Tool, Person
+from automations.models import Tool, Person, normalize_name
 
 
 class Command(BaseCommand):
@@ -28,7 +28,9 @@ class Command(BaseCommand):
                 self.stdout.write(f'Tool already exists: {tool_name}')
 
         # Create default system person
-        system_person, created = Person.objects.get_or_create(name='System')
+        system_person, created = Person.objects.get_or_create(
+            normalized_name=normalize_name('System'), defaults={'name': 'System'}
+        )
         if created:
             self.stdout.write(
                 self.style.SUCCESS('Created system person')
@@ -0,0 +1,137 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from automations import search_index
+from automations.audit import log_audit_event
+from automations.bulk import DEPENDENT_MODELS
+from automations.models import Automation, Person, Tool
+
+
+class Command(BaseCommand):
+    help = 'Delete all automations and their related data, and reset the search and similarity indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--noinput', '--no-input',
+            action='store_false',
+            dest='interactive',
+            help='Do not ask for confirmation'
+        )
+        parser.add_argument(
+            '--keep-lookups',
+            action='store_true',
+            help='Keep people and tools'
+        )
+        parser.add_argument(
+            '--skip-vacuum',
+            action='store_true',
+            help='Skip VACUUM/ANALYZE after deleting'
+        )
+
+    def handle(self, *args, **options):
+        count = Automation.objects.count()
+        if options['interactive']:
+            confirm = input(
+                f'This will permanently delete {count} automations and all their related data.\n'
+                "Type 'yes' to continue, or 'no' to cancel: "
+            )
+            if confirm != 'yes':
+                self.stdout.write('Reset cancelled.')
+                return
+
+        models = DEPENDENT_MODELS + [Automation]
+        if not options['keep_lookups']:
+            models += [Person, Tool]
+        tables = [model._meta.db_table for model in models]
+
+        start = time.perf_counter()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                quoted = ', '.join(connection.ops.quote_name(table) for table in tables)
+                cursor.execute(f"TRUNCATE {quoted} RESTART IDENTITY CASCADE")
+        else:
+            self.delete_tables(tables)
+        self.remove_similarity_cache()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'✓ Deleted {count} automations in {elapsed:.2f}s'))
+
+        if options['skip_vacuum']:
+            pass
+        elif connection.in_atomic_block:
+            self.stdout.write(self.style.WARNING('⚠ Skipping VACUUM/ANALYZE inside a transaction'))
+        else:
+            start = time.perf_counter()
+            self.vacuum(tables)
+            self.stdout.write(self.style.SUCCESS(f'✓ VACUUM/ANALYZE finished in {time.perf_counter() - start:.2f}s'))
+
+        log_audit_event(
+            action='delete',
+            object_type='Automation',
+            object_name='Reset automation data',
+            details={'count': count, 'keep_lookups': options['keep_lookups']}
+        )
+
+    def delete_tables(self, tables):
+        """Plain DELETEs, without Django's cascade collector, in one transaction."""
+        is_sqlite = connection.vendor == 'sqlite'
+        secure_delete = None
+        if is_sqlite and not connection.in_atomic_block:
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA secure_delete")
+                secure_delete = cursor.fetchone()[0]
+                # Freed pages would be zeroed and journaled one by one; the VACUUM
+                # that follows drops them from the file anyway
+                cursor.execute("PRAGMA secure_delete = OFF")
+
+        try:
+            # Every dependent table is emptied too; without foreign key checks
+            # SQLite can free whole tables instead of deleting row by row
+            with connection.constraint_checks_disabled():
+                with transaction.atomic(), connection.cursor() as cursor:
+                    indexed = is_sqlite and search_index.index_exists(cursor)
+                    if indexed:
+                        # Without triggers, SQLite doesn't re-index each deleted row
+                        search_index.detach_index(cursor)
+                    for table in tables:
+                        cursor.execute(f"DELETE FROM {connection.ops.quote_name(table)}")
+                    if is_sqlite:
+                        placeholders = ', '.join(['%s'] * len(tables))
+                        cursor.execute(f"DELETE FROM sqlite_sequence WHERE name IN ({placeholders})", tables)
+                    if indexed:
+                        search_index.reset_index(cursor)
+        finally:
+            if secure_delete is not None:
+                with connection.cursor() as cursor:
+                    cursor.execute(f"PRAGMA secure_delete = {int(secure_delete)}")
+
+        if is_sqlite:
+            # The spellfix1 vocabulary is only readable with the extension loaded
+            try:
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute("DELETE FROM automation_vocab")
+            except Exception:
+                pass
+
+    def remove_similarity_cache(self):
+        path = getattr(settings, 'SIMILARITY_INDEX_PATH', None)
+        if not path:
+            return
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.stdout.write(self.style.WARNING(f'⚠ Could not remove similarity index cache: {e}'))
+
+    def vacuum(self, tables):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                quoted = ', '.join(connection.ops.quote_name(table) for table in tables)
+                cursor.execute(f"VACUUM ANALYZE {quoted}")
+            elif connection.vendor == 'sqlite':
+                cursor.execute("VACUUM")
+                cursor.execute("ANALYZE")
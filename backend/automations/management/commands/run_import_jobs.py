@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from automations.models import ImportJob
+from automations.import_jobs import recover_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run queued CSV import jobs (use with IMPORT_JOBS RUN_IN_PROCESS disabled)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run the jobs queued right now and exit instead of polling'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between checks for new jobs (default: 2)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            recovered = recover_jobs()
+            if recovered:
+                self.stdout.write(f'Recovered {recovered} import jobs whose worker stopped')
+            job_ids = list(ImportJob.objects.filter(status='queued').order_by('id').values_list('id', flat=True))
+            for job_id in job_ids:
+                if run_job(job_id):
+                    job = ImportJob.objects.get(pk=job_id)
+                    self.stdout.write(
+                        f'Import job {job.id} {job.status}: {job.rows_processed} rows '
+                        f'({job.inserted} inserted, {job.updated} updated, {job.unchanged} unchanged)'
+                    )
+            
+            if options['once']:
+                break
+            if not job_ids:
+                time.sleep(options['poll_interval'])
@@ -1,11 +1,19 @@
 from django.core.management.base import BaseCommand
 from django.db import connection
-import sqlite3
+from automations import search_index
 
 
 class Command(BaseCommand):
     help = 'Set up FTS5 virtual table and spellfix1 for enhanced search'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of automations indexed per transaction (default: 1000)'
+        )
+
     def handle(self, *args, **options):
         self.stdout.write('Setting up FTS5 and spellfix1...')
         
@@ -39,135 +47,26 @@ class Command(BaseCommand):
                 self.stdout.write('  Note: spellfix1 is optional and provides spell correction')
                 spellfix_available = False
 
-            # Drop existing FTS tables and views
-            try:
-                cursor.execute("DROP TABLE IF EXISTS automations_fts")
-                cursor.execute("DROP VIEW IF EXISTS automations_search_view")
-                cursor.execute("DROP TRIGGER IF EXISTS automations_fts_insert")
-                cursor.execute("DROP TRIGGER IF EXISTS automations_fts_update")
-                cursor.execute("DROP TRIGGER IF EXISTS automations_fts_delete")
-                if spellfix_available:
+            # The spellfix vocabulary is cheap to recreate; the search index itself
+            # is built alongside the live one and swapped in below
+            if spellfix_available:
+                try:
                     cursor.execute("DROP TABLE IF EXISTS automation_vocab")
-            except Exception:
-                pass  # Tables might not exist
+                except Exception:
+                    pass  # Table might not exist
 
-            # Create a view that combines all searchable content
-            cursor.execute("""
-                CREATE VIEW automations_search_view AS
-                SELECT 
-                    a.rowid,
-                    a.air_id,
-                    a.name,
-                    a.type,
-                    COALESCE(a.brief_description, '') as brief_description,
-                    COALESCE(a.coe_fed, '') as coe_fed,
-                    COALESCE(a.complexity, '') as complexity,
-                    COALESCE(a.tool_version, '') as tool_version,
-                    COALESCE(a.process_details, '') as process_details,
-                    COALESCE(a.object_details, '') as object_details,
-                    COALESCE(a.queue, '') as queue,
-                    COALESCE(a.shared_folders, '') as shared_folders,
-                    COALESCE(a.shared_mailboxes, '') as shared_mailboxes,
-                    COALESCE(a.qa_handshake, '') as qa_handshake,
-                    COALESCE(a.comments, '') as comments,
-                    COALESCE(a.documentation, '') as documentation,
-                    COALESCE(a.path, '') as path,
-                    COALESCE(DATE(a.preprod_deploy_date), '') as preprod_deploy_date_text,
-                    COALESCE(DATE(a.prod_deploy_date), '') as prod_deploy_date_text,
-                    COALESCE(DATE(a.warranty_end_date), '') as warranty_end_date_text,
-                    COALESCE(DATE(a.modified), '') as modified_text,
-                    COALESCE(GROUP_CONCAT(p.name, ' '), '') as people_names,
-                    COALESCE(GROUP_CONCAT(apr.role, ' '), '') as people_roles,
-                    COALESCE(t.name, '') as tool_name,
-                    COALESCE(mb.name, '') as modified_by_name,
-                    COALESCE(GROUP_CONCAT(e.type || ':' || COALESCE(e.vdi, '') || ':' || COALESCE(e.service_account, ''), ' '), '') as environment_details,
-                    COALESCE(td_spoc.name, '') as test_data_spoc_name,
-                    COALESCE(CAST(m.post_prod_total_cases AS TEXT), '') as metrics_total_cases,
-                    COALESCE(CAST(m.post_prod_sys_ex_count AS TEXT), '') as metrics_sys_ex_count,
-                    COALESCE(CAST(m.post_prod_success_rate AS TEXT), '') as metrics_success_rate,
-                    COALESCE(art.artifacts_link, '') as artifacts_link,
-                    COALESCE(art.code_review, '') as artifacts_code_review,
-                    COALESCE(art.demo, '') as artifacts_demo,
-                    COALESCE(art.rampup_issue_list, '') as artifacts_rampup_issues
-                FROM automations a
-                LEFT JOIN automations_automationpersonrole apr ON a.air_id = apr.automation_id
-                LEFT JOIN automations_person p ON apr.person_id = p.id
-                LEFT JOIN automations_tool t ON a.tool_id = t.id
-                LEFT JOIN automations_person mb ON a.modified_by_id = mb.id
-                LEFT JOIN automations_environment e ON a.air_id = e.automation_id
-                LEFT JOIN automations_testdata td ON a.air_id = td.automation_id
-                LEFT JOIN automations_person td_spoc ON td.spoc_id = td_spoc.id
-                LEFT JOIN automations_metrics m ON a.air_id = m.automation_id
-                LEFT JOIN automations_artifacts art ON a.air_id = art.automation_id
-                GROUP BY a.air_id
-            """)
-
-            # Create FTS5 virtual table with all searchable fields
-            cursor.execute("""
-                CREATE VIRTUAL TABLE automations_fts USING fts5(
-                    air_id,
-                    name,
-                    type,
-                    brief_description,
-                    coe_fed,
-                    complexity,
-                    tool_version,
-                    process_details,
-                    object_details,
-                    queue,
-                    shared_folders,
-                    shared_mailboxes,
-                    qa_handshake,
-                    comments,
-                    documentation,
-                    path,
-                    preprod_deploy_date_text,
-                    prod_deploy_date_text,
-                    warranty_end_date_text,
-                    modified_text,
-                    people_names,
-                    people_roles,
-                    tool_name,
-                    modified_by_name,
-                    environment_details,
-                    test_data_spoc_name,
-                    metrics_total_cases,
-                    metrics_sys_ex_count,
-                    metrics_success_rate,
-                    artifacts_link,
-                    artifacts_code_review,
-                    artifacts_demo,
-                    artifacts_rampup_issues,
-                    content='automations_search_view',
-                    content_rowid='rowid'
-                )
-            """)
-            
-            # Create triggers to keep FTS5 table updated
-            cursor.execute("""
-                CREATE TRIGGER automations_fts_insert AFTER INSERT ON automations
-                BEGIN
-                    INSERT INTO automations_fts(automations_fts) VALUES('rebuild');
-                END
-            """)
-            
-            cursor.execute("""
-                CREATE TRIGGER automations_fts_update AFTER UPDATE ON automations
-                BEGIN
-                    INSERT INTO automations_fts(automations_fts) VALUES('rebuild');
-                END
-            """)
-            
-            cursor.execute("""
-                CREATE TRIGGER automations_fts_delete AFTER DELETE ON automations
-                BEGIN
-                    INSERT INTO automations_fts(automations_fts) VALUES('rebuild');
-                END
-            """)
-            
-            # Initial rebuild of FTS index
-            cursor.execute("INSERT INTO automations_fts(automations_fts) VALUES('rebuild')")
-            
+        batch_size = options['batch_size']
+        self.stdout.write(f'Building search index in batches of {batch_size}...')
+        
+        def report(done, total):
+            self.stdout.write(f'  Indexed {done}/{total} automations')
+        
+        indexed, caught_up = search_index.rebuild_index(batch_size=batch_size, progress=report)
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Search index swapped in ({indexed} documents, {caught_up} re-indexed after concurrent writes)'
+        ))
+        
+        with connection.cursor() as cursor:
             # Set up spellfix1 if available
             if spellfix_available:
                 try:
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.6 on 2026-10-19 03:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automations', '0003_auditlog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchQueryStat',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('period_start', models.DateTimeField()),
+                ('period_end', models.DateTimeField()),
+                ('query', models.CharField(max_length=500)),
+                ('search_count', models.IntegerField(default=0)),
+                ('zero_result_count', models.IntegerField(default=0)),
+                ('total_latency_ms', models.FloatField(default=0)),
+                ('max_latency_ms', models.FloatField(default=0)),
+                ('latency_histogram', models.JSONField(default=dict)),
+                ('sample_rate', models.FloatField(default=1.0)),
+            ],
+            options={
+                'db_table': 'search_query_stats',
+                'ordering': ['-period_start'],
+                'indexes': [models.Index(fields=['period_start'], name='search_quer_period__fae60d_idx'), models.Index(fields=['query'], name='search_quer_query_70a929_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.6 on 2026-10-19 03:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automations', '0004_searchquerystat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AutomationLSHBucket',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('band', models.PositiveSmallIntegerField()),
+                ('bucket', models.CharField(max_length=16)),
+                ('automation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='automations.automation')),
+            ],
+            options={
+                'db_table': 'automation_lsh_buckets',
+                'indexes': [models.Index(fields=['band', 'bucket'], name='automation__band_a4b7a8_idx')],
+            },
+        ),
+    ]
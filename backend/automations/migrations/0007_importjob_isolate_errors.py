@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 03:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automations', '0006_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='isolate_errors',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 04:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automations', '0007_importjob_isolate_errors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='automation',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+    ]
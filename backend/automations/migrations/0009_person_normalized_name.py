@@ -0,0 +1,71 @@
+from django.db import migrations, models
+
+
+def normalize_name(name):
+    # Frozen copy of automations.models.normalize_name
+    return ' '.join(name.split()).casefold()
+
+
+def merge_duplicate_people(apps, schema_editor):
+    """
+    Merge people whose names only differ in case or whitespace into the oldest
+    of them, and fill in normalized_name.
+    """
+    Person = apps.get_model('automations', 'Person')
+    AutomationPersonRole = apps.get_model('automations', 'AutomationPersonRole')
+    TestData = apps.get_model('automations', 'TestData')
+    Automation = apps.get_model('automations', 'Automation')
+
+    keepers = {}
+    merged = {}  # duplicate id -> kept id
+    people = list(Person.objects.order_by('id'))
+    for person in people:
+        person.normalized_name = normalize_name(person.name)
+        if person.normalized_name in keepers:
+            merged[person.id] = keepers[person.normalized_name]
+        else:
+            keepers[person.normalized_name] = person.id
+
+    if merged:
+        affected = set()
+        existing_roles = set(
+            AutomationPersonRole.objects.filter(person_id__in=set(merged.values()))
+            .values_list('automation_id', 'person_id', 'role')
+        )
+        for role in AutomationPersonRole.objects.filter(person_id__in=list(merged)).order_by('id'):
+            affected.add(role.automation_id)
+            key = (role.automation_id, merged[role.person_id], role.role)
+            if key in existing_roles:
+                role.delete()  # (automation, person, role) is unique
+            else:
+                existing_roles.add(key)
+                role.person_id = key[1]
+                role.save(update_fields=['person'])
+        for duplicate, kept in merged.items():
+            affected.update(TestData.objects.filter(spoc_id=duplicate).values_list('automation_id', flat=True))
+            TestData.objects.filter(spoc_id=duplicate).update(spoc_id=kept)
+            affected.update(Automation.objects.filter(modified_by_id=duplicate).values_list('air_id', flat=True))
+            Automation.objects.filter(modified_by_id=duplicate).update(modified_by_id=kept)
+        # Stored content hashes refer to the old person ids
+        Automation.objects.filter(air_id__in=list(affected)).update(content_hash=None)
+        Person.objects.filter(id__in=list(merged)).delete()
+
+    Person.objects.bulk_update(
+        [person for person in people if person.id not in merged], ['normalized_name'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automations', '0008_automation_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='person',
+            name='normalized_name',
+            field=models.CharField(editable=False, max_length=200, null=True),
+        ),
+        migrations.RunPython(merge_duplicate_people, migrations.RunPython.noop),
+    ]
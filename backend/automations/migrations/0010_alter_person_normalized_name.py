@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automations', '0009_person_normalized_name'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='person',
+            name='normalized_name',
+            field=models.CharField(editable=False, max_length=200, unique=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 04:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automations', '0011_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='body_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
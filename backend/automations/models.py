@@ -33,6 +33,102 @@ class AuditLog(models.Model):
         return f"{self.action} {self.object_type} {self.object_id or ''} at {self.timestamp}"
 
 
+class SearchQueryStat(models.Model):
+    """Aggregated search analytics for one normalized query over one flush period."""
+    id = models.AutoField(primary_key=True)
+    period_start = models.DateTimeField()
+    period_end = models.DateTimeField()
+    query = models.CharField(max_length=500)
+    search_count = models.IntegerField(default=0)
+    zero_result_count = models.IntegerField(default=0)
+    total_latency_ms = models.FloatField(default=0)
+    max_latency_ms = models.FloatField(default=0)
+    latency_histogram = models.JSONField(default=dict)  # bucket upper bound (ms) -> count
+    sample_rate = models.FloatField(default=1.0)
+
+    class Meta:
+        db_table = 'search_query_stats'
+        ordering = ['-period_start']
+        indexes = [
+            models.Index(fields=['period_start']),
+            models.Index(fields=['query']),
+        ]
+
+    def __str__(self):
+        return f"'{self.query}' x{self.search_count} at {self.period_start}"
+
+
+class ImportJob(models.Model):
+    """A CSV import running in the background, with its progress and outcome."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+    
+    id = models.AutoField(primary_key=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    file_name = models.CharField(max_length=255, blank=True, null=True)
+    file_path = models.CharField(max_length=500)  # Uploaded CSV stored on disk until the job finishes
+    chunk_size = models.IntegerField(default=500)
+    isolate_errors = models.BooleanField(default=False)  # Skip bad rows instead of stopping at the first one
+    rows_processed = models.IntegerField(default=0)
+    inserted = models.IntegerField(default=0)
+    updated = models.IntegerField(default=0)
+    unchanged = models.IntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    error_message = models.TextField(blank=True, null=True)
+    cancel_requested = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)  # Last progress of a running job
+    attempts = models.IntegerField(default=0)  # Times the job was started; a dead worker's job is retried
+    finished_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'import_jobs'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Import {self.id} ({self.status}) {self.file_name or ''}"
+    
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed', 'cancelled')
+    
+    @property
+    def rows_per_second(self):
+        if not self.started_at:
+            return None
+        end = self.finished_at or timezone.now()
+        elapsed = (end - self.started_at).total_seconds()
+        return round(self.rows_processed / elapsed, 1) if elapsed > 0 else None
+
+
+class IdempotencyKey(models.Model):
+    """The stored response of a request sent with an Idempotency-Key header (see idempotency.py)."""
+    id = models.AutoField(primary_key=True)
+    key = models.CharField(max_length=255)
+    scope = models.CharField(max_length=255)  # Method and path of the endpoint
+    fingerprint = models.CharField(max_length=64)  # Hash of method, path, query and body headers
+    body_hash = models.CharField(max_length=64, blank=True, default='')  # SHA-256 of the body, once completed
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True)  # Null while the request runs
+    response_body = models.BinaryField(blank=True, null=True)  # zlib-compressed JSON
+    started_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = 'idempotency_keys'
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'scope'], name='unique_idempotency_key_scope'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key} ({self.status_code or 'in progress'})"
+
+
 class Tool(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=100, unique=True)
@@ -41,12 +137,34 @@ class Tool(models.Model):
         return self.name
 
 
+def normalize_name(name):
+    """Key people are matched on: whitespace collapsed and case folded."""
+    return ' '.join(name.split()).casefold()
+
+
 class Person(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=200)
+    normalized_name = models.CharField(max_length=200, unique=True, editable=False)
     
     def __str__(self):
         return self.name
+    
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_name(self.name)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'normalized_name'}
+        super().save(*args, **kwargs)
+
+
+class AutomationQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        # auto_now only applies to save(); stamp queryset updates too, so that
+        # readers tracking updated_at (the similarity index) see them. Clearing
+        # the content hash alone isn't an edit.
+        if set(kwargs) - {'content_hash'}:
+            kwargs.setdefault('updated_at', timezone.now())
+        return super().update(**kwargs)
 
 
 class Automation(models.Model):
@@ -74,6 +192,11 @@ class Automation(models.Model):
     path = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Hash of the core fields and related rows as last written by an import,
+    # upsert or bulk create (see bulk.content_hash); NULL when unknown
+    content_hash = models.CharField(max_length=64, blank=True, null=True, editable=False)
+
+    objects = AutomationQuerySet.as_manager()
 
     class Meta:
         db_table = 'automations'
@@ -82,8 +205,51 @@ class Automation(models.Model):
     def __str__(self):
         return f"{self.air_id} - {self.name}"
 
+    def save(self, *args, **kwargs):
+        # Edits outside the bulk write paths don't compute the hash; drop it
+        self.content_hash = None
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'content_hash'}
+        super().save(*args, **kwargs)
+
+
+class AutomationChildModel(models.Model):
+    """Base for rows owned by an automation: saving or deleting one drops the automation's content hash."""
+
+    class Meta:
+        abstract = True
+
+    def _invalidate_content_hash(self):
+        Automation.objects.filter(air_id=self.automation_id, content_hash__isnull=False).update(content_hash=None)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._invalidate_content_hash()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self._invalidate_content_hash()
+        return result
+
+
+class AutomationLSHBucket(models.Model):
+    """One MinHash LSH band bucket of an automation's normalized text, used to find near-duplicates."""
+    id = models.AutoField(primary_key=True)
+    automation = models.ForeignKey(Automation, on_delete=models.CASCADE, related_name='lsh_buckets')
+    band = models.PositiveSmallIntegerField()
+    bucket = models.CharField(max_length=16)
+
+    class Meta:
+        db_table = 'automation_lsh_buckets'
+        indexes = [
+            models.Index(fields=['band', 'bucket']),
+        ]
+
+    def __str__(self):
+        return f"{self.automation_id} band {self.band}: {self.bucket}"
+
 
-class AutomationPersonRole(models.Model):
+class AutomationPersonRole(AutomationChildModel):
     ROLE_CHOICES = [
         ('project_manager', 'Project Manager'),
         ('project_designer', 'Project Designer'),
@@ -106,7 +272,7 @@ class AutomationPersonRole(models.Model):
         return f"{self.person.name} - {self.get_role_display()}"
 
 
-class Environment(models.Model):
+class Environment(AutomationChildModel):
     ENVIRONMENT_TYPES = [
         ('dev', 'Development'),
         ('qa', 'QA'),
@@ -124,7 +290,7 @@ class Environment(models.Model):
         return f"{self.automation.air_id} - {self.get_type_display()}"
 
 
-class TestData(models.Model):
+class TestData(AutomationChildModel):
     id = models.AutoField(primary_key=True)
     automation = models.OneToOneField(Automation, on_delete=models.CASCADE, related_name='test_data')
     spoc = models.ForeignKey(Person, on_delete=models.SET_NULL, blank=True, null=True)
@@ -133,7 +299,7 @@ class TestData(models.Model):
         return f"Test Data for {self.automation.air_id}"
 
 
-class Metrics(models.Model):
+class Metrics(AutomationChildModel):
     id = models.AutoField(primary_key=True)
     automation = models.OneToOneField(Automation, on_delete=models.CASCADE, related_name='metrics')
     post_prod_total_cases = models.IntegerField(blank=True, null=True)
@@ -144,7 +310,7 @@ class Metrics(models.Model):
         return f"Metrics for {self.automation.air_id}"
 
 
-class Artifacts(models.Model):
+class Artifacts(AutomationChildModel):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('in_progress', 'In Progress'),
@@ -1,5 +1,6 @@
 from django.db import connection
 from django.db.models import Q
+from django.db.models.expressions import RawSQL
 from .models import Automation
 import re
 
@@ -101,9 +102,9 @@ class AutomationSearchService:
                         COALESCE(a.name || ' ' || a.brief_description, '') as full_snippet
                     FROM automations_fts fts
                     JOIN automations a ON a.air_id = fts.air_id
-                    WHERE automations_fts MATCH ?
+                    WHERE automations_fts MATCH %s
                     ORDER BY fts.rank
-                    LIMIT ?
+                    LIMIT %s
                 """, [fts_query, limit])
                 
                 columns = [col[0] for col in cursor.description]
@@ -220,11 +221,22 @@ class AutomationSearchService:
         return results
     
     @staticmethod
-    def _fallback_search(query, limit=50):
+    def filter_queryset(queryset, query):
         """
-        Fallback search using Django ORM when FTS5 is not available.
+        Restrict a queryset to automations matching a search query, without a
+        result limit. Uses the FTS5 index when available and the same text
+        filter as the ORM fallback otherwise.
         """
-        queryset = Automation.objects.filter(
+        if connection.vendor == 'sqlite' and 'automations_fts' in connection.introspection.table_names():
+            return queryset.filter(air_id__in=RawSQL(
+                "SELECT air_id FROM automations_fts WHERE automations_fts MATCH %s",
+                [AutomationSearchService._prepare_fts_query(query)]
+            ))
+        return queryset.filter(AutomationSearchService._fallback_q(query)).distinct()
+    
+    @staticmethod
+    def _fallback_q(query):
+        return (
             Q(air_id__icontains=query) |
             Q(name__icontains=query) |
             Q(type__icontains=query) |
@@ -249,6 +261,15 @@ class AutomationSearchService:
             Q(test_data__spoc__name__icontains=query) |
             Q(artifacts__artifacts_link__icontains=query) |
             Q(artifacts__rampup_issue_list__icontains=query)
+        )
+    
+    @staticmethod
+    def _fallback_search(query, limit=50):
+        """
+        Fallback search using Django ORM when FTS5 is not available.
+        """
+        queryset = Automation.objects.filter(
+            AutomationSearchService._fallback_q(query)
         ).distinct().select_related('tool', 'modified_by')[:limit]
         
         return [
@@ -330,7 +351,7 @@ class AutomationSearchService:
                         cursor.execute("""
                             SELECT word, distance 
                             FROM automation_vocab 
-                            WHERE word MATCH ?
+                            WHERE word MATCH %s
                             ORDER BY distance 
                             LIMIT 3
                         """, [word])
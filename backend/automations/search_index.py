@@ -0,0 +1,634 @@
+"""
+FTS5 search index maintenance.
+
+The searchable document for an automation is a row of `automations_search_view`.
+`automations_fts` stores a copy of those rows (keyed by the automation's rowid)
+and is kept current by per-row triggers on `automations` and its child tables.
+
+Rebuilds never touch the live index: documents are copied in batches into a
+shadow table while a build log records every automation written meanwhile.
+The shadow is then caught up from the log and swapped in by rename inside one
+short write transaction.
+
+`automations_fts_docs` records a content hash for each indexed document that
+has been verified against its source row. Triggers of their own drop a
+document's hash whenever its source rows change, so a stored hash always
+describes the indexed content, and add its rowid to `automations_fts_dirty`.
+`check_index` reads only that log, so its cost follows the writes since the
+previous check; a full check compares every document and looks for orphans.
+"""
+import hashlib
+
+from django.db import connection, transaction
+
+
+FTS_TABLE = 'automations_fts'
+SHADOW_TABLE = 'automations_fts_build'
+DOCS_TABLE = 'automations_fts_docs'
+SHADOW_DOCS_TABLE = 'automations_fts_docs_build'
+DIRTY_TABLE = 'automations_fts_dirty'
+BUILD_LOG_TABLE = 'automations_fts_build_log'
+SEARCH_VIEW = 'automations_search_view'
+
+FTS_COLUMNS = [
+    'air_id',
+    'name',
+    'type',
+    'brief_description',
+    'coe_fed',
+    'complexity',
+    'tool_version',
+    'process_details',
+    'object_details',
+    'queue',
+    'shared_folders',
+    'shared_mailboxes',
+    'qa_handshake',
+    'comments',
+    'documentation',
+    'path',
+    'preprod_deploy_date_text',
+    'prod_deploy_date_text',
+    'warranty_end_date_text',
+    'modified_text',
+    'people_names',
+    'people_roles',
+    'tool_name',
+    'modified_by_name',
+    'environment_details',
+    'test_data_spoc_name',
+    'metrics_total_cases',
+    'metrics_sys_ex_count',
+    'metrics_success_rate',
+    'artifacts_link',
+    'artifacts_code_review',
+    'artifacts_demo',
+    'artifacts_rampup_issues',
+]
+
+SEARCH_VIEW_SQL = f"""
+    CREATE VIEW {SEARCH_VIEW} AS
+    SELECT
+        a.rowid,
+        a.air_id,
+        a.name,
+        a.type,
+        COALESCE(a.brief_description, '') as brief_description,
+        COALESCE(a.coe_fed, '') as coe_fed,
+        COALESCE(a.complexity, '') as complexity,
+        COALESCE(a.tool_version, '') as tool_version,
+        COALESCE(a.process_details, '') as process_details,
+        COALESCE(a.object_details, '') as object_details,
+        COALESCE(a.queue, '') as queue,
+        COALESCE(a.shared_folders, '') as shared_folders,
+        COALESCE(a.shared_mailboxes, '') as shared_mailboxes,
+        COALESCE(a.qa_handshake, '') as qa_handshake,
+        COALESCE(a.comments, '') as comments,
+        COALESCE(a.documentation, '') as documentation,
+        COALESCE(a.path, '') as path,
+        COALESCE(DATE(a.preprod_deploy_date), '') as preprod_deploy_date_text,
+        COALESCE(DATE(a.prod_deploy_date), '') as prod_deploy_date_text,
+        COALESCE(DATE(a.warranty_end_date), '') as warranty_end_date_text,
+        COALESCE(DATE(a.modified), '') as modified_text,
+        COALESCE(GROUP_CONCAT(p.name, ' '), '') as people_names,
+        COALESCE(GROUP_CONCAT(apr.role, ' '), '') as people_roles,
+        COALESCE(t.name, '') as tool_name,
+        COALESCE(mb.name, '') as modified_by_name,
+        COALESCE(GROUP_CONCAT(e.type || ':' || COALESCE(e.vdi, '') || ':' || COALESCE(e.service_account, ''), ' '), '') as environment_details,
+        COALESCE(td_spoc.name, '') as test_data_spoc_name,
+        COALESCE(CAST(m.post_prod_total_cases AS TEXT), '') as metrics_total_cases,
+        COALESCE(CAST(m.post_prod_sys_ex_count AS TEXT), '') as metrics_sys_ex_count,
+        COALESCE(CAST(m.post_prod_success_rate AS TEXT), '') as metrics_success_rate,
+        COALESCE(art.artifacts_link, '') as artifacts_link,
+        COALESCE(art.code_review, '') as artifacts_code_review,
+        COALESCE(art.demo, '') as artifacts_demo,
+        COALESCE(art.rampup_issue_list, '') as artifacts_rampup_issues
+    FROM automations a
+    LEFT JOIN automations_automationpersonrole apr ON a.air_id = apr.automation_id
+    LEFT JOIN automations_person p ON apr.person_id = p.id
+    LEFT JOIN automations_tool t ON a.tool_id = t.id
+    LEFT JOIN automations_person mb ON a.modified_by_id = mb.id
+    LEFT JOIN automations_environment e ON a.air_id = e.automation_id
+    LEFT JOIN automations_testdata td ON a.air_id = td.automation_id
+    LEFT JOIN automations_person td_spoc ON td.spoc_id = td_spoc.id
+    LEFT JOIN automations_metrics m ON a.air_id = m.automation_id
+    LEFT JOIN automations_artifacts art ON a.air_id = art.automation_id
+    GROUP BY a.air_id
+"""
+
+# Columns of `automations` the search view reads; updates that only touch
+# others (updated_at, content_hash) leave the document as it is
+INDEXED_AUTOMATION_COLUMNS = [
+    'air_id', 'name', 'type', 'brief_description', 'coe_fed', 'complexity',
+    'tool_version', 'process_details', 'object_details', 'queue',
+    'shared_folders', 'shared_mailboxes', 'qa_handshake', 'comments',
+    'documentation', 'path', 'preprod_deploy_date', 'prod_deploy_date',
+    'warranty_end_date', 'modified', 'tool_id', 'modified_by_id',
+]
+
+# Child tables whose rows are folded into an automation's search document
+CHILD_TABLES = [
+    'automations_automationpersonrole',
+    'automations_environment',
+    'automations_testdata',
+    'automations_metrics',
+    'automations_artifacts',
+]
+
+_COLUMN_LIST = ', '.join(FTS_COLUMNS)
+
+
+def _insert_docs_sql(table, where):
+    return (
+        f"INSERT INTO {table}(rowid, {_COLUMN_LIST}) "
+        f"SELECT rowid, {_COLUMN_LIST} FROM {SEARCH_VIEW} WHERE {where}"
+    )
+
+
+def _doc_rowid_sql(air_id_ref):
+    return f"(SELECT rowid FROM automations WHERE air_id = {air_id_ref})"
+
+
+def _reindex_doc_sql(table, air_id_ref):
+    """Statements that replace the document for `air_id_ref` (e.g. NEW.automation_id)."""
+    return (
+        f"DELETE FROM {table} WHERE rowid = {_doc_rowid_sql(air_id_ref)}; "
+        f"{_insert_docs_sql(table, f'air_id = {air_id_ref}')};"
+    )
+
+
+def _live_triggers():
+    """(name, sql) pairs for the triggers that keep automations_fts and its hashes current."""
+    triggers = [
+        ('automations_fts_insert', f"""
+            CREATE TRIGGER automations_fts_insert AFTER INSERT ON automations
+            BEGIN
+                {_insert_docs_sql(FTS_TABLE, 'air_id = NEW.air_id')};
+            END
+        """),
+        ('automations_fts_update', f"""
+            CREATE TRIGGER automations_fts_update AFTER UPDATE OF {', '.join(INDEXED_AUTOMATION_COLUMNS)} ON automations
+            BEGIN
+                DELETE FROM {FTS_TABLE} WHERE rowid = OLD.rowid;
+                {_insert_docs_sql(FTS_TABLE, 'air_id = NEW.air_id')};
+            END
+        """),
+        ('automations_fts_delete', f"""
+            CREATE TRIGGER automations_fts_delete AFTER DELETE ON automations
+            BEGIN
+                DELETE FROM {FTS_TABLE} WHERE rowid = OLD.rowid;
+            END
+        """),
+    ]
+    for table in CHILD_TABLES:
+        for event, ref in [('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')]:
+            name = f'{table}_fts_{event.lower()}'
+            body = _reindex_doc_sql(FTS_TABLE, f'{ref}.automation_id')
+            if event == 'UPDATE':
+                # Moving a child row between automations changes both documents
+                body = _reindex_doc_sql(FTS_TABLE, 'OLD.automation_id') + ' ' + body
+            triggers.append((name, f"""
+                CREATE TRIGGER {name} AFTER {event} ON {table}
+                BEGIN
+                    {body}
+                END
+            """))
+    return triggers + _hash_triggers()
+
+
+def _hash_triggers():
+    """
+    (name, sql) pairs for the triggers that drop the stored hash of every
+    document whose source rows change and log its rowid in DIRTY_TABLE.
+    They are separate from the indexing triggers so that writes are still
+    flagged for `check_index` if those are missing or broken.
+    """
+    def forget(rowid_ref):
+        return f"DELETE FROM {DOCS_TABLE} WHERE rowid = {rowid_ref}; INSERT OR IGNORE INTO {DIRTY_TABLE}(rowid) VALUES ({rowid_ref});"
+
+    def forget_parent(air_id_ref):
+        return (
+            f"DELETE FROM {DOCS_TABLE} WHERE rowid = {_doc_rowid_sql(air_id_ref)}; "
+            f"INSERT OR IGNORE INTO {DIRTY_TABLE}(rowid) SELECT rowid FROM automations WHERE air_id = {air_id_ref};"
+        )
+
+    triggers = [
+        ('automations_fts_docs_insert', 'INSERT ON automations', forget('NEW.rowid')),
+        ('automations_fts_docs_update', f"UPDATE OF {', '.join(INDEXED_AUTOMATION_COLUMNS)} ON automations",
+         forget('OLD.rowid') + ' ' + forget('NEW.rowid')),
+        ('automations_fts_docs_delete', 'DELETE ON automations', forget('OLD.rowid')),
+    ]
+    for table in CHILD_TABLES:
+        for event, ref in [('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')]:
+            body = forget_parent(f'{ref}.automation_id')
+            if event == 'UPDATE':
+                body = forget_parent('OLD.automation_id') + ' ' + body
+            triggers.append((f'{table}_fts_docs_{event.lower()}', f'{event} ON {table}', body))
+
+    return [
+        (name, f"""
+            CREATE TRIGGER {name} AFTER {event}
+            BEGIN
+                {body}
+            END
+        """)
+        for name, event, body in triggers
+    ]
+
+
+def _build_log_triggers():
+    """(name, sql) pairs for triggers that log documents written during a build."""
+    def log(rowid_ref, air_id_ref):
+        return f"INSERT INTO {BUILD_LOG_TABLE}(doc_rowid, air_id) VALUES ({rowid_ref}, {air_id_ref});"
+
+    triggers = [
+        ('automations_fts_build_log_insert', 'INSERT ON automations', log('NEW.rowid', 'NEW.air_id')),
+        ('automations_fts_build_log_update', f"UPDATE OF {', '.join(INDEXED_AUTOMATION_COLUMNS)} ON automations",
+         log('OLD.rowid', 'OLD.air_id') + ' ' + log('NEW.rowid', 'NEW.air_id')),
+        ('automations_fts_build_log_delete', 'DELETE ON automations', log('OLD.rowid', 'OLD.air_id')),
+    ]
+    for table in CHILD_TABLES:
+        for event, ref in [('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')]:
+            parent_rowid = f'(SELECT rowid FROM automations WHERE air_id = {ref}.automation_id)'
+            body = log(parent_rowid, f'{ref}.automation_id')
+            if event == 'UPDATE':
+                body = log('(SELECT rowid FROM automations WHERE air_id = OLD.automation_id)', 'OLD.automation_id') + ' ' + body
+            triggers.append((f'{table}_fts_build_log_{event.lower()}', f'{event} ON {table}', body))
+
+    return [
+        (name, f"""
+            CREATE TRIGGER {name} AFTER {event}
+            BEGIN
+                {body}
+            END
+        """)
+        for name, event, body in triggers
+    ]
+
+
+def fts_table_sql(table):
+    return f"CREATE VIRTUAL TABLE {table} USING fts5({_COLUMN_LIST})"
+
+
+def docs_table_sql(table):
+    return f"CREATE TABLE {table} (rowid INTEGER PRIMARY KEY, air_id TEXT NOT NULL, content_hash TEXT NOT NULL)"
+
+
+def dirty_table_sql():
+    return f"CREATE TABLE IF NOT EXISTS {DIRTY_TABLE} (rowid INTEGER PRIMARY KEY)"
+
+
+def _table_exists(cursor, name):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=%s", [name])
+    return cursor.fetchone() is not None
+
+
+def index_exists(cursor):
+    return _table_exists(cursor, FTS_TABLE)
+
+
+def document_hash(values):
+    """Content hash of one search document given its FTS column values."""
+    digest = hashlib.sha1()
+    for value in values:
+        digest.update(('' if value is None else str(value)).encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()
+
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def _fetch_source_docs(cursor, air_ids, view=SEARCH_VIEW):
+    """Return {rowid: values} for the given automations as rendered by the search view."""
+    if not air_ids:
+        return {}
+    cursor.execute(
+        f"SELECT rowid, {_COLUMN_LIST} FROM {view} WHERE air_id IN ({_placeholders(air_ids)})",
+        list(air_ids)
+    )
+    return {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+
+
+def _fetch_indexed_docs(cursor, rowids):
+    """Return {rowid: values} for documents currently stored in the live index."""
+    if not rowids:
+        return {}
+    cursor.execute(
+        f"SELECT rowid, {_COLUMN_LIST} FROM {FTS_TABLE} WHERE rowid IN ({_placeholders(rowids)})",
+        list(rowids)
+    )
+    return {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+
+
+def _write_docs(cursor, fts_table, docs_table, docs):
+    """Insert documents ({rowid: values}) into an FTS table and record their hashes."""
+    if not docs:
+        return
+    column_placeholders = _placeholders(FTS_COLUMNS)
+    cursor.executemany(
+        f"INSERT INTO {fts_table}(rowid, {_COLUMN_LIST}) VALUES (%s, {column_placeholders})",
+        [(rowid, *values) for rowid, values in docs.items()]
+    )
+    _store_hashes(cursor, docs_table, docs)
+
+
+def _store_hashes(cursor, docs_table, docs):
+    # air_id is the first FTS column
+    cursor.executemany(
+        f"INSERT OR REPLACE INTO {docs_table}(rowid, air_id, content_hash) VALUES (%s, %s, %s)",
+        [(rowid, values[0], document_hash(values)) for rowid, values in docs.items()]
+    )
+
+
+def _drop_build_log(cursor):
+    for name, _ in _build_log_triggers():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+    cursor.execute(f"DROP TABLE IF EXISTS {BUILD_LOG_TABLE}")
+
+
+def build_shadow_index(batch_size=1000, progress=None):
+    """
+    Copy every search document into a fresh shadow FTS table in batches.
+
+    Each batch is its own short transaction, so writers are only blocked for
+    the duration of one batch. Writes made meanwhile are recorded in the
+    build log and applied by `swap_in_shadow_index`.
+
+    Args:
+        batch_size: Number of automations indexed per transaction
+        progress: Optional callable(done, total) invoked after each batch
+
+    Returns:
+        int: Number of documents indexed
+    """
+    with connection.cursor() as cursor:
+        with transaction.atomic():
+            _drop_build_log(cursor)
+            cursor.execute(f"DROP TABLE IF EXISTS {SHADOW_TABLE}")
+            cursor.execute(f"DROP TABLE IF EXISTS {SHADOW_DOCS_TABLE}")
+            cursor.execute(f"CREATE TABLE {BUILD_LOG_TABLE} (doc_rowid INTEGER, air_id TEXT)")
+            for _, sql in _build_log_triggers():
+                cursor.execute(sql)
+            cursor.execute(fts_table_sql(SHADOW_TABLE))
+            cursor.execute(docs_table_sql(SHADOW_DOCS_TABLE))
+            cursor.execute(f"DROP VIEW IF EXISTS {SEARCH_VIEW}_build")
+            cursor.execute(SEARCH_VIEW_SQL.replace(f'VIEW {SEARCH_VIEW}', f'VIEW {SEARCH_VIEW}_build', 1))
+
+        cursor.execute("SELECT COUNT(*) FROM automations")
+        total = cursor.fetchone()[0]
+        build_view = f'{SEARCH_VIEW}_build'
+
+        done = 0
+        last_rowid = 0
+        while True:
+            with transaction.atomic():
+                cursor.execute(
+                    "SELECT rowid, air_id FROM automations WHERE rowid > %s ORDER BY rowid LIMIT %s",
+                    [last_rowid, batch_size]
+                )
+                batch = cursor.fetchall()
+                if not batch:
+                    break
+                docs = _fetch_source_docs(cursor, [air_id for _, air_id in batch], view=build_view)
+                _write_docs(cursor, SHADOW_TABLE, SHADOW_DOCS_TABLE, docs)
+            last_rowid = batch[-1][0]
+            done += len(batch)
+            if progress:
+                progress(done, total)
+
+        cursor.execute(f"DROP VIEW IF EXISTS {build_view}")
+    return done
+
+
+def swap_in_shadow_index():
+    """
+    Apply writes logged during the build to the shadow table and atomically
+    replace the live index, view and triggers with it.
+
+    Returns:
+        int: Number of documents re-indexed from the build log
+    """
+    with connection.cursor() as cursor:
+        with transaction.atomic():
+            # Re-creating the view is the first write, so the write lock is held
+            # from here on and nothing can land between catch-up and rename
+            cursor.execute(f"DROP VIEW IF EXISTS {SEARCH_VIEW}")
+            cursor.execute(SEARCH_VIEW_SQL)
+
+            # Logged documents may be changed, deleted or renumbered: drop and re-add them
+            stale_rowids = f"""
+                SELECT doc_rowid FROM {BUILD_LOG_TABLE}
+                UNION
+                SELECT a.rowid FROM automations a JOIN {BUILD_LOG_TABLE} l ON l.air_id = a.air_id
+            """
+            cursor.execute(f"DELETE FROM {SHADOW_TABLE} WHERE rowid IN ({stale_rowids})")
+            cursor.execute(f"DELETE FROM {SHADOW_DOCS_TABLE} WHERE rowid IN ({stale_rowids})")
+            cursor.execute(f"SELECT DISTINCT air_id FROM {BUILD_LOG_TABLE}")
+            docs = _fetch_source_docs(cursor, [row[0] for row in cursor.fetchall()])
+            _write_docs(cursor, SHADOW_TABLE, SHADOW_DOCS_TABLE, docs)
+
+            _drop_build_log(cursor)
+            for name, _ in _live_triggers():
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+            cursor.execute(f"DROP TABLE IF EXISTS {DOCS_TABLE}")
+            cursor.execute(f"ALTER TABLE {SHADOW_TABLE} RENAME TO {FTS_TABLE}")
+            cursor.execute(f"ALTER TABLE {SHADOW_DOCS_TABLE} RENAME TO {DOCS_TABLE}")
+            # Every document was just verified by the build and catch-up
+            cursor.execute(f"DROP TABLE IF EXISTS {DIRTY_TABLE}")
+            cursor.execute(dirty_table_sql())
+            for _, sql in _live_triggers():
+                cursor.execute(sql)
+    return len(docs)
+
+
+def rebuild_index(batch_size=1000, progress=None):
+    """
+    Rebuild the search index without a search outage.
+
+    Returns:
+        tuple: (documents indexed, documents caught up from the build log)
+    """
+    indexed = build_shadow_index(batch_size=batch_size, progress=progress)
+    caught_up = swap_in_shadow_index()
+    return indexed, caught_up
+
+
+def detach_index(cursor):
+    """
+    Drop the live and build triggers, and any shadow tables of an unfinished
+    build, so that bulk deletes don't re-index row by row. Follow with
+    `reset_index` in the same transaction.
+    """
+    _drop_build_log(cursor)
+    for name, _ in _live_triggers():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+    cursor.execute(f"DROP TABLE IF EXISTS {SHADOW_TABLE}")
+    cursor.execute(f"DROP TABLE IF EXISTS {SHADOW_DOCS_TABLE}")
+
+
+def reset_index(cursor):
+    """Re-create the live index empty, with its view and triggers."""
+    cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    cursor.execute(f"DROP TABLE IF EXISTS {DOCS_TABLE}")
+    cursor.execute(f"DROP TABLE IF EXISTS {DIRTY_TABLE}")
+    cursor.execute(fts_table_sql(FTS_TABLE))
+    cursor.execute(docs_table_sql(DOCS_TABLE))
+    cursor.execute(dirty_table_sql())
+    cursor.execute(f"DROP VIEW IF EXISTS {SEARCH_VIEW}")
+    cursor.execute(SEARCH_VIEW_SQL)
+    for _, sql in _live_triggers():
+        cursor.execute(sql)
+
+
+def check_index(batch_size=1000, repair=False, progress=None, full=False):
+    """
+    Compare the live index with its source rows and optionally repair drift.
+
+    By default only the rowids in the dirty log (written or deleted since the
+    last check) are rendered through the search view and hashed, so a check
+    costs in proportion to the writes since the previous one. With `full`,
+    every source document is hashed and compared and the index is scanned for
+    orphans, which also catches documents edited in the FTS table directly, or
+    rows written while the hash triggers were missing. Either way only
+    documents whose stored hash is missing or different are read back from
+    the index, and repair writes scale with the drift. Drift left unrepaired
+    stays in the log, so the next check reports it again.
+
+    Args:
+        batch_size: Number of automations compared per batch
+        repair: Re-index only the documents that differ
+        progress: Optional callable(done, total) invoked after each batch
+        full: Compare every document rather than the logged ones
+
+    Returns:
+        dict: Drift counts ('checked', 'missing', 'stale', 'orphaned', 'repaired')
+    """
+    report = {'checked': 0, 'missing': 0, 'stale': 0, 'orphaned': 0, 'repaired': 0}
+
+    with connection.cursor() as cursor:
+        if not index_exists(cursor):
+            raise RuntimeError(f'{FTS_TABLE} does not exist; run setup_fts first')
+        if not (_table_exists(cursor, DOCS_TABLE) and _table_exists(cursor, DIRTY_TABLE)):
+            # Older index without hashes or a dirty log: every document gets verified once
+            with transaction.atomic():
+                if not _table_exists(cursor, DOCS_TABLE):
+                    cursor.execute(docs_table_sql(DOCS_TABLE))
+                cursor.execute(dirty_table_sql())
+                for name, sql in _hash_triggers():
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+                    cursor.execute(sql)
+            full = True
+
+        if full:
+            cursor.execute("SELECT COUNT(*) FROM automations")
+            batch_sql = "SELECT rowid, air_id FROM automations WHERE rowid > %s ORDER BY rowid LIMIT %s"
+        else:
+            cursor.execute(f"SELECT COUNT(*) FROM {DIRTY_TABLE}")
+            # Rowids without an automation were deleted since the last check
+            batch_sql = f"""
+                SELECT d.rowid, a.air_id FROM {DIRTY_TABLE} d
+                LEFT JOIN automations a ON a.rowid = d.rowid
+                WHERE d.rowid > %s ORDER BY d.rowid LIMIT %s
+            """
+        total = cursor.fetchone()[0]
+
+        last_rowid = 0
+        while True:
+            with transaction.atomic():
+                cursor.execute(batch_sql, [last_rowid, batch_size])
+                batch = cursor.fetchall()
+                if not batch:
+                    break
+                last_rowid = batch[-1][0]
+                _check_batch(cursor, batch, repair, report)
+
+            report['checked'] += len(batch)
+            if progress:
+                progress(report['checked'], total)
+
+        if full:
+            # Documents whose automation is gone (deleted without a trigger, or renumbered)
+            with transaction.atomic():
+                cursor.execute(f"SELECT rowid FROM {FTS_TABLE} WHERE rowid NOT IN (SELECT rowid FROM automations)")
+                orphans = [row[0] for row in cursor.fetchall()]
+                report['orphaned'] += len(orphans)
+                if repair:
+                    cursor.execute(f"DELETE FROM {DOCS_TABLE} WHERE rowid NOT IN (SELECT rowid FROM automations)")
+                    if orphans:
+                        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({_placeholders(orphans)})", orphans)
+                    report['repaired'] += len(orphans)
+                    orphans = []
+                cursor.execute(
+                    f"DELETE FROM {DIRTY_TABLE} WHERE rowid NOT IN (SELECT rowid FROM automations)"
+                    f" AND rowid NOT IN ({_placeholders(orphans)})",
+                    orphans
+                )
+
+    return report
+
+
+def _check_batch(cursor, batch, repair, report):
+    """
+    Verify one batch of (rowid, air_id) pairs, where a None air_id marks a
+    deleted automation, and clear them from the dirty log unless they drifted
+    and were left unrepaired.
+    """
+    live = [(rowid, air_id) for rowid, air_id in batch if air_id is not None]
+    deleted = [rowid for rowid, air_id in batch if air_id is None]
+
+    source = _fetch_source_docs(cursor, [air_id for _, air_id in live])
+    source_hashes = {rowid: document_hash(values) for rowid, values in source.items()}
+
+    cursor.execute(
+        f"SELECT rowid, content_hash FROM {DOCS_TABLE} WHERE rowid IN ({_placeholders(source)})",
+        list(source)
+    )
+    stored = dict(cursor.fetchall())
+    # Rowid-only lookup, so rows removed from the index directly are caught too
+    checked = list(source) + deleted
+    cursor.execute(
+        f"SELECT rowid FROM {FTS_TABLE} WHERE rowid IN ({_placeholders(checked)})",
+        checked
+    )
+    present = {row[0] for row in cursor.fetchall()}
+    unverified = [
+        rowid for rowid, digest in source_hashes.items()
+        if rowid not in present or stored.get(rowid) != digest
+    ]
+
+    indexed = _fetch_indexed_docs(cursor, unverified)
+    verified, drifted = {}, {}
+    for rowid in unverified:
+        if rowid not in indexed:
+            report['missing'] += 1
+            drifted[rowid] = source[rowid]
+        elif document_hash(indexed[rowid]) == source_hashes[rowid]:
+            verified[rowid] = source[rowid]
+        else:
+            report['stale'] += 1
+            drifted[rowid] = source[rowid]
+    orphans = [rowid for rowid in deleted if rowid in present]
+    report['orphaned'] += len(orphans)
+
+    _store_hashes(cursor, DOCS_TABLE, verified)
+    if repair:
+        if drifted:
+            _replace_docs(cursor, drifted)
+        if orphans:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({_placeholders(orphans)})", orphans)
+        report['repaired'] += len(drifted) + len(orphans)
+        unresolved = set()
+    else:
+        unresolved = set(drifted) | set(orphans)
+
+    resolved = [rowid for rowid, _ in batch if rowid not in unresolved]
+    cursor.execute(f"DELETE FROM {DIRTY_TABLE} WHERE rowid IN ({_placeholders(resolved)})", resolved)
+
+
+def _replace_docs(cursor, docs):
+    rowids = list(docs)
+    cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({_placeholders(rowids)})", rowids)
+    _write_docs(cursor, FTS_TABLE, DOCS_TABLE, docs)
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Automation, Tool, Person, AutomationPersonRole, Environment, TestData, Metrics, Artifacts, AuditLog
+from .models import Automation, Tool, Person, AutomationPersonRole, Environment, TestData, Metrics, Artifacts, AuditLog, ImportJob
+from .bulk import bulk_create_automations, update_automation, fetch_with_related, NESTED_MODELS, UPDATABLE_FIELDS
 
 
 class AuditLogSerializer(serializers.ModelSerializer):
@@ -16,6 +17,16 @@ class AuditLogSerializer(serializers.ModelSerializer):
         return obj.timestamp.strftime('%Y-%m-%d %H:%M:%S')
 
 
+class ImportJobSerializer(serializers.ModelSerializer):
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    rows_per_second = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = ImportJob
+        exclude = ['file_path']
+        read_only_fields = [field.name for field in ImportJob._meta.fields]
+
+
 class ToolSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tool
@@ -85,7 +96,7 @@ class AutomationSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Automation
-        fields = '__all__'
+        exclude = ['content_hash']
         
     def get_people(self, obj):
         """Return people in legacy format for backward compatibility"""
@@ -116,6 +127,47 @@ class AutomationSerializer(serializers.ModelSerializer):
         return value.strip()
 
 
+class AutomationUpdateSerializer(AutomationSerializer):
+    """
+    Serializer for updating an automation, optionally with nested related data
+    in the same format as AutomationCreateSerializer. A nested field that is
+    given replaces that set of related rows; only the differences are written.
+    """
+    people_data = serializers.ListField(child=serializers.DictField(), required=False, write_only=True)
+    environments_data = serializers.ListField(child=serializers.DictField(), required=False, write_only=True)
+    test_data_data = serializers.DictField(required=False, write_only=True)
+    metrics_data = serializers.DictField(required=False, write_only=True)
+    artifacts_data = serializers.DictField(required=False, write_only=True)
+    
+    def validate_air_id(self, value):
+        value = super().validate_air_id(value)
+        if self.instance is not None and value != self.instance.air_id:
+            raise serializers.ValidationError("AIR ID cannot be changed")
+        return value
+    
+    def update(self, instance, validated_data):
+        nested = {field: validated_data.pop(field) for field in NESTED_MODELS if field in validated_data}
+        validated_data.pop('air_id', None)
+        # Changed field names, for callers that only refresh derived data on change
+        self.changed_fields = update_automation(instance, validated_data, nested)
+        return fetch_with_related([instance.air_id])[0]
+
+
+class AutomationBulkCreateSerializer(serializers.ListSerializer):
+    """
+    `many=True` counterpart of AutomationCreateSerializer that writes the whole
+    batch with set-based queries instead of creating rows one at a time.
+    """
+
+    def save(self, names=None, **kwargs):
+        # ListSerializer.save merges kwargs into every row, so keep the cache aside
+        self.names = names
+        return super().save(**kwargs)
+
+    def create(self, validated_data):
+        return bulk_create_automations(validated_data, names=getattr(self, 'names', None))
+
+
 class AutomationCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating automations with nested related data"""
     tool_name = serializers.CharField(required=False, write_only=True)
@@ -128,7 +180,8 @@ class AutomationCreateSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Automation
-        fields = '__all__'
+        exclude = ['content_hash']
+        list_serializer_class = AutomationBulkCreateSerializer
         extra_kwargs = {
             'tool_name': {'write_only': True},
             'modified_by_name': {'write_only': True},
@@ -150,77 +203,41 @@ class AutomationCreateSerializer(serializers.ModelSerializer):
         return data
     
     def create(self, validated_data):
-        # Extract nested data
-        tool_name = validated_data.pop('tool_name', None)
-        modified_by_name = validated_data.pop('modified_by_name', None)
-        people_data = validated_data.pop('people_data', [])
-        environments_data = validated_data.pop('environments_data', [])
-        test_data_data = validated_data.pop('test_data_data', {})
-        metrics_data = validated_data.pop('metrics_data', {})
-        artifacts_data = validated_data.pop('artifacts_data', {})
-        
-        # Handle tool creation/assignment
-        if tool_name:
-            tool, created = Tool.objects.get_or_create(name=tool_name)
-            validated_data['tool'] = tool
-        
-        # Handle modified_by person creation/assignment
-        if modified_by_name:
-            modified_by_person, created = Person.objects.get_or_create(name=modified_by_name)
-            validated_data['modified_by'] = modified_by_person
-        
-        # Create automation
-        automation = Automation.objects.create(**validated_data)
-        
-        # Create related objects
-        self._create_people_roles(automation, people_data)
-        self._create_environments(automation, environments_data)
-        self._create_test_data(automation, test_data_data)
-        self._create_metrics(automation, metrics_data)
-        self._create_artifacts(automation, artifacts_data)
-        
-        return automation
-    
-    def _create_people_roles(self, automation, people_data):
-        for person_data in people_data:
-            if person_data.get('name') and person_data.get('role'):
-                person, created = Person.objects.get_or_create(name=person_data['name'])
-                AutomationPersonRole.objects.create(
-                    automation=automation,
-                    person=person,
-                    role=person_data['role']
-                )
-    
-    def _create_environments(self, automation, environments_data):
-        for env_data in environments_data:
-            if env_data.get('type'):
-                Environment.objects.create(
-                    automation=automation,
-                    type=env_data['type'],
-                    vdi=env_data.get('vdi', ''),
-                    service_account=env_data.get('service_account', '')
-                )
-    
-    def _create_test_data(self, automation, test_data_data):
-        if test_data_data.get('spoc'):
-            spoc, created = Person.objects.get_or_create(name=test_data_data['spoc'])
-            TestData.objects.create(automation=automation, spoc=spoc)
-    
-    def _create_metrics(self, automation, metrics_data):
-        if any(metrics_data.values()):
-            Metrics.objects.create(
-                automation=automation,
-                post_prod_total_cases=metrics_data.get('post_prod_total_cases'),
-                post_prod_sys_ex_count=metrics_data.get('post_prod_sys_ex_count'),
-                post_prod_success_rate=metrics_data.get('post_prod_success_rate')
-            )
-    
-    def _create_artifacts(self, automation, artifacts_data):
-        if any(artifacts_data.values()):
-            Artifacts.objects.create(
-                automation=automation,
-                artifacts_link=artifacts_data.get('artifacts_link'),
-                code_review=artifacts_data.get('code_review'),
-                demo=artifacts_data.get('demo'),
-                rampup_issue_list=artifacts_data.get('rampup_issue_list')
-            )
+        return bulk_create_automations([validated_data])[0]
+
+
+class AutomationUpsertSerializer(AutomationCreateSerializer):
+    """Create serializer for upserts: air_id may already exist."""
+    air_id = serializers.CharField(max_length=100)
+
+
+class AutomationChangesSerializer(serializers.ModelSerializer):
+    """
+    Validates the change set of a bulk partial update. Use with partial=True:
+    only core fields can change, and none of them is required.
+    """
+    tool_name = serializers.CharField(required=False, allow_null=True)
+    modified_by_name = serializers.CharField(required=False, allow_null=True)
+    
+    class Meta:
+        model = Automation
+        fields = UPDATABLE_FIELDS
+    
+    def to_internal_value(self, data):
+        if isinstance(data, dict):
+            unknown = sorted(set(data) - set(self.fields))
+            if unknown:
+                raise serializers.ValidationError({field: ['This field cannot be bulk updated.'] for field in unknown})
+            if not data:
+                raise serializers.ValidationError({'non_field_errors': ['No changes given.']})
+        return super().to_internal_value(data)
+    
+    def validate_name(self, value):
+        if not value.strip():
+            raise serializers.ValidationError("Name cannot be empty")
+        return value.strip()
+    
+    def validate_type(self, value):
+        if not value.strip():
+            raise serializers.ValidationError("Type cannot be empty")
+        return value.strip()
@@ -0,0 +1,334 @@
+"""
+"Similar automations" lookups using TF-IDF cosine similarity.
+
+Each automation's text (name, description, process and object details) is kept
+as a sparse term-frequency vector together with corpus document frequencies
+and an inverted index. IDF weights are derived from the document frequencies
+at query time, so updating one automation only touches that automation's
+terms. Neighbours are scored only among automations sharing a term with the
+target instead of against the whole corpus.
+
+The index is cached on disk, which is only read when a worker first uses it.
+From then on a background thread in each worker applies the changes every
+REFRESH_INTERVAL seconds, so requests never wait for a refresh. It re-reads
+the rows stamped within WRITE_LAG seconds of its watermark and applies those
+whose `updated_at` differs from what it last saw, so a transaction that
+commits after a later-stamped one isn't skipped, and it drops deleted rows.
+Keeping the index fresh costs two small queries while nothing changes and
+work proportional to the changes otherwise. ORM queryset updates stamp
+`updated_at` too (see AutomationQuerySet); raw SQL writes have to set it.
+The cache is rewritten at most every SAVE_INTERVAL seconds, just to make the
+next worker's start cheaper.
+"""
+import math
+import os
+import pickle
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Automation
+
+
+# Field -> weight applied to its term frequencies
+TEXT_FIELDS = {
+    'name': 2.0,
+    'brief_description': 1.0,
+    'process_details': 1.0,
+    'object_details': 1.0,
+}
+
+STOP_WORDS = {
+    'the', 'and', 'for', 'from', 'with', 'into', 'this', 'that', 'are', 'was',
+    'will', 'all', 'any', 'can', 'its', 'our', 'per', 'via', 'not', 'but',
+    'has', 'have', 'been', 'then', 'than', 'each', 'use', 'used', 'using',
+}
+
+DEFAULT_SETTINGS = {
+    'REFRESH_INTERVAL': 5,   # Seconds between background checks of the database for changes
+    'SAVE_INTERVAL': 300,    # Minimum seconds between rewrites of the disk cache
+}
+
+# Terms present in more than this share of documents don't generate candidates
+MAX_CANDIDATE_DF_RATIO = 0.5
+
+# Seconds a write may take to commit after stamping updated_at and still be picked up
+WRITE_LAG = 60
+
+CACHE_VERSION = 2
+
+_TOKEN_RE = re.compile(r'[a-z0-9]{2,}')
+
+
+def get_config():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'SIMILARITY_INDEX', {})}
+
+
+def tokenize(text):
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOP_WORDS]
+
+
+def term_frequencies(values):
+    """Weighted term frequencies for a dict of TEXT_FIELDS values."""
+    tf = Counter()
+    for field, weight in TEXT_FIELDS.items():
+        for term in tokenize(values.get(field) or ''):
+            tf[term] += weight
+    return dict(tf)
+
+
+class SimilarityIndex:
+    """
+    Incrementally maintained sparse TF-IDF index over automation text.
+
+    Args:
+        cache_path: File the index is loaded from on first use and saved to
+        refresh_interval: Seconds `refresh` skips the database check for
+            after having done one, and between background refreshes (0
+            checks every time and leaves refreshing to the caller)
+        save_interval: Minimum seconds between cache saves
+    """
+
+    def __init__(self, cache_path=None, refresh_interval=0, save_interval=0):
+        self.cache_path = cache_path
+        self.refresh_interval = refresh_interval
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._cache_loaded = False
+        self._checked_at = None
+        self._saved_at = None
+        self._refresher = None
+        self._loaded = threading.Event()
+        self._reset()
+
+    def _reset(self):
+        self.doc_terms = {}     # air_id -> {term: weighted tf}
+        self.df = Counter()     # term -> number of documents containing it
+        self.postings = {}      # term -> set of air_ids
+        self.watermark = None   # Latest updated_at reflected in the index
+        self.recent = {}        # air_id -> updated_at applied, within WRITE_LAG of the watermark
+
+    # Maintenance
+
+    def _remove(self, air_id):
+        terms = self.doc_terms.pop(air_id, None)
+        if not terms:
+            return
+        for term in terms:
+            self.df[term] -= 1
+            if self.df[term] <= 0:
+                del self.df[term]
+                self.postings.pop(term, None)
+            else:
+                self.postings[term].discard(air_id)
+
+    def _add(self, air_id, terms):
+        self.doc_terms[air_id] = terms
+        for term in terms:
+            self.df[term] += 1
+            self.postings.setdefault(term, set()).add(air_id)
+
+    def update(self, air_id, values):
+        """Replace the vector for one automation given its TEXT_FIELDS values."""
+        with self._lock:
+            self._remove(air_id)
+            self._add(air_id, term_frequencies(values))
+
+    def refresh(self, force=False):
+        """
+        Bring the index up to date with the database, unless it was checked
+        less than refresh_interval seconds ago (and not forced).
+
+        Returns:
+            int: Number of automations added, changed or removed
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._checked_at is not None and now - self._checked_at < self.refresh_interval:
+                return 0
+            self._checked_at = now
+            if not self._cache_loaded:
+                self._cache_loaded = True
+                self._load_cache()
+
+            if self.watermark is None:
+                # First load: read every row's text in one pass
+                stamps, touched = {}, 0
+                for row in Automation.objects.values('air_id', 'updated_at', *TEXT_FIELDS).iterator(chunk_size=2000):
+                    stamps[row['air_id']] = row.pop('updated_at')
+                    self._add(row.pop('air_id'), term_frequencies(row))
+                    touched += 1
+            else:
+                stamps = dict(
+                    Automation.objects.filter(updated_at__gte=self.watermark - timedelta(seconds=WRITE_LAG))
+                    .values_list('air_id', 'updated_at')
+                )
+                touched = self._apply([air_id for air_id, stamp in stamps.items() if self.recent.get(air_id) != stamp])
+
+            if Automation.objects.count() != len(self.doc_terms):
+                live_ids = set(Automation.objects.values_list('air_id', flat=True))
+                for air_id in set(self.doc_terms) - live_ids:
+                    self._remove(air_id)
+                    touched += 1
+
+            latest = max(stamps.values(), default=None)
+            if latest is not None and (self.watermark is None or latest > self.watermark):
+                self.watermark = latest
+            self.recent = {
+                air_id: stamp for air_id, stamp in stamps.items()
+                if stamp >= self.watermark - timedelta(seconds=WRITE_LAG)
+            }
+            self._loaded.set()
+            if self._saved_at is None or now - self._saved_at >= self.save_interval:
+                self._saved_at = now
+                self._save_cache()
+            return touched
+
+    def _apply(self, air_ids, batch_size=500):
+        """Re-read the text of the given automations; returns how many still exist."""
+        applied = 0
+        for start in range(0, len(air_ids), batch_size):
+            batch = Automation.objects.filter(air_id__in=air_ids[start:start + batch_size])
+            for row in batch.values('air_id', *TEXT_FIELDS):
+                air_id = row.pop('air_id')
+                self._remove(air_id)
+                self._add(air_id, term_frequencies(row))
+                applied += 1
+        return applied
+
+    def start_refresher(self):
+        """Refresh in a background thread every refresh_interval seconds, if not already doing so."""
+        if self.refresh_interval <= 0 or self._refresher is not None:
+            return
+        with self._lock:
+            if self._refresher is not None:
+                return
+            self._refresher = threading.Thread(
+                target=self._refresh_loop, name='similarity-index-refresher', daemon=True
+            )
+            self._refresher.start()
+
+    def wait_until_loaded(self, timeout=None):
+        """Wait for the first refresh to finish; False if it didn't within timeout seconds."""
+        return self._loaded.wait(timeout)
+
+    def _refresh_loop(self):
+        while True:
+            try:
+                self.refresh(force=True)
+            except Exception as e:
+                print(f"Failed to refresh similarity index: {e}")
+            finally:
+                # This thread owns its own connection; don't hold it open between refreshes
+                connection.close()
+            time.sleep(self.refresh_interval)
+
+    # Queries
+
+    def _idf(self, term):
+        return math.log((1 + len(self.doc_terms)) / (1 + self.df.get(term, 0))) + 1.0
+
+    def _vector(self, terms):
+        return {term: tf * self._idf(term) for term, tf in terms.items()}
+
+    @staticmethod
+    def _norm(vector):
+        return math.sqrt(sum(w * w for w in vector.values()))
+
+    def similar(self, air_id, limit=10):
+        """
+        Return the `limit` most similar automations as (air_id, score) pairs.
+        """
+        with self._lock:
+            terms = self.doc_terms.get(air_id)
+            if not terms:
+                return []
+
+            query = self._vector(terms)
+            query_norm = self._norm(query)
+            if not query_norm:
+                return []
+
+            max_df = max(2, MAX_CANDIDATE_DF_RATIO * len(self.doc_terms))
+            candidates = set()
+            for term in terms:
+                if self.df.get(term, 0) <= max_df:
+                    candidates |= self.postings.get(term, set())
+            candidates.discard(air_id)
+
+            scores = []
+            for candidate in candidates:
+                vector = self._vector(self.doc_terms[candidate])
+                dot = sum(weight * vector[term] for term, weight in query.items() if term in vector)
+                if dot:
+                    scores.append((candidate, dot / (query_norm * self._norm(vector))))
+
+        scores.sort(key=lambda item: (-item[1], item[0]))
+        return [(candidate, round(score, 4)) for candidate, score in scores[:limit]]
+
+    # Disk cache
+
+    def _load_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'rb') as f:
+                data = pickle.load(f)
+        except Exception as e:
+            print(f"Failed to load similarity index cache: {e}")
+            return
+        if data.get('version') != CACHE_VERSION:
+            return
+        self._reset()
+        for air_id, terms in data['doc_terms'].items():
+            self._add(air_id, terms)
+        self.watermark = data['watermark']
+        self.recent = data['recent']
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        directory = os.path.dirname(self.cache_path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(
+                    {
+                        'version': CACHE_VERSION,
+                        'doc_terms': self.doc_terms,
+                        'watermark': self.watermark,
+                        'recent': self.recent,
+                    },
+                    f, protocol=pickle.HIGHEST_PROTOCOL
+                )
+            # Atomic replace so other workers never read a partial file
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Failed to save similarity index cache: {e}")
+
+
+_similarity_index = None
+_similarity_index_lock = threading.Lock()
+
+
+def get_similarity_index():
+    """Return the process-wide SimilarityIndex backed by SIMILARITY_INDEX_PATH."""
+    global _similarity_index
+    if _similarity_index is None:
+        with _similarity_index_lock:
+            if _similarity_index is None:
+                config = get_config()
+                _similarity_index = SimilarityIndex(
+                    getattr(settings, 'SIMILARITY_INDEX_PATH', None),
+                    refresh_interval=config['REFRESH_INTERVAL'],
+                    save_interval=config['SAVE_INTERVAL']
+                )
+    return _similarity_index
@@ -1,8 +1,48 @@
-from django.test import TestCase
-from django.urls import reverse
-from rest_framework.test import APITestCase
+import csv
+import gzip
+import importlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+import httpx
+import fastapi_app
+from datetime import timedelta
+from xml.etree import ElementTree
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import resolve, reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.apps import apps as django_apps
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.db.models import F
+from django.utils import timezone
+from fastapi.testclient import TestClient
+from django.test.utils import CaptureQueriesContext
+from io import StringIO
+from rest_framework.test import APIRequestFactory, APITestCase
 from rest_framework import status
-from .models import Automation
+from unittest.mock import patch
+from .models import Automation, AuditLog, SearchQueryStat, Person, AutomationPersonRole, Environment, Metrics, AutomationLSHBucket, ImportJob, IdempotencyKey
+from .analytics import SearchAnalytics, OTHER_QUERY
+from .search import AutomationSearchService
+from . import search_index
+from .similarity import SimilarityIndex
+from .serializers import AutomationCreateSerializer
+from .import_jobs import run_job
+from . import csv_import
+from .duplicates import find_duplicate_pairs, index_automations, index_rows
+from .bulk import NameCache, bulk_create_automations, resolve_people, update_automations
+from .csv_mapping import EXPORT_HEADERS, row_to_automation
+from .json_stream import JSONArrayDecoder
+from .write_queue import WriteQueue
+from .import_client import ImportClient
+from . import idempotency
+from .xlsx import column_letter, iter_xlsx
 
 
 class AutomationModelTest(TestCase):
@@ -119,3 +159,1451 @@ class AutomationAPITest(APITestCase):
         }
         response = self.client.post(self.list_url, data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SearchAnalyticsTest(APITestCase):
+    def setUp(self):
+        self.analytics = SearchAnalytics(flush_interval=0)
+    
+    def test_search_does_not_write_audit_log(self):
+        """Test that searching records analytics in memory instead of writing audit rows"""
+        Automation.objects.create(air_id="SA001", name="Invoice Bot", type="Process")
+        with patch('automations.views.get_search_analytics', return_value=self.analytics):
+            response = self.client.get(reverse('automation-search'), {'q': 'Invoice'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(AuditLog.objects.filter(action='search').count(), 0)
+        self.assertEqual(self.analytics.snapshot()['invoice']['search_count'], 1)
+    
+    def test_flush_writes_aggregated_rows(self):
+        """Test that repeated searches flush as one aggregated row per query"""
+        for _ in range(3):
+            self.analytics.record('Invoice  Bot', results_count=2, latency_ms=12)
+        self.analytics.record('missing', results_count=0, latency_ms=3000)
+        
+        self.assertEqual(self.analytics.flush(), 2)
+        self.assertEqual(self.analytics.snapshot(), {})
+        
+        stat = SearchQueryStat.objects.get(query='invoice bot')
+        self.assertEqual(stat.search_count, 3)
+        self.assertEqual(stat.zero_result_count, 0)
+        self.assertEqual(stat.latency_histogram, {'25': 3})
+        self.assertEqual(SearchQueryStat.objects.get(query='missing').latency_histogram, {'inf': 1})
+    
+    def test_analytics_endpoint_scales_sampled_counts(self):
+        """Test that reported counts are scaled by the sample rate and bad parameters are rejected"""
+        sampled = SearchAnalytics(sample_rate=0.25, flush_interval=0)
+        with patch('automations.analytics.random.random', return_value=0.0):
+            for results_count in (1, 0, 0):
+                sampled.record('invoice', results_count=results_count, latency_ms=10)
+        sampled.flush()
+        self.analytics.record('invoice', results_count=1, latency_ms=40)
+        self.analytics.flush()
+
+        with patch('automations.views.get_search_analytics', return_value=self.analytics):
+            response = self.client.get(reverse('automation-search-analytics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        row = response.data['top_queries'][0]
+        self.assertEqual((row['query'], row['searches'], row['zero_results']), ('invoice', 13, 8))
+        self.assertEqual(row['avg_latency_ms'], 17.5)
+
+        for params in ({'days': 'week'}, {'limit': '1.5'}):
+            response = self.client.get(reverse('automation-search-analytics'), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sampling_and_query_cap(self):
+        """Test that sampling skips searches and distinct queries are capped"""
+        SearchAnalytics(sample_rate=0.0, flush_interval=0).record('x', 1, 1)
+        capped = SearchAnalytics(flush_interval=0, max_queries=2)
+        for query in ['a', 'b', 'c', 'd']:
+            capped.record(query, 1, 1)
+        self.assertEqual(set(capped.snapshot()), {'a', 'b', OTHER_QUERY})
+        self.assertEqual(capped.snapshot()[OTHER_QUERY]['search_count'], 2)
+
+
+class SearchIndexBuildTest(TestCase):
+    def setUp(self):
+        Automation.objects.create(air_id="FTS001", name="Invoice Reader", type="Process")
+    
+    def test_writes_during_build_are_caught_up_at_swap(self):
+        """Test that rows written while the shadow index builds are searchable after the swap"""
+        search_index.build_shadow_index(batch_size=1)
+        Automation.objects.create(air_id="FTS002", name="Payroll Zebra", type="Process")
+        Automation.objects.filter(air_id="FTS001").delete()
+        
+        self.assertEqual(search_index.swap_in_shadow_index(), 1)
+        self.assertEqual([r['air_id'] for r in AutomationSearchService._fts5_search('zebra')], ['FTS002'])
+        self.assertEqual(AutomationSearchService._fts5_search('invoice'), [])
+    
+    def test_triggers_index_child_rows(self):
+        """Test that the live triggers re-index an automation when its people change"""
+        call_command('setup_fts', stdout=StringIO())
+        person = Person.objects.create(name="Quentin Developer")
+        AutomationPersonRole.objects.create(
+            automation=Automation.objects.get(air_id="FTS001"), person=person, role='developer'
+        )
+        self.assertEqual([r['air_id'] for r in AutomationSearchService._fts5_search('quentin')], ['FTS001'])
+
+
+class SearchIndexCheckTest(TestCase):
+    def setUp(self):
+        for i in range(3):
+            Automation.objects.create(air_id=f"CHK00{i}", name=f"Checker {i}", type="Process")
+        search_index.rebuild_index()
+    
+    def test_consistent_index_reports_no_drift(self):
+        """Test that a freshly built index has no drift"""
+        report = search_index.check_index(full=True)
+        self.assertEqual(report['checked'], 3)
+        self.assertEqual(report['missing'] + report['stale'] + report['orphaned'], 0)
+
+    def test_check_only_renders_documents_written_since_last_check(self):
+        """Test that the check skips verified documents and picks up writes made through the ORM"""
+        self.assertEqual(search_index.check_index()['checked'], 0)
+        Automation.objects.filter(air_id='CHK001').update(name='Checker One')
+        AutomationPersonRole.objects.create(
+            automation=Automation.objects.get(air_id='CHK002'), person=Person.objects.create(name='Pat'), role='tester'
+        )
+        report = search_index.check_index()
+        self.assertEqual(report['checked'], 2)
+        self.assertEqual(report['missing'] + report['stale'] + report['orphaned'], 0)
+        self.assertEqual(search_index.check_index()['checked'], 0)
+    
+    def test_repair_fixes_only_drifted_documents(self):
+        """Test that writes bypassing the triggers are detected and repaired"""
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER automations_fts_update")
+            cursor.execute("DROP TRIGGER automations_fts_delete")
+            cursor.execute("UPDATE automations SET name = 'Walrus' WHERE air_id = 'CHK001'")
+            cursor.execute("DELETE FROM automations WHERE air_id = 'CHK002'")
+            cursor.execute("DELETE FROM automations_fts WHERE air_id = 'CHK000'")
+        
+        # The hash triggers logged the update and delete; unrepaired drift stays logged
+        for _ in range(2):
+            report = search_index.check_index()
+            self.assertEqual((report['checked'], report['stale'], report['orphaned']), (2, 1, 1))
+        report = search_index.check_index(repair=True)
+        self.assertEqual((report['missing'], report['stale'], report['orphaned']), (0, 1, 1))
+        self.assertEqual(report['repaired'], 2)
+        self.assertEqual([r['air_id'] for r in AutomationSearchService._fts5_search('walrus')], ['CHK001'])
+        self.assertEqual(search_index.check_index()['checked'], 0)
+
+        # Edits made in the index itself are only seen by a full check
+        report = search_index.check_index(repair=True, full=True)
+        self.assertEqual((report['missing'], report['stale'], report['orphaned']), (1, 0, 0))
+        self.assertEqual(report['repaired'], 1)
+        
+        out = StringIO()
+        call_command('check_search_index', stdout=out)
+        self.assertIn('Search index is consistent', out.getvalue())
+
+
+class SimilarAutomationsTest(APITestCase):
+    def setUp(self):
+        Automation.objects.create(air_id="SIM001", name="Invoice Processing", type="Process",
+                                  brief_description="Reads vendor invoices from the shared mailbox")
+        Automation.objects.create(air_id="SIM002", name="Invoice Approval", type="Process",
+                                  brief_description="Routes vendor invoices for approval")
+        Automation.objects.create(air_id="SIM003", name="Payroll Report", type="Report",
+                                  brief_description="Monthly payroll summary")
+        self.index = SimilarityIndex()
+    
+    def test_similar_endpoint_ranks_by_shared_terms(self):
+        """Test that the most textually similar automation is returned first, without refreshing in the request"""
+        self.index.refresh()
+        Automation.objects.create(air_id="SIM004", name="Invoice Processing Copy", type="Process",
+                                  brief_description="Reads vendor invoices from the shared mailbox")
+        with patch('automations.views.get_similarity_index', return_value=self.index):
+            response = self.client.get(reverse('automation-similar', kwargs={'air_id': 'SIM001'}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([s['air_id'] for s in response.data['similar']], ['SIM002'])
+
+    def test_refresh_catches_late_commits_and_queryset_updates(self):
+        """Test that rows stamped before the watermark but committed later, and queryset updates, are picked up"""
+        self.index.refresh()
+        late = self.index.watermark - timedelta(seconds=1)
+        Automation.objects.create(air_id="SIM004", name="Payroll Reconciliation", type="Report")
+        Automation.objects.filter(air_id="SIM004").update(updated_at=late)
+        Automation.objects.filter(air_id="SIM002").update(brief_description="Monthly approval summary")
+        self.assertEqual(self.index.refresh(), 2)
+        self.assertEqual({air_id for air_id, _ in self.index.similar('SIM003')}, {'SIM002', 'SIM004'})
+        self.assertEqual(self.index.refresh(), 0)
+    
+    def test_refresh_is_incremental(self):
+        """Test that refresh only picks up changed and deleted automations"""
+        self.assertEqual(self.index.refresh(), 3)
+        self.assertEqual(self.index.refresh(), 0)
+        
+        Automation.objects.create(air_id="SIM004", name="Payroll Reconciliation", type="Report")
+        Automation.objects.filter(air_id="SIM002").delete()
+        self.assertEqual(self.index.refresh(), 2)
+        self.assertEqual([air_id for air_id, _ in self.index.similar('SIM003')], ['SIM004'])
+        self.assertEqual(self.index.similar('SIM001'), [])
+
+    def test_refresh_is_throttled_and_cache_only_read_once(self):
+        """Test that checks are skipped within the refresh interval and other workers' saves aren't reloaded"""
+        cache_path = os.path.join(tempfile.mkdtemp(), 'similarity.pickle')
+        self.addCleanup(shutil.rmtree, os.path.dirname(cache_path), ignore_errors=True)
+        SimilarityIndex(cache_path).refresh()
+
+        index = SimilarityIndex(cache_path, refresh_interval=60)
+        self.assertEqual(index.refresh(), 0)  # Loaded from the cache, nothing new
+        Automation.objects.create(air_id="SIM004", name="Payroll Reconciliation", type="Report")
+        with self.assertNumQueries(0):
+            self.assertEqual(index.refresh(), 0)
+
+        other_worker = SimilarityIndex(cache_path)
+        Automation.objects.filter(air_id="SIM001").update(name="Invoice Capture", updated_at=timezone.now())
+        self.assertEqual(other_worker.refresh(), 2)
+        with patch('automations.similarity.pickle.load') as load:
+            self.assertEqual(index.refresh(force=True), 2)
+        load.assert_not_called()
+        self.assertEqual([air_id for air_id, _ in index.similar('SIM003')], ['SIM004'])
+
+
+class DuplicateDetectionTest(APITestCase):
+    def setUp(self):
+        self.original = {
+            'air_id': 'DUP001',
+            'name': 'Vendor Invoice Processing',
+            'type': 'Process',
+            'brief_description': 'Reads vendor invoices from the finance mailbox and posts them to SAP for approval',
+        }
+        self.client.post(reverse('automation-list'), self.original, format='json')
+    
+    def test_bulk_create_reports_possible_duplicates(self):
+        """Test that bulk create flags rows that repeat an existing automation under a new AIR ID"""
+        payload = [
+            dict(self.original, air_id='DUP002', name='Vendor Invoice Processing Bot'),
+            {'air_id': 'DUP003', 'name': 'Payroll Report', 'type': 'Report'},
+        ]
+        response = self.client.post(reverse('automation-bulk-create'), payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([d['air_id'] for d in response.data[0]['possible_duplicates']], ['DUP001'])
+        self.assertEqual(response.data[1]['possible_duplicates'], [])
+
+    def test_bulk_create_indexes_after_writing(self):
+        """Test that rows from different chunks match each other and are indexed once the write is done"""
+        payload = [
+            dict(self.original, air_id='DUP002', name='Vendor Invoice Processing Bot'),
+            {'air_id': 'DUP003', 'name': 'Payroll Report', 'type': 'Report'},
+            dict(self.original, air_id='DUP004', name='Vendor Invoice Processing Bot'),
+        ]
+        with patch('automations.views.BATCH_SIZE', 1), \
+                patch('automations.views.index_rows', wraps=index_rows) as index:
+            response = self.client.post(reverse('automation-bulk-create'), payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(index.call_count, 1)
+        self.assertEqual([d['air_id'] for d in response.data[2]['possible_duplicates']], ['DUP002', 'DUP001'])
+        self.assertEqual(
+            set(AutomationLSHBucket.objects.values_list('automation_id', flat=True)),
+            {'DUP001', 'DUP002', 'DUP003', 'DUP004'}
+        )
+
+    def test_find_duplicates_command(self):
+        """Test that the command lists duplicate pairs across the table"""
+        Automation.objects.create(**dict(self.original, air_id='DUP009'))
+        out = StringIO()
+        call_command('find_duplicates', '--rebuild', stdout=out)
+        self.assertIn('DUP001  DUP009  1.000', out.getvalue())
+
+    def test_pairs_only_come_from_buckets_shared_within_a_band(self):
+        """Test that a bucket value repeated in another band doesn't make rows candidates"""
+        Automation.objects.create(**dict(self.original, air_id='DUP009'))
+        AutomationLSHBucket.objects.all().delete()
+        AutomationLSHBucket.objects.bulk_create([
+            AutomationLSHBucket(automation_id='DUP001', band=0, bucket='aaaa'),
+            AutomationLSHBucket(automation_id='DUP009', band=1, bucket='aaaa'),
+        ])
+        self.assertEqual(find_duplicate_pairs(), [])
+
+        AutomationLSHBucket.objects.create(automation_id='DUP009', band=0, bucket='aaaa')
+        self.assertEqual(find_duplicate_pairs(), [('DUP001', 'DUP009', 1.0)])
+
+
+class BulkCreateTest(APITestCase):
+    def _row(self, i, **extra):
+        row = {
+            'air_id': f'BLK{i:03d}',
+            'name': f'Bulk Automation {i}',
+            'type': 'Process',
+            'tool_name': 'UiPath',
+            'modified_by_name': 'Alice',
+            'people_data': [
+                {'name': 'Alice', 'role': 'developer'},
+                {'name': f'Tester {i % 2}', 'role': 'tester'},
+            ],
+            'environments_data': [{'type': 'dev', 'vdi': f'VDI-{i}'}],
+            'test_data_data': {'spoc': 'Bob'},
+            'metrics_data': {'post_prod_total_cases': i},
+        }
+        row.update(extra)
+        return row
+    
+    def test_bulk_create_writes_nested_rows_set_based(self):
+        """Test that the bulk path creates every child row with a constant number of queries"""
+        Person.objects.create(name='Alice')
+        payload = [self._row(i) for i in range(20)]
+        serializer = AutomationCreateSerializer(data=payload, many=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with self.assertNumQueries(13):
+            serializer.save()
+        
+        self.assertEqual(Automation.objects.count(), 20)
+        self.assertEqual(Person.objects.filter(name='Alice').count(), 1)
+        self.assertEqual(AutomationPersonRole.objects.count(), 40)
+        automation = Automation.objects.get(air_id='BLK007')
+        self.assertEqual(automation.tool.name, 'UiPath')
+        self.assertEqual(automation.modified_by.name, 'Alice')
+        self.assertEqual(automation.environments.get().vdi, 'VDI-7')
+        self.assertEqual(automation.test_data.spoc.name, 'Bob')
+        self.assertEqual(automation.metrics.post_prod_total_cases, 7)
+    
+    def test_one_name_cache_per_request(self):
+        """Test that every chunk of a bulk create resolves tool and person names through one cache"""
+        names = NameCache()
+        serializer = AutomationCreateSerializer(data=[self._row(i) for i in range(2)], many=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with patch('automations.serializers.bulk_create_automations', wraps=bulk_create_automations) as write:
+            serializer.save(names=names)
+        self.assertIs(write.call_args.kwargs['names'], names)
+        self.assertEqual(Automation.objects.count(), 2)
+
+        with patch('automations.views.BATCH_SIZE', 1), \
+                patch('automations.views.bulk_create_automations', wraps=bulk_create_automations) as write:
+            response = self.client.post(reverse('automation-bulk-create'), [self._row(3), self._row(4)], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(write.call_count, 2)
+        self.assertIs(write.call_args_list[0].kwargs['names'], write.call_args_list[1].kwargs['names'])
+
+    def test_bulk_create_endpoint_is_atomic(self):
+        """Test that a failing batch leaves nothing behind"""
+        payload = [self._row(1), self._row(2, air_id='BLK001')]
+        response = self.client.post(reverse('automation-bulk-create'), payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Automation.objects.exists())
+        
+        # A conflict only found when writing (a row created concurrently) rolls back earlier chunks
+        def write(rows, **kwargs):
+            if rows[0]['air_id'] == 'BLK002':
+                raise IntegrityError('UNIQUE constraint failed: automations.air_id')
+            return bulk_create_automations(rows, **kwargs)
+        
+        with patch('automations.views.BATCH_SIZE', 1), patch('automations.views.bulk_create_automations', side_effect=write):
+            response = self.client.post(reverse('automation-bulk-create'), [self._row(1), self._row(2)], format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Automation.objects.filter(air_id='BLK001').exists())
+        self.assertFalse(Person.objects.filter(name='Tester 1').exists())
+    
+    def test_bulk_create_streams_chunks_and_reports_every_invalid_row(self):
+        """Test that a streamed body is validated per chunk and rolled back as a whole"""
+        payload = [self._row(i) for i in range(5)]
+        payload[3]['name'] = ''
+        with patch('automations.views.BATCH_SIZE', 2):
+            response = self.client.post(reverse('automation-bulk-create'), payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([bool(errors) for errors in response.data], [False, False, False, True, False])
+        self.assertEqual(Automation.objects.count(), 0)
+        
+        del payload[3]
+        with patch('automations.views.BATCH_SIZE', 2):
+            response = self.client.post(reverse('automation-bulk-create'), payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['air_id'] for item in response.data], ['BLK000', 'BLK001', 'BLK002', 'BLK004'])
+        # Compact per-row statuses, not the created automations
+        self.assertEqual(set(response.data[0]), {'air_id', 'status', 'possible_duplicates'})
+        self.assertEqual({item['status'] for item in response.data}, {'created'})
+    
+    def test_bulk_create_accepts_ndjson(self):
+        """Test that newline-delimited JSON bodies are accepted, also in isolated mode"""
+        body = '\n'.join(json.dumps(self._row(i)) for i in range(3)) + '\n'
+        response = self.client.post(reverse('automation-bulk-create'), body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Automation.objects.count(), 3)
+        
+        body = json.dumps(self._row(7)) + '\n{"air_id": "BLK008",\n'
+        response = self.client.post(
+            reverse('automation-bulk-create') + '?mode=isolated', body, content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data['status'], ['created'])
+        self.assertEqual(response.data['errors'][0]['index'], 1)
+        self.assertTrue(Automation.objects.filter(air_id='BLK007').exists())
+    
+    def test_array_decoder_handles_split_input(self):
+        """Test that elements split anywhere across reads are decoded once complete"""
+        text = ' [ {"a": "x,]y"} , 12 , [1, 2], -3.5e2 ] '
+        decoder = JSONArrayDecoder()
+        elements = []
+        for char in text:
+            elements += decoder.feed(char)
+        elements += decoder.feed('', final=True)
+        self.assertEqual(elements, [{'a': 'x,]y'}, 12, [1, 2], -350.0])
+        
+        for bad in ['{"a": 1}', '[1 2]', '[1,', '[] 1', '[{"a": 1},]']:
+            with self.assertRaises(ValueError, msg=bad):
+                list(JSONArrayDecoder().feed(bad, final=True))
+
+
+class CompressedBodyTest(APITestCase):
+    def _rows(self, count):
+        return [{'air_id': f'GZ{i:03d}', 'name': f'Compressed {i}', 'type': 'Process'} for i in range(count)]
+    
+    def test_gzip_bodies_are_accepted(self):
+        """Test that gzip-encoded JSON, NDJSON and CSV bodies are decompressed as they are parsed"""
+        body = gzip.compress(json.dumps(self._rows(3)).encode())
+        response = self.client.post(
+            reverse('automation-bulk-create'), body, content_type='application/json', HTTP_CONTENT_ENCODING='gzip'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        
+        # Concatenated members, as produced by appending to a .gz file
+        rows = [json.dumps(row) + '\n' for row in self._rows(6)[3:]]
+        body = b''.join(gzip.compress(row.encode()) for row in rows)
+        response = self.client.post(
+            reverse('automation-bulk-create'), body, content_type='application/x-ndjson', HTTP_CONTENT_ENCODING='gzip'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        
+        body = gzip.compress(CSVImportTest.CSV.encode())
+        response = self.client.post(
+            reverse('automation-import-csv'), body, content_type='text/csv', HTTP_CONTENT_ENCODING='gzip'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(Automation.objects.count(), 8)
+    
+    def test_bombs_and_bad_encodings_are_refused(self):
+        """Test the decompressed size and ratio limits, truncated bodies and unknown encodings"""
+        url = reverse('automation-bulk-create')
+        bomb = gzip.compress(b'[' + b' ' * (4 * 1024 * 1024) + b']')
+        response = self.client.post(url, bomb, content_type='application/json', HTTP_CONTENT_ENCODING='gzip')
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        
+        body = gzip.compress(json.dumps(self._rows(50)).encode())
+        with override_settings(REQUEST_DECOMPRESSION={'MAX_SIZE': 1000}):
+            response = self.client.post(url, body, content_type='application/json', HTTP_CONTENT_ENCODING='gzip')
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        
+        response = self.client.post(url, body[:-20], content_type='application/json', HTTP_CONTENT_ENCODING='gzip')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response = self.client.post(url, body, content_type='application/json', HTTP_CONTENT_ENCODING='br')
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        self.assertEqual(Automation.objects.count(), 0)
+        
+        with tempfile.TemporaryDirectory() as upload_dir:
+            with override_settings(IMPORT_JOBS={'DIR': upload_dir, 'RUN_IN_PROCESS': False}):
+                response = self.client.post(
+                    reverse('importjob-list'), bomb, content_type='text/csv', HTTP_CONTENT_ENCODING='gzip'
+                )
+            self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            self.assertEqual(os.listdir(upload_dir), [])
+        self.assertFalse(ImportJob.objects.exists())
+
+
+class PersonNameTest(TestCase):
+    def test_names_resolve_on_normalized_form(self):
+        """Test that case and whitespace variants of a name resolve to one person"""
+        alice = Person.objects.create(name='Alice')
+        people = resolve_people(['alice ', 'ALICE', 'Bob  Smith', 'bob smith'])
+        self.assertEqual(people['alice '], alice.id)
+        self.assertEqual(people['ALICE'], alice.id)
+        self.assertEqual(people['Bob  Smith'], people['bob smith'])
+        self.assertEqual(Person.objects.get(id=people['bob smith']).name, 'Bob  Smith')
+        self.assertEqual(Person.objects.count(), 2)
+    
+    def test_cache_only_queries_unseen_names_after_commit(self):
+        """Test that committed names are served from the cache and rolled-back ones are not"""
+        names = NameCache()
+        with self.captureOnCommitCallbacks(execute=True):
+            resolve_people(['Alice', 'Bob'], names)
+        with self.assertNumQueries(0):
+            resolve_people(['alice', 'Bob'], names)
+        with self.assertNumQueries(3):  # Look up, insert and re-read Carol only
+            self.assertEqual(resolve_people(['Alice', 'Carol'], names)['Alice'], names.people.ids['alice'])
+        
+        # Carol's transaction never committed, so she is looked up again
+        self.assertNotIn('carol', names.people.ids)
+    
+    def test_migration_merges_duplicates(self):
+        """Test that people differing only in case or spacing are merged into the oldest"""
+        migration = importlib.import_module('automations.migrations.0009_person_normalized_name')
+        alice = Person.objects.create(name='Alice')
+        duplicate = Person.objects.create(name='temp')
+        Person.objects.filter(id=duplicate.id).update(name=' alice', normalized_name='temp')
+        first = Automation.objects.create(air_id='MRG1', name='First', type='Process', modified_by=duplicate)
+        second = Automation.objects.create(air_id='MRG2', name='Second', type='Process')
+        AutomationPersonRole.objects.create(automation=first, person=alice, role='developer')
+        AutomationPersonRole.objects.create(automation=first, person=duplicate, role='developer')
+        AutomationPersonRole.objects.create(automation=second, person=duplicate, role='tester')
+        
+        migration.merge_duplicate_people(django_apps, connection.schema_editor())
+        
+        self.assertEqual(list(Person.objects.values_list('id', 'normalized_name')), [(alice.id, 'alice')])
+        self.assertEqual(Automation.objects.get(air_id='MRG1').modified_by_id, alice.id)
+        self.assertEqual(
+            sorted(AutomationPersonRole.objects.values_list('automation_id', 'role')),
+            [('MRG1', 'developer'), ('MRG2', 'tester')]
+        )
+
+
+class UpsertTest(APITestCase):
+    def setUp(self):
+        self.rows = [
+            {
+                'air_id': f'UPS{i}',
+                'name': f'Upsert Automation {i}',
+                'type': 'Process',
+                'tool_name': 'UiPath',
+                'people_data': [{'name': 'Alice', 'role': 'developer'}],
+                'metrics_data': {'post_prod_success_rate': 95.1},
+            }
+            for i in range(3)
+        ]
+        response = self.client.post(reverse('automation-upsert'), self.rows, format='json')
+        self.assertEqual(response.data, {'inserted': 3, 'updated': 0, 'unchanged': 0})
+    
+    def test_upsert_reports_inserted_updated_unchanged(self):
+        """Test that re-sending rows only rewrites the ones that changed"""
+        before = Automation.objects.get(air_id='UPS0')
+        created_at = Automation.objects.get(air_id='UPS1').created_at
+        rows = [dict(row) for row in self.rows]
+        rows[1]['name'] = 'Renamed'
+        rows[2]['people_data'] = [{'name': 'Bob', 'role': 'tester'}]
+        rows.append({'air_id': 'UPS9', 'name': 'New One', 'type': 'Process'})
+        
+        response = self.client.post(reverse('automation-upsert'), rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'inserted': 1, 'updated': 2, 'unchanged': 1})
+        
+        self.assertEqual(Automation.objects.get(air_id='UPS0').updated_at, before.updated_at)
+        self.assertEqual(Automation.objects.get(air_id='UPS1').name, 'Renamed')
+        self.assertEqual(Automation.objects.get(air_id='UPS1').created_at, created_at)
+        self.assertEqual(
+            list(AutomationPersonRole.objects.filter(automation_id='UPS2').values_list('person__name', 'role')),
+            [('Bob', 'tester')]
+        )
+    
+    def test_upsert_rejects_invalid_rows(self):
+        """Test that a batch with an invalid row writes nothing"""
+        response = self.client.post(
+            reverse('automation-upsert'),
+            [{'air_id': 'UPS7', 'name': 'Fine', 'type': 'Process'}, {'air_id': 'UPS8', 'name': ''}],
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Automation.objects.filter(air_id='UPS7').exists())
+    
+    def test_unchanged_rows_are_skipped_by_content_hash(self):
+        """Test that identical rows are matched on the stored hash without loading related rows"""
+        self.assertEqual(len(Automation.objects.get(air_id='UPS0').content_hash), 64)
+        rows = [dict(row, metrics_data={'post_prod_success_rate': '95.10'}) for row in self.rows]
+        
+        # Audit insert, tool and people lookups, the hash lookup and its savepoint
+        with self.assertNumQueries(6):
+            response = self.client.post(reverse('automation-upsert'), rows, format='json')
+        self.assertEqual(response.data, {'inserted': 0, 'updated': 0, 'unchanged': 3})
+    
+    def test_edits_outside_bulk_paths_drop_the_hash(self):
+        """Test that single-row edits clear the hash and an unchanged re-import restores it"""
+        automation = Automation.objects.get(air_id='UPS0')
+        automation.save()
+        self.assertIsNone(Automation.objects.get(air_id='UPS0').content_hash)
+        
+        response = self.client.post(reverse('automation-upsert'), self.rows[:1], format='json')
+        self.assertEqual(response.data['unchanged'], 1)
+        self.assertIsNotNone(Automation.objects.get(air_id='UPS0').content_hash)
+        
+        AutomationPersonRole.objects.get(automation_id='UPS0').delete()
+        self.assertIsNone(Automation.objects.get(air_id='UPS0').content_hash)
+        response = self.client.post(reverse('automation-upsert'), self.rows[:1], format='json')
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(AutomationPersonRole.objects.filter(automation_id='UPS0').count(), 1)
+        
+        self.client.patch(reverse('automation-bulk-update'), [{'air_id': 'UPS1', 'changes': {'comments': 'x'}}], format='json')
+        self.assertIsNone(Automation.objects.get(air_id='UPS1').content_hash)
+    
+    def test_preview_classifies_rows_without_writing(self):
+        """Test that every row is classified, with field diffs for changed ones, and nothing is written"""
+        changed = dict(self.rows[1], name='Renamed', people_data=[{'name': 'Zoe', 'role': 'developer'}])
+        payload = [
+            self.rows[0],
+            dict(self.rows[0], air_id='UPS9'),
+            changed,
+            {'air_id': 'BAD', 'name': '', 'type': 'Process'},
+            dict(self.rows[0], air_id='UPS9', name='Later'),
+        ]
+        Automation.objects.filter(air_id='UPS0').update(content_hash=None)
+        people = Person.objects.count()
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('automation-import-preview'), payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([q for q in queries if q['sql'].split()[0] in ('INSERT', 'UPDATE', 'DELETE')])
+        self.assertEqual(Person.objects.count(), people)
+        
+        rows = response.data['rows']
+        self.assertEqual([row['status'] for row in rows], ['unchanged', 'duplicate', 'changed', 'invalid', 'new'])
+        self.assertEqual(rows[2]['changes'], {
+            'name': {'old': 'Upsert Automation 1', 'new': 'Renamed'},
+            'people_data': {'old': [{'name': 'Alice', 'role': 'developer'}], 'new': [{'name': 'Zoe', 'role': 'developer'}]},
+        })
+        self.assertIn('name', rows[3]['errors'])
+        self.assertEqual(response.data['missing'], [{'air_id': 'UPS2', 'name': 'Upsert Automation 2'}])
+        self.assertEqual(
+            response.data['summary'],
+            {'total': 5, 'new': 1, 'changed': 1, 'unchanged': 1, 'invalid': 1, 'duplicate': 1, 'missing': 1}
+        )
+
+
+class CSVImportTest(APITestCase):
+    CSV = (
+        'AIR ID,Name,Type,Tool,Process Details,Developer,Business Stakeholders,Dev VDI,Post Production Total Cases\r\n'
+        'CSV001,Invoice Bot,RPA,UiPath,"1. Open mailbox\n2. Read, then post",Alice,Bob; Carol,VDI-1,12\r\n'
+        'CSV002,Report Bot,Report,,,,,,\r\n'
+    )
+    
+    def test_raw_csv_body_is_imported(self):
+        """Test that a text/csv body with quoted newlines and commas is parsed and written"""
+        response = self.client.post(reverse('automation-import-csv'), self.CSV, content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.data['inserted'], 2)
+        
+        automation = Automation.objects.get(air_id='CSV001')
+        self.assertEqual(automation.process_details, '1. Open mailbox\n2. Read, then post')
+        self.assertEqual(automation.tool.name, 'UiPath')
+        self.assertEqual(automation.environments.get().vdi, 'VDI-1')
+        self.assertEqual(automation.metrics.post_prod_total_cases, 12)
+        self.assertEqual(
+            sorted(automation.people_roles.values_list('person__name', 'role')),
+            [('Alice', 'developer'), ('Bob', 'business_stakeholder'), ('Carol', 'business_stakeholder')]
+        )
+    
+    def test_multipart_upload_in_chunks_upserts(self):
+        """Test that a multipart upload is written chunk by chunk and re-imports update in place"""
+        upload = SimpleUploadedFile('automations.csv', self.CSV.encode('utf-8'), content_type='text/csv')
+        response = self.client.post(reverse('automation-import-csv') + '?chunk_size=1', {'file': upload}, format='multipart')
+        self.assertEqual(response.data['inserted'], 2)
+        
+        csv_text = self.CSV.replace('Report Bot', 'Weekly Report Bot')
+        upload = SimpleUploadedFile('automations.csv', csv_text.encode('utf-8'), content_type='text/csv')
+        response = self.client.post(reverse('automation-import-csv'), {'file': upload}, format='multipart')
+        self.assertEqual((response.data['updated'], response.data['unchanged']), (1, 1))
+    
+    def test_invalid_rows_are_reported(self):
+        """Test that missing columns and invalid rows are reported with row numbers"""
+        response = self.client.post(reverse('automation-import-csv'), 'AIR ID,Name\r\nX,Y\r\n', content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('type', response.data['errors'][0]['errors']['columns'][0])
+        
+        csv_text = self.CSV + 'CSV003,,RPA,,,,,,\r\n'
+        response = self.client.post(reverse('automation-import-csv') + '?chunk_size=2', csv_text, content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['inserted'], 2)
+        self.assertEqual([e['row'] for e in response.data['errors']], [3])
+
+    
+    def test_parallel_parse_keeps_file_order(self):
+        """Test that parsing in worker processes writes and reports rows in file order"""
+        lines = [self.CSV.split('\r\n')[0]]
+        for i in range(12):
+            lines.append(f'PAR{i:03d},{"" if i == 7 else f"Parallel {i}"},RPA,UiPath,,Dev {i % 3},,,{"x" if i == 9 else i}')
+        text = '\r\n'.join(lines) + '\r\n'
+        
+        result = csv_import.import_csv(io.StringIO(text, newline=''), chunk_size=2, isolate=True, workers=2)
+        self.assertEqual((result['rows'], result['inserted']), (12, 10))
+        self.assertEqual([(e['row'], e['air_id']) for e in result['errors']], [(8, 'PAR007'), (10, 'PAR009')])
+        self.assertEqual(Automation.objects.get(air_id='PAR011').people_roles.get().person.name, 'Dev 2')
+
+class ImportJobTest(APITestCase):
+    CSV = 'AIR ID,Name,Type\r\n' + ''.join(f'JOB{i:03d},Job Automation {i},RPA\r\n' for i in range(5))
+    
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.upload_dir, ignore_errors=True)
+        settings_override = override_settings(IMPORT_JOBS={'DIR': self.upload_dir, 'RUN_IN_PROCESS': False})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+    
+    def _queue(self, query=''):
+        response = self.client.post(reverse('importjob-list') + query, self.CSV, content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        return response.data['id']
+    
+    def test_job_is_queued_then_run_by_worker(self):
+        """Test that posting returns a queued job that the worker command completes"""
+        job_id = self._queue()
+        self.assertEqual(ImportJob.objects.get(pk=job_id).status, 'queued')
+        self.assertEqual(Automation.objects.count(), 0)
+        
+        call_command('run_import_jobs', '--once', stdout=StringIO())
+        
+        response = self.client.get(reverse('importjob-detail', args=[job_id]))
+        self.assertEqual(response.data['status'], 'completed')
+        self.assertEqual((response.data['rows_processed'], response.data['inserted']), (5, 5))
+        self.assertNotIn('file_path', response.data)
+        self.assertEqual(os.listdir(self.upload_dir), [])
+    
+    def test_cancel_queued_and_finished_jobs(self):
+        """Test that a queued job cancels at once and a finished one can't be cancelled"""
+        job_id = self._queue()
+        response = self.client.post(reverse('importjob-cancel', args=[job_id]))
+        self.assertEqual(response.data['status'], 'cancelled')
+        call_command('run_import_jobs', '--once', stdout=StringIO())
+        self.assertEqual(Automation.objects.count(), 0)
+        
+        response = self.client.post(reverse('importjob-cancel', args=[job_id]))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+    
+    def test_running_job_stops_after_current_chunk(self):
+        """Test that a cancel request stops a running job between chunks"""
+        job_id = self._queue('?chunk_size=2')
+        ImportJob.objects.filter(pk=job_id).update(cancel_requested=True)
+        self.assertTrue(run_job(job_id))
+        
+        job = ImportJob.objects.get(pk=job_id)
+        self.assertEqual((job.status, job.rows_processed), ('cancelled', 2))
+        self.assertEqual(Automation.objects.count(), 2)
+
+    def test_jobs_of_a_dead_worker_are_recovered(self):
+        """Test that running jobs without a recent heartbeat are requeued, or failed after too many attempts"""
+        long_ago = timezone.now() - timedelta(hours=1)
+        requeued, exhausted, alive = self._queue(), self._queue(), self._queue()
+        ImportJob.objects.filter(pk=requeued).update(status='running', started_at=long_ago, heartbeat_at=long_ago, attempts=1)
+        ImportJob.objects.filter(pk=exhausted).update(status='running', started_at=long_ago, heartbeat_at=long_ago, attempts=3)
+        ImportJob.objects.filter(pk=alive).update(status='running', started_at=long_ago, heartbeat_at=timezone.now(), attempts=1)
+
+        out = StringIO()
+        call_command('run_import_jobs', '--once', stdout=out)
+        self.assertIn('Recovered 2 import jobs', out.getvalue())
+
+        job = ImportJob.objects.get(pk=requeued)
+        self.assertEqual((job.status, job.attempts, job.inserted), ('completed', 2, 5))
+        job = ImportJob.objects.get(pk=exhausted)
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('3 attempts', job.error_message)
+        self.assertEqual(ImportJob.objects.get(pk=alive).status, 'running')
+        self.assertEqual(len(os.listdir(self.upload_dir)), 1)
+
+    def test_recovered_run_stops_without_touching_the_job(self):
+        """Test that a slow run whose job was requeued and claimed again stops at its next chunk"""
+        job_id = self._queue('?chunk_size=2')
+        import_csv = csv_import.import_csv
+
+        def taken_over(lines, progress, **kwargs):
+            def progress_after_takeover(result):
+                # Recovered as stale and claimed by another run during the chunk
+                ImportJob.objects.filter(pk=job_id).update(attempts=F('attempts') + 1, heartbeat_at=timezone.now())
+                progress(result)
+            return import_csv(lines, progress=progress_after_takeover, **kwargs)
+
+        with patch('automations.import_jobs.import_csv', taken_over):
+            self.assertFalse(run_job(job_id))
+
+        job = ImportJob.objects.get(pk=job_id)
+        self.assertEqual((job.status, job.attempts, job.rows_processed), ('running', 2, 0))
+        self.assertEqual(Automation.objects.count(), 2)
+        self.assertEqual(len(os.listdir(self.upload_dir)), 1)
+
+
+class ImportJobHeartbeatTest(TransactionTestCase):
+    def test_heartbeat_is_written_during_a_slow_chunk(self):
+        """Test that a running job's heartbeat advances while no chunk completes"""
+        upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_dir, ignore_errors=True)
+        with override_settings(IMPORT_JOBS={'DIR': upload_dir, 'RUN_IN_PROCESS': False, 'STALE_AFTER': 0.3}):
+            response = self.client.post(reverse('importjob-list'), ImportJobTest.CSV, content_type='text/csv')
+            job_id = response.json()['id']
+
+            def slow_import(lines, **kwargs):
+                time.sleep(0.5)
+                return {'rows': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'errors': []}
+
+            with patch('automations.import_jobs.import_csv', slow_import):
+                self.assertTrue(run_job(job_id))
+
+        job = ImportJob.objects.get(pk=job_id)
+        self.assertEqual(job.status, 'completed')
+        self.assertGreater(job.heartbeat_at, job.started_at)
+
+
+class SlowBody(io.RawIOBase):
+    """A request body read a few bytes at a time, running `on_read` before the final piece."""
+
+    def __init__(self, data, on_read, piece_size=64):
+        self.data = data
+        self.on_read = on_read
+        self.piece_size = piece_size
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        if self.position + self.piece_size >= len(self.data) and self.on_read:
+            self.on_read()
+            self.on_read = None
+        piece = self.data[self.position:self.position + self.piece_size]
+        self.position += len(piece)
+        return piece
+
+
+class StreamedBulkCreateTest(TransactionTestCase):
+    def test_upload_does_not_hold_the_write_lock(self):
+        """Test that another writer can commit while a bulk create body is still streaming in"""
+        rows = [{'air_id': f'SLW{i:03d}', 'name': f'Slow Automation {i}', 'type': 'RPA'} for i in range(4)]
+        body = json.dumps(rows).encode()
+        outcome = {}
+
+        def other_writer():
+            try:
+                AuditLog.objects.create(action='CREATE', object_type='Automation', object_id='OTHER')
+                outcome['written'] = True
+            except Exception as e:
+                outcome['error'] = e
+            finally:
+                connection.close()
+
+        def write_meanwhile():
+            thread = threading.Thread(target=other_writer)
+            thread.start()
+            thread.join(timeout=60)
+
+        request = APIRequestFactory().post(reverse('automation-bulk-create'), body, content_type='application/json')
+        request._stream = SlowBody(body, write_meanwhile)
+        with patch('automations.views.BATCH_SIZE', 1):
+            response = resolve(request.path).func(request)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(outcome, {'written': True})
+        self.assertEqual(Automation.objects.filter(air_id__startswith='SLW').count(), 4)
+
+    def test_repeated_air_ids_across_chunks_are_rejected(self):
+        """Test that an AIR ID repeated in a later chunk is a validation error, with nothing written"""
+        rows = [{'air_id': 'REP001', 'name': 'First', 'type': 'RPA'}, {'air_id': 'REP001', 'name': 'Again', 'type': 'RPA'}]
+        with patch('automations.views.BATCH_SIZE', 1):
+            response = self.client.post(reverse('automation-bulk-create'), json.dumps(rows), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()[0], {})
+        self.assertIn('air_id', response.json()[1])
+        self.assertFalse(Automation.objects.exists())
+
+
+class IsolatedBulkWriteTest(APITestCase):
+    def _rows(self, count):
+        return [{'air_id': f'ISO{i:03d}', 'name': f'Isolated {i}', 'type': 'Process'} for i in range(count)]
+    
+    def test_bulk_create_skips_only_bad_rows(self):
+        """Test that invalid and conflicting rows fail alone while the rest are committed"""
+        rows = self._rows(6)
+        rows[1]['name'] = ''               # Invalid
+        rows[4]['air_id'] = 'ISO002'       # Duplicate inside the batch, fails at write time
+        
+        response = self.client.post(reverse('automation-bulk-create') + '?mode=isolated', rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data['status'], ['created', 'invalid', 'created', 'created', 'failed', 'created'])
+        self.assertEqual(response.data['counts'], {'created': 4, 'invalid': 1, 'failed': 1})
+        self.assertEqual([e['index'] for e in response.data['errors']], [1, 4])
+        self.assertEqual(
+            sorted(Automation.objects.values_list('air_id', flat=True)),
+            ['ISO000', 'ISO002', 'ISO003', 'ISO005']
+        )
+    
+    def test_upsert_statuses_per_row(self):
+        """Test that isolated upserts report inserted/updated/unchanged per row"""
+        rows = self._rows(3)
+        self.client.post(reverse('automation-upsert'), rows[:2], format='json')
+        rows[1]['name'] = 'Changed'
+        rows.append({'air_id': 'ISO009'})
+        
+        response = self.client.post(reverse('automation-upsert') + '?mode=isolated', rows, format='json')
+        self.assertEqual(response.data['status'], ['unchanged', 'updated', 'inserted', 'invalid'])
+    
+    def test_csv_import_continues_past_bad_rows(self):
+        """Test that an isolated CSV import writes every good row and lists the bad ones"""
+        csv_text = 'AIR ID,Name,Type,Post Production Total Cases\r\n' + ''.join(
+            f'ISO{i:03d},Isolated {i},RPA,{"many" if i == 3 else i}\r\n' for i in range(8)
+        ) + 'ISO100,,RPA,\r\n'
+        response = self.client.post(
+            reverse('automation-import-csv') + '?mode=isolated&chunk_size=3', csv_text, content_type='text/csv'
+        )
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual((response.data['rows'], response.data['inserted']), (9, 7))
+        self.assertEqual([e['row'] for e in response.data['errors']], [4, 9])
+
+
+class CSVExportTest(APITestCase):
+    def setUp(self):
+        rows = [
+            {
+                'air_id': f'EXP{i:03d}',
+                'name': f'Export Automation {i}',
+                'type': 'RPA' if i % 2 else 'Report',
+                'tool_name': 'UiPath',
+                'prod_deploy_date': '2024-02-01T14:20:00Z',
+                'people_data': [
+                    {'name': 'Alice', 'role': 'developer'},
+                    {'name': 'Bob', 'role': 'business_stakeholder'},
+                    {'name': 'Carol', 'role': 'business_stakeholder'},
+                ],
+                'environments_data': [{'type': 'prod', 'vdi': 'PRD-1', 'service_account': 'svc_prd'}],
+                'test_data_data': {'spoc': 'Dan'},
+                'metrics_data': {'post_prod_success_rate': 99.5},
+                'artifacts_data': {'code_review': 'completed'},
+            }
+            for i in range(6)
+        ]
+        self.client.post(reverse('automation-bulk-create'), rows, format='json')
+    
+    def _rows(self, response):
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+    
+    def test_export_uses_canonical_columns(self):
+        """Test that the export streams the import format and round-trips through the mapping"""
+        with self.assertNumQueries(7):
+            response = self.client.get('/api/automations/export.csv')
+            rows = self._rows(response)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(rows[0], EXPORT_HEADERS)
+        self.assertEqual(len(rows), 7)
+        
+        exported = dict(zip(rows[0], rows[-1]))
+        self.assertEqual(exported['AIR ID'], 'EXP000')
+        self.assertEqual(exported['Prod Deploy Date'], '2024-02-01T14:20:00Z')
+        self.assertEqual(exported['Business Stakeholders'], 'Bob; Carol')
+        self.assertEqual(exported['Production VDI'], 'PRD-1')
+        self.assertEqual(exported['Post Production Success Rate'], '99.50')
+        
+        payload = row_to_automation(exported)
+        self.assertEqual(payload['environments_data'], [{'type': 'prod', 'vdi': 'PRD-1', 'service_account': 'svc_prd'}])
+        self.assertEqual(len(payload['people_data']), 3)
+
+    def test_export_round_trips_through_import(self):
+        """Test that re-importing an export keeps UAT environments and every person in a role"""
+        self.client.post(reverse('automation-bulk-create'), [{
+            'air_id': 'EXP100', 'name': 'Round Trip', 'type': 'RPA',
+            'people_data': [{'name': 'Alice', 'role': 'developer'}, {'name': 'Erin', 'role': 'developer'}],
+            'environments_data': [
+                {'type': 'uat', 'vdi': 'UAT-1', 'service_account': 'svc_uat'},
+                {'type': 'dev', 'vdi': 'DEV-1', 'service_account': ''},
+                {'type': 'dev', 'vdi': 'DEV-2', 'service_account': 'svc_dev'},
+            ],
+        }], format='json')
+        exported = b''.join(self.client.get('/api/automations/export.csv?q=EXP100').streaming_content)
+        row = dict(zip(*csv.reader(io.StringIO(exported.decode('utf-8')))))
+        self.assertEqual((row['UAT VDI'], row['Developer'], row['Dev VDI']), ('UAT-1', 'Alice; Erin', 'DEV-1; DEV-2'))
+
+        response = self.client.post(reverse('automation-import-csv'), exported, content_type='text/csv')
+        self.assertEqual((response.data['updated'], response.data['unchanged']), (0, 1))
+        automation = Automation.objects.get(air_id='EXP100')
+        self.assertEqual(
+            sorted(automation.environments.values_list('type', 'vdi', 'service_account')),
+            [('dev', 'DEV-1', ''), ('dev', 'DEV-2', 'svc_dev'), ('uat', 'UAT-1', 'svc_uat')]
+        )
+        self.assertEqual(automation.people_roles.filter(role='developer').count(), 2)
+
+    def test_export_filters_and_gzip(self):
+        """Test that list/search filters apply and gzip is negotiated"""
+        rows = self._rows(self.client.get('/api/automations/export.csv?search=Report'))
+        self.assertEqual(len(rows), 4)
+        rows = self._rows(self.client.get('/api/automations/export.csv?q=EXP003'))
+        self.assertEqual([row[0] for row in rows[1:]], ['EXP003'])
+        
+        response = self.client.get('/api/automations/export.csv', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        content = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8')
+        self.assertEqual(len(list(csv.reader(io.StringIO(content)))), 7)
+    
+    def test_xlsx_export(self):
+        """Test that the XLSX export is a valid workbook with the CSV export's columns"""
+        response = self.client.get('/api/automations/export.xlsx?search=Report')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as workbook:
+            self.assertIn('xl/workbook.xml', workbook.namelist())
+            namespace = {'m': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+            shared = [
+                node.text for node in
+                ElementTree.fromstring(workbook.read('xl/sharedStrings.xml')).findall('m:si/m:t', namespace)
+            ]
+            sheet = ElementTree.fromstring(workbook.read('xl/worksheets/sheet1.xml'))
+        
+        rows = []
+        for row in sheet.findall('m:sheetData/m:row', namespace):
+            cells = {}
+            for cell in row.findall('m:c', namespace):
+                column = ''.join(ch for ch in cell.get('r') if ch.isalpha())
+                if cell.get('t') == 's':
+                    cells[column] = shared[int(cell.find('m:v', namespace).text)]
+                elif cell.get('t') == 'inlineStr':
+                    cells[column] = cell.find('m:is/m:t', namespace).text
+                else:
+                    cells[column] = float(cell.find('m:v', namespace).text)
+            rows.append(cells)
+        
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0]['A'], 'AIR ID')
+        self.assertEqual(len(rows[0]), len(EXPORT_HEADERS))
+        success_rate = column_letter(EXPORT_HEADERS.index('Post Production Success Rate'))
+        stakeholders = column_letter(EXPORT_HEADERS.index('Business Stakeholders'))
+        self.assertEqual(rows[-1][success_rate], 99.5)
+        self.assertEqual(rows[-1][stakeholders], 'Bob; Carol')
+    
+    def test_xlsx_writer_inlines_long_and_cleans_strings(self):
+        """Test that long strings are written inline and XML-illegal characters are dropped"""
+        long_value = 'x' * 500
+        content = b''.join(iter_xlsx(['A', 'B'], [['bad\x01value', long_value]]))
+        with zipfile.ZipFile(io.BytesIO(content)) as workbook:
+            sheet = workbook.read('xl/worksheets/sheet1.xml').decode('utf-8')
+            shared = workbook.read('xl/sharedStrings.xml').decode('utf-8')
+        self.assertIn(f'<t xml:space="preserve">{long_value}</t>', sheet)
+        self.assertNotIn(long_value, shared)
+        self.assertIn('badvalue', shared)
+
+
+class BulkUpdateTest(APITestCase):
+    def setUp(self):
+        rows = [
+            {'air_id': f'UPD{i:03d}', 'name': f'Update Automation {i}', 'type': 'RPA', 'complexity': 'Low',
+             'tool_name': 'UiPath', 'people_data': [{'name': 'Alice', 'role': 'developer'}]}
+            for i in range(5)
+        ]
+        self.client.post(reverse('automation-bulk-create'), rows, format='json')
+        self.url = reverse('automation-bulk-update')
+    
+    def test_update_by_list(self):
+        """Test per-object change sets, skipping unchanged rows and reporting unknown AIR IDs"""
+        response = self.client.patch(self.url, [
+            {'air_id': 'UPD000', 'changes': {'complexity': 'High', 'tool_name': 'Power Automate'}},
+            {'air_id': 'UPD001', 'changes': {'complexity': 'Medium'}},
+            {'air_id': 'UPD002', 'changes': {'complexity': 'Low'}},
+            {'air_id': 'NOPE', 'changes': {'complexity': 'High'}},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'matched': 3, 'updated': 2, 'unchanged': 1, 'not_found': ['NOPE']})
+        
+        first = Automation.objects.get(air_id='UPD000')
+        self.assertEqual(first.complexity, 'High')
+        self.assertEqual(first.tool.name, 'Power Automate')
+        self.assertGreater(first.updated_at, first.created_at)
+        self.assertEqual(Automation.objects.get(air_id='UPD001').complexity, 'Medium')
+        self.assertEqual(first.people_roles.count(), 1)
+        
+        log = AuditLog.objects.get(action='update')
+        self.assertEqual(log.details['changes']['UPD000']['changed_fields']['tool_name'], {'old': 'UiPath', 'new': 'Power Automate'})
+        self.assertNotIn('UPD002', log.details['changes'])
+    
+    def test_update_by_filter(self):
+        """Test that one change set is applied to every matching automation in a few queries"""
+        Automation.objects.filter(air_id='UPD004').update(coe_fed='FED')
+        with self.assertNumQueries(6):
+            response = self.client.patch(self.url, {
+                'filter': {'type': 'RPA', 'coe_fed': None},
+                'changes': {'coe_fed': 'COE', 'qa_handshake': 'Done'},
+            }, format='json')
+        self.assertEqual(response.data['updated'], 4)
+        self.assertEqual(Automation.objects.filter(coe_fed='COE', qa_handshake='Done').count(), 4)
+        self.assertEqual(Automation.objects.get(air_id='UPD004').coe_fed, 'FED')
+    
+    def test_invalid_requests(self):
+        """Test that bad change sets and empty filters are rejected without writing"""
+        response = self.client.patch(self.url, [
+            {'air_id': 'UPD000', 'changes': {'complexity': 'High'}},
+            {'air_id': 'UPD001', 'changes': {'people_data': []}},
+            {'air_id': 'UPD002', 'changes': {'name': '  '}},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('people_data', response.data[1]['changes'])
+        self.assertIn('name', response.data[2]['changes'])
+        self.assertEqual(Automation.objects.get(air_id='UPD000').complexity, 'Low')
+        
+        response = self.client.patch(self.url, {'filter': {}, 'changes': {'complexity': 'High'}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch(self.url, {'filter': {'type': 'RPA'}, 'changes': {}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_filter_values(self):
+        """Test that filter values the column can't hold are a 400, not a database error"""
+        for filters in ({'prod_deploy_date': 'not-a-date'}, {'tool_name': ['UiPath']}, {'air_ids': 'UPD000'}):
+            response = self.client.patch(self.url, {'filter': filters, 'changes': {'complexity': 'High'}}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, filters)
+            self.assertIn('filter', response.data)
+        response = self.client.delete(reverse('automation-bulk-delete'), {'filter': {'prod_deploy_date': 'not-a-date'}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Automation.objects.filter(complexity='Low').count(), 5)
+
+    def test_name_spelling_is_not_a_change(self):
+        """Test that a modifier or tool name differing only in case or spacing is unchanged"""
+        update_automations([('UPD000', {'modified_by_name': 'Alice'})])
+        response = self.client.patch(self.url, {
+            'filter': {'modified_by_name': ' alice '},
+            'changes': {'modified_by_name': 'ALICE', 'tool_name': 'uipath '},
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['matched'], 1)
+        self.assertEqual(response.data['unchanged'], 1)
+        self.assertFalse(AuditLog.objects.filter(action='update').exists())
+
+
+class NestedUpdateTest(APITestCase):
+    def setUp(self):
+        self.row = {
+            'air_id': 'NST001', 'name': 'Nested Automation', 'type': 'RPA',
+            'people_data': [
+                {'name': 'Alice', 'role': 'developer'},
+                {'name': 'Bob', 'role': 'tester'},
+                {'name': 'Carol', 'role': 'business_stakeholder'},
+            ],
+            'environments_data': [{'type': 'dev', 'vdi': 'VDI-1'}, {'type': 'prod', 'vdi': 'VDI-9'}],
+            'metrics_data': {'post_prod_total_cases': 10, 'post_prod_success_rate': 95.5},
+        }
+        self.client.post(reverse('automation-bulk-create'), [self.row], format='json')
+        self.url = reverse('automation-detail', kwargs={'air_id': 'NST001'})
+        self.automation = Automation.objects.get(air_id='NST001')
+    
+    def test_nested_changes_are_applied_as_a_diff(self):
+        """Test that only differing related rows are updated, inserted or deleted"""
+        roles = {role.role: role.id for role in self.automation.people_roles.all()}
+        environments = {env.type: env.id for env in self.automation.environments.all()}
+        
+        response = self.client.patch(self.url, {
+            'people_data': [
+                {'name': 'Dave', 'role': 'developer'},
+                {'name': 'Bob', 'role': 'tester'},
+            ],
+            'environments_data': [{'type': 'dev', 'vdi': 'VDI-2'}, {'type': 'prod', 'vdi': 'VDI-9'}],
+            'metrics_data': {},
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({p['name'] for p in response.data['people']}, {'Dave', 'Bob'})
+        
+        people_roles = {role.role: role for role in AutomationPersonRole.objects.filter(automation_id='NST001')}
+        self.assertEqual(set(people_roles), {'developer', 'tester'})
+        self.assertEqual(people_roles['developer'].id, roles['developer'])  # Updated in place
+        self.assertEqual(people_roles['developer'].person.name, 'Dave')
+        self.assertEqual(people_roles['tester'].id, roles['tester'])
+        dev = self.automation.environments.get(type='dev')
+        self.assertEqual((dev.id, dev.vdi), (environments['dev'], 'VDI-2'))
+        self.assertFalse(Metrics.objects.filter(automation_id='NST001').exists())
+        self.assertIsNone(Automation.objects.get(air_id='NST001').content_hash)
+    
+    def test_unchanged_payload_writes_nothing(self):
+        """Test that resending the current values doesn't write any rows"""
+        Automation.objects.filter(air_id='NST001').update(content_hash='unchanged')
+        payload = {key: value for key, value in self.row.items() if key != 'air_id'}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        writes = [
+            q['sql'] for q in queries
+            if q['sql'].split()[0] in ('INSERT', 'UPDATE', 'DELETE') and 'audit_logs' not in q['sql']
+        ]
+        self.assertEqual(writes, [])
+        self.assertEqual(Automation.objects.get(air_id='NST001').content_hash, 'unchanged')
+    
+    def test_null_and_empty_environment_values_are_equal(self):
+        """Test that environments stored with NULL vdi or service account aren't rewritten as ''"""
+        Environment.objects.filter(automation_id='NST001').update(service_account=None)
+        Environment.objects.filter(automation_id='NST001', type='prod').update(vdi=None)
+        environments = [{'type': 'dev', 'vdi': 'VDI-1', 'service_account': ''}, {'type': 'prod', 'vdi': None}]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, {'environments_data': environments}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        table = f'"{Environment._meta.db_table}"'
+        self.assertFalse([q['sql'] for q in queries if q['sql'].split()[0] in ('INSERT', 'UPDATE', 'DELETE') and table in q['sql']])
+
+    def test_air_id_cannot_change(self):
+        """Test that renaming the primary key is rejected instead of copying the automation"""
+        response = self.client.patch(self.url, {'air_id': 'NST002'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Automation.objects.filter(air_id='NST002').exists())
+
+
+class BulkDeleteTest(APITestCase):
+    def setUp(self):
+        rows = [
+            {'air_id': f'DEL{i:03d}', 'name': f'Delete Automation {i}', 'type': 'RPA' if i % 2 else 'Report',
+             'people_data': [{'name': 'Alice', 'role': 'developer'}],
+             'environments_data': [{'type': 'prod', 'vdi': 'V', 'service_account': 'svc'}],
+             'metrics_data': {'post_prod_total_cases': i}, 'artifacts_data': {'demo': 'pending'},
+             'test_data_data': {'spoc': 'Dan'}}
+            for i in range(6)
+        ]
+        self.client.post(reverse('automation-bulk-create'), rows, format='json')
+        self.url = reverse('automation-bulk-delete')
+    
+    def test_delete_by_ids_removes_related_rows(self):
+        """Test that deleting by AIR ID removes dependent rows and the search document"""
+        response = self.client.delete(self.url, {'air_ids': ['DEL000', 'DEL001', 'MISSING']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['deleted'], 2)
+        self.assertEqual(Automation.objects.count(), 4)
+        self.assertFalse(AutomationPersonRole.objects.filter(automation_id__in=['DEL000', 'DEL001']).exists())
+        
+        log = AuditLog.objects.get(action='delete')
+        self.assertEqual(log.details['count'], 2)
+        self.assertEqual(sorted(log.details['air_ids_sample']), ['DEL000', 'DEL001'])
+        
+        if search_index.index_exists(connection.cursor()):
+            results = AutomationSearchService.filter_queryset(Automation.objects.all(), 'DEL000')
+            self.assertFalse(results.exists())
+    
+    def test_delete_by_filter_in_chunks(self):
+        """Test that a filter deletes every match across several chunks"""
+        from .bulk import delete_automations
+        chunks = []
+        deleted = delete_automations(queryset=Automation.objects.filter(type='RPA'), chunk_size=2, on_chunk=chunks.append)
+        self.assertEqual(deleted, 3)
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(set(Automation.objects.values_list('type', flat=True)), {'Report'})
+        
+        response = self.client.delete(self.url, {'filter': {'search': 'Delete'}}, format='json')
+        self.assertEqual(response.data['deleted'], 3)
+        self.assertEqual(Automation.objects.count(), 0)
+        
+        response = self.client.delete(self.url, {'filter': {'unknown': 1}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ResetAutomationDataTest(TestCase):
+    def _create(self):
+        serializer = AutomationCreateSerializer(data=[
+            {'air_id': f'RST{i:03d}', 'name': f'Reset Automation {i}', 'type': 'RPA', 'tool_name': 'UiPath',
+             'people_data': [{'name': 'Alice', 'role': 'developer'}], 'metrics_data': {'post_prod_total_cases': i}}
+            for i in range(3)
+        ], many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        index_automations([f'RST{i:03d}' for i in range(3)])
+    
+    def test_reset_removes_all_automation_data(self):
+        """Test that the reset empties automations, related rows, lookups and the search index"""
+        self._create()
+        out = StringIO()
+        call_command('reset_automation_data', interactive=False, stdout=out)
+        self.assertIn('Deleted 3 automations', out.getvalue())
+        
+        self.assertEqual(Automation.objects.count(), 0)
+        self.assertEqual(AutomationPersonRole.objects.count(), 0)
+        self.assertEqual(Person.objects.count(), 0)
+        self.assertFalse(AutomationLSHBucket.objects.exists())
+        self.assertTrue(AuditLog.objects.filter(object_name='Reset automation data').exists())
+        
+        with connection.cursor() as cursor:
+            if search_index.index_exists(cursor):
+                cursor.execute(f"SELECT COUNT(*) FROM {search_index.FTS_TABLE}")
+                self.assertEqual(cursor.fetchone()[0], 0)
+    
+    def test_keep_lookups(self):
+        """Test that --keep-lookups keeps people and tools"""
+        self._create()
+        call_command('reset_automation_data', interactive=False, keep_lookups=True, stdout=StringIO())
+        self.assertEqual(Automation.objects.count(), 0)
+        self.assertTrue(Person.objects.filter(name='Alice').exists())
+
+
+class IdempotencyTest(APITestCase):
+    def _post(self, rows, key='retry-1', **extra):
+        return self.client.post(
+            reverse('automation-bulk-create'),
+            json.dumps([{'air_id': f'IDM{i:03d}', 'name': f'Idempotent {i}', 'type': 'RPA'} for i in rows]),
+            content_type='application/json',
+            HTTP_IDEMPOTENCY_KEY=key,
+            **extra
+        )
+    
+    def test_retry_replays_the_stored_response(self):
+        """Test that a retried bulk create returns the first response without writing again"""
+        first = self._post(range(3))
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        audit_count = AuditLog.objects.count()
+        
+        with self.assertNumQueries(1):
+            retry = self._post(range(3))
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry[idempotency.REPLAYED_HEADER], 'true')
+        self.assertEqual(retry.json(), json.loads(first.content))
+        self.assertEqual(Automation.objects.count(), 3)
+        self.assertEqual(AuditLog.objects.count(), audit_count)
+        
+        # The same key on another endpoint is a separate request
+        response = self.client.post(reverse('automation-list'), {'air_id': 'IDM100', 'name': 'Single', 'type': 'RPA'},
+                                    format='json', HTTP_IDEMPOTENCY_KEY='retry-1')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+    
+    def test_conflicting_and_in_flight_keys(self):
+        """Test 422 for a key reused with another body and 409 while the first request runs"""
+        self._post(range(3))
+        response = self._post(range(4))
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        # A different body of the same length is caught by its hash
+        response = self._post([0, 1, 3])
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertFalse(Automation.objects.filter(air_id='IDM003').exists())
+        
+        response = self.client.post(reverse('automation-list'), {'air_id': 'IDM100', 'name': 'One', 'type': 'RPA'},
+                                    format='json', HTTP_IDEMPOTENCY_KEY='single')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(reverse('automation-list'), {'air_id': 'IDM100', 'name': 'Two', 'type': 'RPA'},
+                                    format='json', HTTP_IDEMPOTENCY_KEY='single')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        
+        record = IdempotencyKey.objects.get(key='retry-1')
+        IdempotencyKey.objects.filter(pk=record.pk).update(status_code=None, response_body=None)
+        response = self._post(range(3))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        
+        # A request that never finished is run again once it is considered dead
+        IdempotencyKey.objects.filter(pk=record.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        response = self._post(range(3))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)  # Duplicate AIR IDs
+        self.assertEqual(IdempotencyKey.objects.get(key='retry-1').status_code, 400)
+    
+    def test_cleanup_deletes_expired_keys(self):
+        """Test that expired keys are removed and can then be reused"""
+        self._post(range(2))
+        self._post(range(2), key='retry-2')
+        IdempotencyKey.objects.filter(key='retry-1').update(expires_at=timezone.now() - timedelta(seconds=1))
+        out = StringIO()
+        call_command('cleanup_idempotency_keys', stdout=out)
+        self.assertIn('deleted 1 expired', out.getvalue())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['retry-2'])
+
+
+class FastAPIWriteTest(TransactionTestCase):
+    """Runs without DJANGO_ALLOW_ASYNC_UNSAFE, so ORM calls on the event loop fail the request."""
+
+    def setUp(self):
+        self.client = TestClient(fastapi_app.app)
+
+    def _bulk(self, rows, key='fa-bulk'):
+        return self.client.post('/api/automations/bulk/', json=rows, headers={idempotency.HEADER: key})
+
+    def test_create_is_replayed_for_a_retry(self):
+        """Test that a retried create returns the stored response without writing again"""
+        body = {'air_id': 'FAS001', 'name': 'FastAPI Automation', 'type': 'RPA'}
+        first = self.client.post('/api/automations/', json=body, headers={idempotency.HEADER: 'fa-create'})
+        self.assertEqual(first.status_code, 200)
+        retry = self.client.post('/api/automations/', json=body, headers={idempotency.HEADER: 'fa-create'})
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.headers[idempotency.REPLAYED_HEADER], 'true')
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Automation.objects.filter(air_id='FAS001').count(), 1)
+
+        response = self.client.put('/api/automations/FAS001/', json={'name': 'Renamed'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Automation.objects.get(air_id='FAS001').name, 'Renamed')
+
+    def test_retry_while_in_flight_is_a_conflict(self):
+        """Test that a retry gets 409 while the first request with its key is still running"""
+        rows = [{'air_id': 'FAS010', 'name': 'In Flight', 'type': 'RPA'}]
+        self.assertEqual(self._bulk(rows).status_code, 200)
+        IdempotencyKey.objects.filter(key='fa-bulk').update(status_code=None, response_body=None)
+        self.assertEqual(self._bulk(rows).status_code, 409)
+
+    def test_bulk_create_commits_each_batch(self):
+        """Test that batches before an invalid row stay committed"""
+        rows = [{'air_id': f'FAS02{i}', 'name': f'Batch {i}', 'type': 'RPA'} for i in range(3)]
+        rows.append({'air_id': 'FAS029'})
+        with patch('fastapi_app.BATCH_SIZE', 2):
+            response = self._bulk(rows)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual((response.json()['detail']['index'], response.json()['detail']['created']), (3, 2))
+        self.assertEqual(list(Automation.objects.order_by('air_id').values_list('air_id', flat=True)), ['FAS020', 'FAS021'])
+
+
+class ImportClientTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, True)
+        self.path = os.path.join(self.tmpdir, 'automations.csv')
+        self.checkpoint = self.path + '.checkpoint.json'
+        with open(self.path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['AIR ID', 'Name', 'Type', 'Post Production Total Cases'])
+            for i in range(5):
+                writer.writerow([f'CLI{i}', f'Client {i}', 'RPA', 'many' if i == 3 else i])
+    
+    def _client(self, handler):
+        return ImportClient('http://testserver', batch_size=2, concurrency=2, backoff=0,
+                            transport=httpx.MockTransport(handler))
+    
+    @staticmethod
+    def _upserted(request):
+        rows = json.loads(request.content)
+        return httpx.Response(200, json={'total': len(rows), 'counts': {'inserted': len(rows)}, 'status': [], 'errors': []})
+    
+    def test_retries_transient_failures_with_the_same_key(self):
+        """Test that failed requests are retried with the batch's idempotency key and counted"""
+        requests = []
+        
+        def handler(request):
+            requests.append((json.loads(request.content)[0]['air_id'], request.headers['Idempotency-Key']))
+            if len(requests) == 1:
+                return httpx.Response(503)
+            if len(requests) == 2:
+                raise httpx.ConnectError('connection reset')
+            return self._upserted(request)
+        
+        stats = self._client(handler).import_file(self.path, self.checkpoint)
+        self.assertEqual(stats.rows, 4)
+        self.assertEqual(stats.counts, {'inserted': 4})
+        self.assertEqual(stats.retries, 2)
+        self.assertEqual([error['row'] for error in stats.errors], [4])  # Unparseable metrics, never sent
+        first_batch_keys = {key for air_id, key in requests if air_id == 'CLI0'}
+        self.assertEqual(len(first_batch_keys), 1)
+        self.assertFalse(os.path.exists(self.checkpoint))
+    
+    def test_resumes_after_the_finished_batches(self):
+        """Test that a rerun only sends the batches missing from the checkpoint, with the same keys"""
+        sent = []
+        
+        def failing(request):
+            sent.append(request.headers['Idempotency-Key'])
+            if 'CLI4' in request.content.decode():
+                return httpx.Response(400, json={'error': 'Bad batch'})
+            return self._upserted(request)
+        
+        stats = self._client(failing).import_file(self.path, self.checkpoint)
+        self.assertEqual(len(stats.failed_batches), 1)
+        self.assertTrue(os.path.exists(self.checkpoint))
+        
+        resent = []
+        
+        def handler(request):
+            resent.append(request.headers['Idempotency-Key'])
+            return self._upserted(request)
+        
+        stats = self._client(handler).import_file(self.path, self.checkpoint)
+        self.assertEqual(resent, [key for key in sent if key.endswith('-1')])
+        self.assertEqual((stats.rows, stats.resumed_rows), (2, 2))
+        self.assertEqual(stats.counts, {'inserted': 4})
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+
+class WriteQueueTest(TransactionTestCase):
+    def test_writes_are_coalesced_into_one_transaction(self):
+        """Test that queued writes commit together and a failing one only fails its own future"""
+        write_queue = WriteQueue(max_batch=50, max_delay=0.5)
+        futures = [
+            write_queue.submit(AuditLog.objects.create, action='CREATE', object_type='Automation', object_id=f'WQ{i}')
+            for i in range(5)
+        ]
+        failing = write_queue.submit(Automation.objects.get, air_id='missing')
+        
+        self.assertEqual([future.result(timeout=10).object_id for future in futures], [f'WQ{i}' for i in range(5)])
+        with self.assertRaises(Automation.DoesNotExist):
+            failing.result(timeout=10)
+        self.assertEqual(AuditLog.objects.filter(object_id__startswith='WQ').count(), 5)
+        self.assertEqual(write_queue.transactions, 1)
+        self.assertEqual(write_queue.writes, 6)
+    
+    @override_settings(WRITE_QUEUE={'ENABLED': True, 'MAX_DELAY': 0})
+    def test_api_writes_go_through_the_queue(self):
+        """Test that API creates return after the queued write has committed"""
+        response = self.client.post(reverse('automation-list'), json.dumps({
+            'air_id': 'WQAPI', 'name': 'Queued Automation', 'type': 'RPA'
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Automation.objects.filter(air_id='WQAPI').exists())
@@ -1,10 +1,23 @@
 from django.urls import path, include
+from rest_framework.renderers import JSONRenderer
 from rest_framework.routers import DefaultRouter
-from .views import AutomationViewSet
+from .views import AutomationViewSet, ImportJobViewSet
+from .export import CSVRenderer, XLSXRenderer
 
 router = DefaultRouter()
 router.register(r'automations', AutomationViewSet)
+router.register(r'import-jobs', ImportJobViewSet)
 
 urlpatterns = [
+    path(
+        'automations/export.csv',
+        AutomationViewSet.as_view({'get': 'export_csv'}, renderer_classes=[JSONRenderer, CSVRenderer]),
+        name='automation-export-csv'
+    ),
+    path(
+        'automations/export.xlsx',
+        AutomationViewSet.as_view({'get': 'export_xlsx'}, renderer_classes=[JSONRenderer, XLSXRenderer]),
+        name='automation-export-xlsx'
+    ),
     path('', include(router.urls)),
 ]
@@ -1,12 +1,40 @@
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from django.db.models import Q
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.serializers import as_serializer_error
+from rest_framework.parsers import MultiPartParser
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import F, FloatField, Q, Sum, Max
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from .models import Automation, AuditLog
-from .serializers import AutomationSerializer, AutomationCreateSerializer, AuditLogSerializer
+from django.utils import timezone
+from datetime import timedelta
+import json
+import pickle
+import tempfile
+import time
+from functools import partial
+from .models import normalize_name, Automation, AuditLog, SearchQueryStat, ImportJob
+from .serializers import AutomationSerializer, AutomationCreateSerializer, AutomationUpdateSerializer, AutomationUpsertSerializer, AutomationChangesSerializer, AuditLogSerializer, ImportJobSerializer
 from .search import AutomationSearchService
 from .audit import log_audit_event, get_object_changes
+from .analytics import get_search_analytics
+from .similarity import get_similarity_index
+from .duplicates import index_automations, index_rows, lsh_buckets, find_duplicates_for_rows, TEXT_FIELDS as DUPLICATE_TEXT_FIELDS
+from .bulk import BATCH_SIZE, NameCache, chunked, bulk_create_automations, upsert_automations, update_automations, delete_automations, write_isolated, create_row_statuses, upsert_row_statuses, NAMED_RELATIONS, UPDATABLE_FIELDS
+from . import csv_import, export, import_jobs, import_preview
+from .json_stream import JSONArrayStreamParser, NDJSONParser, RowStream
+from .decompression import decompressed
+from .write_queue import run_write
+from .idempotency import idempotent
+
+
+BULK_DELETE_AUDIT_SAMPLE = 100  # AIR IDs kept in a bulk deletion's audit record
+SPOOL_MEMORY_SIZE = 8 * 1024 * 1024  # Validated bulk create rows kept in memory before spilling to disk
+SIMILARITY_LOAD_TIMEOUT = 10  # Seconds a request waits for its worker's first similarity index load
 
 
 class AutomationViewSet(viewsets.ModelViewSet):
@@ -26,24 +54,30 @@ class AutomationViewSet(viewsets.ModelViewSet):
         search = self.request.query_params.get('search')
         
         if search:
-            queryset = queryset.filter(
-                Q(air_id__icontains=search) |
-                Q(name__icontains=search) |
-                Q(type__icontains=search) |
-                Q(brief_description__icontains=search) |
-                Q(coe_fed__icontains=search) |
-                Q(complexity__icontains=search)
-            )
+            queryset = self._search_filter(queryset, search)
         
         return queryset.order_by('-created_at')
     
+    @staticmethod
+    def _search_filter(queryset, search):
+        return queryset.filter(
+            Q(air_id__icontains=search) |
+            Q(name__icontains=search) |
+            Q(type__icontains=search) |
+            Q(brief_description__icontains=search) |
+            Q(coe_fed__icontains=search) |
+            Q(complexity__icontains=search)
+        )
+    
+    @idempotent
     def create(self, request, *args, **kwargs):
         """
         Create a new automation with nested data support.
         """
         serializer = AutomationCreateSerializer(data=request.data)
         if serializer.is_valid():
-            automation = serializer.save()
+            automation = run_write(serializer.save)
+            index_automations([automation.air_id])
             
             # Log audit event
             log_audit_event(
@@ -62,7 +96,8 @@ class AutomationViewSet(viewsets.ModelViewSet):
     
     def update(self, request, *args, **kwargs):
         """
-        Update an existing automation.
+        Update an existing automation. Nested `*_data` fields (as accepted on
+        create) replace the related rows; only the differences are written.
         """
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
@@ -71,10 +106,12 @@ class AutomationViewSet(viewsets.ModelViewSet):
         old_serializer = AutomationSerializer(instance)
         old_data = old_serializer.data
         
-        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer = AutomationUpdateSerializer(instance, data=request.data, partial=partial, context=self.get_serializer_context())
         
         if serializer.is_valid():
-            updated_automation = serializer.save()
+            updated_automation = run_write(serializer.save)
+            if set(serializer.changed_fields) & set(DUPLICATE_TEXT_FIELDS):
+                index_automations([updated_automation.air_id])
             
             # Get new data and log changes
             new_serializer = AutomationSerializer(updated_automation)
@@ -109,40 +146,439 @@ class AutomationViewSet(viewsets.ModelViewSet):
             details={'automation_type': instance.type}
         )
         
-        instance.delete()
+        run_write(instance.delete)
         return Response(status=status.HTTP_204_NO_CONTENT)
     
-    @action(detail=False, methods=['post'])
+    @action(detail=False, methods=['post'], parser_classes=[JSONArrayStreamParser, NDJSONParser])
+    @idempotent
     def bulk_create(self, request):
         """
         Create multiple automations at once with nested data support.
+        With ?mode=isolated, valid rows are written even if others fail.
+        
+        The body is a JSON array or NDJSON (application/x-ndjson); rows are
+        parsed and validated BATCH_SIZE at a time and spooled (to disk past
+        SPOOL_MEMORY_SIZE), then written in one transaction once the body is
+        complete and valid. Responds with the `air_id`, `status`
+        and `possible_duplicates` of each created row; fetch the automations
+        themselves if their full representation is needed.
         """
-        if not isinstance(request.data, list):
+        if not isinstance(request.data, (list, RowStream)):
             return Response(
                 {'error': 'Expected a list of automation objects'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        serializer = AutomationCreateSerializer(data=request.data, many=True)
-        if serializer.is_valid():
-            automations = serializer.save()
+        if request.query_params.get('mode') == 'isolated':
+            return self._isolated_write(request, AutomationCreateSerializer, create_row_statuses, 'bulk_create')
+        
+        # Validated chunks are spooled until the whole body is in: the write
+        # transaction takes SQLite's write lock, which mustn't be held while a
+        # large upload streams in
+        errors = []
+        seen = set()
+        names = NameCache()  # Tool and person ids shared by the request's chunks
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_SIZE) as spool:
+            chunk_count = 0
+            for chunk in chunked(request.data, BATCH_SIZE):
+                serializer = AutomationCreateSerializer(data=chunk, many=True)
+                if not serializer.is_valid():
+                    errors += serializer.errors
+                    continue
+                # Earlier chunks aren't written yet, so repeats across chunks
+                # aren't caught by the unique validator
+                chunk_errors = []
+                for row in serializer.validated_data:
+                    repeated = row['air_id'] in seen
+                    seen.add(row['air_id'])
+                    chunk_errors.append({'air_id': ['AIR ID appears more than once in this request.']} if repeated else {})
+                errors += chunk_errors
+                if any(errors):
+                    continue  # Keep validating to report every invalid row
+                pickle.dump(list(serializer.validated_data), spool, protocol=pickle.HIGHEST_PROTOCOL)
+                chunk_count += 1
+            
+            if any(errors):
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
             
-            # Log bulk creation audit event
+            spool.seek(0)
+            air_ids = []
+            text_rows = []
+            try:
+                with transaction.atomic():
+                    for _ in range(chunk_count):
+                        automations = bulk_create_automations(pickle.load(spool), names=names)
+                        air_ids += [auto.air_id for auto in automations]
+                        text_rows += [
+                            {field: getattr(auto, field) for field in ['air_id', *DUPLICATE_TEXT_FIELDS]}
+                            for auto in automations
+                        ]
+            except IntegrityError as e:
+                # An AIR ID created by another request since validation
+                return Response(
+                    {'error': f'Bulk create conflicts with existing automations: {str(e)}'},
+                    status=status.HTTP_409_CONFLICT
+                )
+        
+        # Duplicate detection runs after the commit so its MinHash work doesn't
+        # hold the write lock. The new rows aren't indexed yet, so they don't
+        # match themselves but still match each other within the request.
+        buckets = lsh_buckets(text_rows)
+        possible_duplicates = find_duplicates_for_rows(text_rows, buckets=buckets)
+        index_rows(text_rows, buckets)
+        
+        # Log bulk creation audit event
+        log_audit_event(
+            action='bulk_create',
+            object_type='Automation',
+            object_name=f'Bulk import of {len(air_ids)} automations',
+            request=request,
+            details={
+                'count': len(air_ids),
+                'air_ids': air_ids
+            }
+        )
+        
+        # A compact status per row rather than the created automations, which
+        # would put every row of a large import back in memory
+        response_data = [
+            {'air_id': air_id, 'status': 'created', 'possible_duplicates': duplicates}
+            for air_id, duplicates in zip(air_ids, possible_duplicates)
+        ]
+        return Response(response_data, status=status.HTTP_201_CREATED)
+    
+    def _isolated_write(self, request, serializer_class, write, audit_action):
+        """
+        Write a list of rows so that invalid or failing rows don't block the rest.
+        Responds with a per-row status array and errors only for failed rows.
+        A streamed body that turns out to be malformed is reported as an error
+        at the index where parsing stopped; the rows before it are still written.
+        """
+        air_ids = []
+        parse_errors = []
+        
+        def rows():
+            try:
+                for row in request.data:
+                    air_ids.append(row.get('air_id') if isinstance(row, dict) else None)
+                    yield row
+            except ParseError as e:
+                parse_errors.append(str(e.detail))
+        
+        statuses, errors = write_isolated(rows(), serializer_class, partial(write, names=NameCache()))
+        written = [
+            air_ids[index]
+            for index, row_status in enumerate(statuses)
+            if row_status not in ('invalid', 'failed', 'unchanged')
+        ]
+        index_automations(written)
+        if parse_errors:
+            errors.append({'index': len(statuses), 'air_id': None, 'errors': {'non_field_errors': parse_errors}})
+        
+        counts = {}
+        for row_status in statuses:
+            counts[row_status] = counts.get(row_status, 0) + 1
+        
+        log_audit_event(
+            action=audit_action,
+            object_type='Automation',
+            object_name=f'Bulk write of {len(written)} of {len(statuses)} automations',
+            request=request,
+            details={'counts': counts, 'air_ids': written, 'failed_rows': [error['index'] for error in errors]}
+        )
+        
+        return Response(
+            {'total': len(statuses), 'counts': counts, 'status': statuses, 'errors': errors},
+            status=status.HTTP_207_MULTI_STATUS if errors else status.HTTP_200_OK
+        )
+    
+    def _export_queryset(self, request):
+        queryset = self.get_queryset()
+        query = request.query_params.get('q', '').strip()
+        if query:
+            queryset = AutomationSearchService.filter_queryset(queryset, query)
+        return queryset, query
+    
+    def export_csv(self, request):
+        """
+        Stream all automations (or those matching `search` / `q`) as CSV in the
+        canonical import format. Compressed on the fly when the client accepts gzip.
+        """
+        queryset, query = self._export_queryset(request)
+        
+        chunks = export.iter_csv(queryset)
+        use_gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if use_gzip:
+            chunks = export.gzip_stream(chunks)
+        
+        response = StreamingHttpResponse(chunks, content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="automations_{timezone.now():%Y%m%d_%H%M%S}.csv"'
+        response['Vary'] = 'Accept-Encoding'
+        if use_gzip:
+            response['Content-Encoding'] = 'gzip'
+        
+        log_audit_event(
+            action='export',
+            object_type='Automation',
+            object_name='CSV export',
+            request=request,
+            details={'search': request.query_params.get('search'), 'q': query or None, 'gzip': use_gzip}
+        )
+        return response
+    
+    def export_xlsx(self, request):
+        """
+        Stream all automations (or those matching `search` / `q`) as an Excel
+        workbook with the same columns as the CSV export.
+        """
+        queryset, query = self._export_queryset(request)
+        
+        response = StreamingHttpResponse(export.iter_xlsx_export(queryset), content_type=export.XLSXRenderer.media_type)
+        response['Content-Disposition'] = f'attachment; filename="automations_{timezone.now():%Y%m%d_%H%M%S}.xlsx"'
+        
+        log_audit_event(
+            action='export',
+            object_type='Automation',
+            object_name='XLSX export',
+            request=request,
+            details={'search': request.query_params.get('search'), 'q': query or None}
+        )
+        return response
+    
+    @action(detail=False, methods=['post'])
+    @idempotent
+    def upsert(self, request):
+        """
+        Insert new automations and update existing ones in bulk, keyed on AIR ID.
+        Each row replaces the whole automation, including its related data.
+        With ?mode=isolated, valid rows are written even if others fail.
+        """
+        if not isinstance(request.data, list):
+            return Response(
+                {'error': 'Expected a list of automation objects'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if request.query_params.get('mode') == 'isolated':
+            return self._isolated_write(request, AutomationUpsertSerializer, upsert_row_statuses, 'import')
+        
+        serializer = AutomationUpsertSerializer(data=request.data, many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        result = upsert_automations(serializer.validated_data)
+        index_automations(result['inserted'] + result['updated'])
+        
+        log_audit_event(
+            action='import',
+            object_type='Automation',
+            object_name=f'Upsert of {len(serializer.validated_data)} automations',
+            request=request,
+            details={
+                'inserted': result['inserted'],
+                'updated': result['updated'],
+                'unchanged_count': len(result['unchanged']),
+            }
+        )
+        
+        return Response({
+            'inserted': len(result['inserted']),
+            'updated': len(result['updated']),
+            'unchanged': len(result['unchanged']),
+        })
+    
+    @action(detail=False, methods=['post'], url_path='import/preview')
+    def import_preview(self, request):
+        """
+        Dry run of an upsert: classify each row (same format as `upsert`) as
+        new, changed (with field diffs), unchanged, invalid or duplicate, and
+        list stored automations the file doesn't mention (the first
+        1000, or all of them with ?missing=all). Nothing is written.
+        """
+        if not isinstance(request.data, list):
+            return Response(
+                {'error': 'Expected a list of automation objects'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            max_missing = None if request.query_params.get('missing') == 'all' else import_preview.MAX_MISSING
+            return Response(import_preview.preview_import(request.data, max_missing=max_missing))
+        except Exception as e:
+            return Response(
+                {'error': f'Import preview failed: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
+    @action(detail=False, methods=['patch'], url_path='bulk')
+    def bulk_update(self, request):
+        """
+        Change core fields of many automations at once. Accepts either a list of
+        {"air_id", "changes"} objects or {"filter", "changes"}, where the filter
+        combines `search`, `q`, `air_ids` and exact field values. Related data
+        can't be changed here.
+        """
+        validator = AutomationChangesSerializer(partial=True)
+        
+        if isinstance(request.data, list):
+            updates, errors = [], []
+            for item in request.data:
+                item_errors = {}
+                air_id = item.get('air_id') if isinstance(item, dict) else None
+                if not isinstance(air_id, str) or not air_id.strip():
+                    item_errors['air_id'] = ['AIR ID is required and cannot be empty']
+                try:
+                    changes = validator.run_validation(item.get('changes') if isinstance(item, dict) else None)
+                except ValidationError as e:
+                    item_errors['changes'] = as_serializer_error(e)
+                errors.append(item_errors)
+                if not item_errors:
+                    updates.append((air_id.strip(), changes))
+            if any(errors):
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+            mode = 'list'
+            filters = None
+        elif isinstance(request.data, dict) and 'filter' in request.data:
+            filters = request.data.get('filter')
+            try:
+                queryset = self._bulk_filter_queryset(filters)
+                changes = validator.run_validation(request.data.get('changes'))
+            except ValidationError as e:
+                return Response(as_serializer_error(e), status=status.HTTP_400_BAD_REQUEST)
+            updates = [(air_id, changes) for air_id in queryset.values_list('air_id', flat=True)]
+            mode = 'filter'
+        else:
+            return Response(
+                {'error': 'Expected a list of {"air_id", "changes"} objects or {"filter", "changes"}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            result = update_automations(updates)
+        except Exception as e:
+            return Response(
+                {'error': f'Bulk update failed: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        # Only text fields feed the duplicate index
+        index_automations([
+            air_id for air_id, diff in result['changes'].items() if set(diff) & set(DUPLICATE_TEXT_FIELDS)
+        ])
+        
+        if result['updated']:
             log_audit_event(
-                action='bulk_create',
+                action='update',
                 object_type='Automation',
-                object_name=f'Bulk import of {len(automations)} automations',
+                object_name=f'Bulk update of {len(result["updated"])} automations',
                 request=request,
-                details={
-                    'count': len(automations),
-                    'air_ids': [auto.air_id for auto in automations]
-                }
+                details=json.loads(json.dumps({
+                    'mode': mode,
+                    'filter': filters,
+                    'changes': {
+                        air_id: {'changed_fields': diff} for air_id, diff in result['changes'].items()
+                    },
+                }, cls=DjangoJSONEncoder))
             )
-            
-            # Return the created automations using the read serializer
-            response_serializer = AutomationSerializer(automations, many=True)
-            return Response(response_serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'matched': len(result['updated']) + len(result['unchanged']),
+            'updated': len(result['updated']),
+            'unchanged': len(result['unchanged']),
+            'not_found': result['missing'],
+        })
+    
+    def _bulk_filter_queryset(self, filters):
+        """Automations matched by a bulk update or delete filter; an empty filter is rejected."""
+        if not isinstance(filters, dict) or not filters:
+            raise ValidationError({'filter': ['A non-empty filter is required to update by filter.']})
+        unknown = sorted(set(filters) - {'search', 'q', 'air_ids'} - set(UPDATABLE_FIELDS))
+        if unknown:
+            raise ValidationError({'filter': [f"Unsupported filter fields: {', '.join(unknown)}"]})
+        
+        queryset = Automation.objects.all()
+        for field, value in filters.items():
+            if field == 'search':
+                queryset = self._search_filter(queryset, value)
+            elif field == 'q':
+                queryset = AutomationSearchService.filter_queryset(queryset, str(value).strip())
+            elif field == 'air_ids':
+                if not isinstance(value, list):
+                    raise ValidationError({'filter': ['air_ids must be a list.']})
+                queryset = queryset.filter(air_id__in=[self._filter_value('air_id', air_id) for air_id in value])
+            elif field == 'modified_by_name':
+                # People are matched on their normalized name, as when they are resolved
+                name = self._filter_name(field, value)
+                queryset = queryset.filter(modified_by__normalized_name=normalize_name(name) if name else None)
+            elif field in NAMED_RELATIONS:
+                queryset = queryset.filter(**{NAMED_RELATIONS[field][0]: self._filter_name(field, value) or None})
+            else:
+                queryset = queryset.filter(**{field: self._filter_value(field, value)})
+        return queryset
+    
+    def _filter_value(self, field, value):
+        """Convert a filter value with the model field, so bad values are a 400 rather than a database error."""
+        if value is None:
+            return None
+        try:
+            return Automation._meta.get_field(field).to_python(value)
+        except DjangoValidationError as e:
+            raise ValidationError({'filter': [f'{field}: {message}' for message in e.messages]})
+    
+    def _filter_name(self, field, value):
+        if value is not None and not isinstance(value, str):
+            raise ValidationError({'filter': [f'{field} must be a string.']})
+        return value
+    
+    @action(detail=False, methods=['post'], url_path='import/csv', parser_classes=[MultiPartParser])
+    @idempotent
+    def import_csv(self, request):
+        """
+        Import automations from a CSV file, upserting on AIR ID.
+        Accepts a multipart upload in the `file` field or a raw `text/csv` body,
+        which may be sent with `Content-Encoding: gzip` (or zstd).
+        With ?mode=isolated, bad rows are reported and skipped instead of stopping the import.
+        """
+        if request.content_type.startswith('text/csv'):
+            try:
+                byte_lines = decompressed(request.stream, request.META.get('HTTP_CONTENT_ENCODING'))
+            except ParseError as e:
+                return Response({'error': str(e.detail)}, status=e.status_code)
+        else:
+            byte_lines = request.FILES.get('file')
+        if byte_lines is None:
+            return Response(
+                {'error': 'Expected a CSV file upload or a text/csv request body'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            chunk_size = min(max(int(request.query_params.get('chunk_size', csv_import.DEFAULT_CHUNK_SIZE)), 1), 5000)
+            isolate = request.query_params.get('mode') == 'isolated'
+            result = csv_import.import_csv(csv_import.decoded_lines(byte_lines), chunk_size=chunk_size, isolate=isolate)
+        except ParseError as e:
+            return Response({'error': str(e.detail)}, status=e.status_code)
+        except UnicodeDecodeError as e:
+            return Response(
+                {'error': f'CSV file must be UTF-8 encoded: {str(e)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': f'CSV import failed: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        
+        log_audit_event(
+            action='import',
+            object_type='Automation',
+            object_name=f'CSV import of {result["rows"]} automations',
+            request=request,
+            details={key: value for key, value in result.items() if key != 'errors'}
+        )
+        
+        if result['errors']:
+            return Response(result, status=status.HTTP_207_MULTI_STATUS if isolate else status.HTTP_400_BAD_REQUEST)
+        return Response(result)
     
     @action(detail=False, methods=['get'])
     def search(self, request):
@@ -163,22 +599,18 @@ class AutomationViewSet(viewsets.ModelViewSet):
             })
         
         try:
+            started = time.perf_counter()
             results = AutomationSearchService.search(
                 query=query,
                 limit=limit,
                 include_fuzzy=include_fuzzy
             )
             
-            # Log search audit event
-            log_audit_event(
-                action='search',
-                object_type='Automation',
-                request=request,
-                details={
-                    'query': query,
-                    'results_count': results.get('total_count', 0),
-                    'include_fuzzy': include_fuzzy
-                }
+            # Record search analytics in memory (flushed in aggregate, no write per search)
+            get_search_analytics().record(
+                query=query,
+                results_count=results.get('total_count', 0),
+                latency_ms=(time.perf_counter() - started) * 1000
             )
             
             results['query'] = query
@@ -190,22 +622,98 @@ class AutomationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['get'], url_path='search-analytics')
+    def search_analytics(self, request):
+        """
+        Get aggregated search analytics: top queries and zero-result queries.
+
+        Search and zero-result counts are estimates of all searches: each
+        stored period is scaled by 1 / the sample rate it was recorded at.
+        `pending` holds the raw sampled counters not flushed yet.
+        """
+        try:
+            days = int(request.query_params.get('days', 7))
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            return Response(
+                {'error': 'days and limit must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        def estimated(field):
+            return Sum(F(field) / F('sample_rate'), output_field=FloatField())
+
+        try:
+            stats = SearchQueryStat.objects.filter(
+                period_start__gte=timezone.now() - timedelta(days=days)
+            ).values('query').annotate(
+                searches=estimated('search_count'),
+                zero_results=estimated('zero_result_count'),
+                sampled=Sum('search_count'),
+                total_latency_ms=Sum('total_latency_ms'),
+                max_latency_ms=Max('max_latency_ms'),
+            )
+            
+            def to_row(stat):
+                return {
+                    'query': stat['query'],
+                    'searches': round(stat['searches']),
+                    'zero_results': round(stat['zero_results']),
+                    'avg_latency_ms': round(stat['total_latency_ms'] / stat['sampled'], 2) if stat['sampled'] else None,
+                    'max_latency_ms': stat['max_latency_ms'],
+                }
+            
+            return Response({
+                'top_queries': [to_row(s) for s in stats.order_by('-searches')[:limit]],
+                'zero_result_queries': [to_row(s) for s in stats.filter(zero_results__gt=0).order_by('-zero_results')[:limit]],
+                'pending': get_search_analytics().snapshot(),
+                'days': days,
+            })
+        
+        except Exception as e:
+            return Response(
+                {'error': f'Failed to fetch search analytics: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
     @action(detail=False, methods=['delete'])
     def bulk_delete(self, request):
         """
-        Delete multiple automations at once.
+        Delete multiple automations at once, given either `air_ids` or a
+        `filter` as accepted by the bulk update endpoint.
         """
-        air_ids = request.data.get('air_ids', [])
-        if not air_ids:
+        air_ids = request.data.get('air_ids')
+        filters = request.data.get('filter')
+        if not air_ids and not filters:
             return Response(
                 {'error': 'No AIR IDs provided'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get automation names before deletion for audit log
-        automations_to_delete = list(Automation.objects.filter(air_id__in=air_ids).values('air_id', 'name'))
+        queryset = None
+        if air_ids:
+            if not isinstance(air_ids, list):
+                return Response({'error': 'air_ids must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+            filters = None
+        else:
+            try:
+                queryset = self._bulk_filter_queryset(filters)
+            except ValidationError as e:
+                return Response(as_serializer_error(e), status=status.HTTP_400_BAD_REQUEST)
         
-        deleted_count = Automation.objects.filter(air_id__in=air_ids).delete()[0]
+        # Keep the audit record compact: the count and a sample of AIR IDs
+        sample = []
+        
+        def collect_sample(chunk):
+            sample.extend(chunk[:BULK_DELETE_AUDIT_SAMPLE - len(sample)])
+        
+        try:
+            deleted_count = delete_automations(air_ids=air_ids, queryset=queryset, on_chunk=collect_sample)
+        except Exception as e:
+            return Response(
+                {'error': f'Bulk delete failed: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
         
         # Log bulk deletion audit event
         log_audit_event(
@@ -215,15 +723,48 @@ class AutomationViewSet(viewsets.ModelViewSet):
             request=request,
             details={
                 'count': deleted_count,
-                'deleted_automations': automations_to_delete
+                'filter': filters,
+                'air_ids_sample': sample,
             }
         )
         
         return Response(
-            {'message': f'Deleted {deleted_count} automations'}, 
+            {'message': f'Deleted {deleted_count} automations', 'deleted': deleted_count}, 
             status=status.HTTP_200_OK
         )
 
+    @action(detail=True, methods=['get'])
+    def similar(self, request, air_id=None):
+        """
+        Get the automations most similar to this one by TF-IDF cosine similarity.
+        """
+        automation = self.get_object()
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 50)
+            
+            # Kept fresh in the background; only a worker's first load is waited for
+            index = get_similarity_index()
+            index.start_refresher()
+            index.wait_until_loaded(SIMILARITY_LOAD_TIMEOUT)
+            scores = index.similar(automation.air_id, limit=limit)
+            
+            names = dict(
+                Automation.objects.filter(air_id__in=[air_id for air_id, _ in scores]).values_list('air_id', 'name')
+            )
+            return Response({
+                'air_id': automation.air_id,
+                'similar': [
+                    {'air_id': similar_id, 'name': names.get(similar_id), 'score': score}
+                    for similar_id, score in scores
+                ],
+            })
+        
+        except Exception as e:
+            return Response(
+                {'error': f'Failed to find similar automations for {air_id}: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
     @action(detail=True, methods=['get'], url_path='audit-logs')
     def automation_audit_logs(self, request, air_id=None):
         """
@@ -279,3 +820,82 @@ class AutomationViewSet(viewsets.ModelViewSet):
                 {'error': f'Failed to fetch audit logs: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class ImportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Background CSV imports. POST a CSV (multipart `file` field or raw
+    `text/csv` body, optionally gzip/zstd-encoded) to queue a job, then poll
+    it for progress.
+    """
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
+    parser_classes = [MultiPartParser]
+    
+    def list(self, request, *args, **kwargs):
+        import_jobs.recover_jobs_if_due()
+        return super().list(request, *args, **kwargs)
+    
+    def retrieve(self, request, *args, **kwargs):
+        import_jobs.recover_jobs_if_due()
+        return super().retrieve(request, *args, **kwargs)
+    
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        if request.content_type.startswith('text/csv') and request.stream is not None:
+            try:
+                stream = decompressed(request.stream, request.META.get('HTTP_CONTENT_ENCODING'))
+            except ParseError as e:
+                return Response({'error': str(e.detail)}, status=e.status_code)
+            chunks = iter(lambda: stream.read(import_jobs.UPLOAD_CHUNK_SIZE), b'')
+            file_name = request.query_params.get('file_name')
+        elif request.FILES.get('file'):
+            upload = request.FILES['file']
+            chunks = upload.chunks(import_jobs.UPLOAD_CHUNK_SIZE)
+            file_name = upload.name
+        else:
+            return Response(
+                {'error': 'Expected a CSV file upload or a text/csv request body'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            chunk_size = min(max(int(request.query_params.get('chunk_size', csv_import.DEFAULT_CHUNK_SIZE)), 1), 5000)
+            job = import_jobs.create_job(
+                chunks,
+                file_name=file_name,
+                chunk_size=chunk_size,
+                isolate_errors=request.query_params.get('mode') == 'isolated'
+            )
+        except ParseError as e:
+            return Response({'error': str(e.detail)}, status=e.status_code)
+        except Exception as e:
+            return Response(
+                {'error': f'Failed to queue import: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        
+        log_audit_event(
+            action='import',
+            object_type='ImportJob',
+            object_id=str(job.id),
+            object_name=f'Background CSV import {file_name or ""}'.strip(),
+            request=request,
+            details={'chunk_size': chunk_size, 'isolate_errors': job.isolate_errors}
+        )
+        
+        return Response(ImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """
+        Cancel a queued or running import. Chunks already committed stay imported.
+        """
+        job = self.get_object()
+        if not import_jobs.request_cancel(job):
+            return Response(
+                {'error': f'Import job {job.id} has already finished'},
+                status=status.HTTP_409_CONFLICT
+            )
+        job.refresh_from_db()
+        return Response(ImportJobSerializer(job).data)
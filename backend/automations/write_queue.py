@@ -0,0 +1,170 @@
+"""
+Optional write coalescing for the shared SQLite database.
+
+Every small write (a create, an update, an audit row) normally commits on its
+own, and the gunicorn and uvicorn workers queue up for the one write lock.
+With WRITE_QUEUE['ENABLED'], writes are handed to a single writer thread per
+process instead. It runs whatever has queued up, up to MAX_BATCH writes after
+waiting at most MAX_DELAY seconds for more, in one transaction with a
+savepoint around each write, and acknowledges each caller once that
+transaction has committed. Audit rows are queued without waiting for the
+acknowledgement.
+
+When the queue is disabled (the default), writes run inline in the caller.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import connection, transaction
+
+
+DEFAULT_SETTINGS = {
+    'ENABLED': False,
+    'MAX_BATCH': 200,
+    'MAX_DELAY': 0.002,
+}
+
+
+def get_config():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'WRITE_QUEUE', {})}
+
+
+class WriteQueue:
+    """
+    Runs submitted write callables in a dedicated thread, many per transaction.
+    """
+
+    def __init__(self, max_batch=DEFAULT_SETTINGS['MAX_BATCH'], max_delay=DEFAULT_SETTINGS['MAX_DELAY']):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.transactions = 0  # Committed batches
+        self.writes = 0        # Writes in them
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queue func(*args, **kwargs) to run in the writer thread.
+
+        Returns:
+            Future: Resolved with func's result (or exception) once its
+            transaction has committed
+        """
+        future = Future()
+        if self.in_writer():
+            # A write queued from another write can't wait for its own batch
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        self._ensure_thread()
+        self.queue.put((future, func, args, kwargs))
+        return future
+
+    def in_writer(self):
+        return threading.current_thread() is self.thread
+
+    def _ensure_thread(self):
+        # Also restarts the writer in a forked child, where it doesn't exist
+        if self.thread is not None and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+                self.thread.start()
+
+    def _next_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._write(batch)
+            except Exception as e:
+                print(f"Write queue batch failed: {e}")
+
+    def _write(self, batch):
+        outcomes = []
+        try:
+            with transaction.atomic():
+                for future, func, args, kwargs in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        # A failing write only rolls back its own savepoint
+                        with transaction.atomic():
+                            outcomes.append((future, func(*args, **kwargs), None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+        except Exception as e:
+            # The transaction itself failed, so none of the writes are stored
+            for future, func, args, kwargs in batch:
+                if not future.done():
+                    future.set_exception(e)
+            connection.close()
+            return
+
+        self.transactions += 1
+        self.writes += len(outcomes)
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue():
+    """The process-wide WriteQueue, or None when WRITE_QUEUE is disabled."""
+    global _write_queue
+    config = get_config()
+    if not config['ENABLED']:
+        return None
+    if _write_queue is None:
+        with _write_queue_lock:
+            if _write_queue is None:
+                _write_queue = WriteQueue(config['MAX_BATCH'], config['MAX_DELAY'])
+    return _write_queue
+
+
+def run_write(func, *args, **kwargs):
+    """Run a write through the queue and wait for its commit, or inline when disabled."""
+    write_queue = get_write_queue()
+    if write_queue is None:
+        return func(*args, **kwargs)
+    return write_queue.submit(func, *args, **kwargs).result()
+
+
+def queue_write(func, *args, **kwargs):
+    """
+    Queue a write without waiting for it, or run it inline when disabled.
+    Errors are printed, as nobody is waiting for them.
+    """
+    write_queue = get_write_queue()
+    if write_queue is None:
+        return func(*args, **kwargs)
+    future = write_queue.submit(func, *args, **kwargs)
+    future.add_done_callback(_print_error)
+    return None
+
+
+def _print_error(future):
+    if future.exception() is not None:
+        print(f"Queued write failed: {future.exception()}")
@@ -0,0 +1,181 @@
+"""
+Minimal streaming XLSX writer.
+
+The workbook's XML parts are written straight into a zip stream as rows
+arrive, without building a workbook object in memory. Short strings go into
+the shared strings table (which Excel expects for repeated values), up to a
+cap. Longer strings and anything past the cap are written inline, so memory
+stays bounded however many rows are written.
+"""
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+
+MAX_SHARED_STRINGS = 50000     # Distinct values kept in the shared strings table
+MAX_SHARED_STRING_LENGTH = 100  # Longer values are almost always unique; write them inline
+MAX_CELL_LENGTH = 32767         # Excel's limit for a cell
+ROWS_PER_WRITE = 500
+
+_ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+CONTENT_TYPES = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>
+</Types>'''
+
+ROOT_RELS = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>'''
+
+WORKBOOK = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="{sheet_name}" sheetId="1" r:id="rId1"/></sheets>
+</workbook>'''
+
+WORKBOOK_RELS = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="sharedStrings.xml"/>
+<Relationship Id="rId3" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>'''
+
+# Style 0 is the default, style 1 is the bold header
+STYLES = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>
+<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>
+<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/><xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>
+</styleSheet>'''
+
+SHEET_START = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/></sheetView></sheetViews>
+<sheetData>'''
+
+SHEET_END = '</sheetData></worksheet>'
+
+
+def column_letter(index):
+    """0 -> 'A', 25 -> 'Z', 26 -> 'AA'."""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _clean(value):
+    return escape(_ILLEGAL_XML_CHARS.sub('', value[:MAX_CELL_LENGTH]))
+
+
+class _StreamBuffer:
+    """Write-only file object zipfile can stream into; drained after every write batch."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class _SharedStrings:
+    def __init__(self):
+        self.index = {}
+        self.count = 0
+
+    def get(self, value):
+        """Shared string index for a value, or None if it should be written inline."""
+        self.count += 1
+        position = self.index.get(value)
+        if position is None and len(value) <= MAX_SHARED_STRING_LENGTH and len(self.index) < MAX_SHARED_STRINGS:
+            position = self.index[value] = len(self.index)
+        if position is None:
+            self.count -= 1
+        return position
+
+    def xml(self):
+        items = ''.join(f'<si><t xml:space="preserve">{_clean(value)}</t></si>' for value in self.index)
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" count="{self.count}" uniqueCount="{len(self.index)}">'
+            f'{items}</sst>'
+        )
+
+
+def iter_xlsx(headers, rows, numeric_columns=(), sheet_name='Sheet1'):
+    """
+    Yield an XLSX workbook as byte chunks.
+
+    Args:
+        headers: Header row values, written in bold with the row frozen
+        rows: Iterable of lists of strings ('' leaves the cell empty)
+        numeric_columns: Column indexes whose values are written as numbers
+        sheet_name: Worksheet name
+    """
+    letters = [column_letter(i) for i in range(len(headers))]
+    numeric_columns = set(numeric_columns)
+    shared = _SharedStrings()
+
+    def row_xml(row_number, values, style=''):
+        cells = []
+        for col, value in enumerate(values):
+            if value == '' or value is None:
+                continue
+            ref = f'{letters[col]}{row_number}'
+            if col in numeric_columns:
+                try:
+                    float(value)
+                    cells.append(f'<c r="{ref}"{style}><v>{value}</v></c>')
+                    continue
+                except ValueError:
+                    pass
+            position = shared.get(value)
+            if position is not None:
+                cells.append(f'<c r="{ref}"{style} t="s"><v>{position}</v></c>')
+            else:
+                cells.append(f'<c r="{ref}"{style} t="inlineStr"><is><t xml:space="preserve">{_clean(value)}</t></is></c>')
+        return f'<row r="{row_number}">{"".join(cells)}</row>'
+
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', CONTENT_TYPES)
+        zf.writestr('_rels/.rels', ROOT_RELS)
+        zf.writestr('xl/workbook.xml', WORKBOOK.format(sheet_name=escape(sheet_name, {'"': '&quot;'})))
+        zf.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS)
+        zf.writestr('xl/styles.xml', STYLES)
+        yield buffer.drain()
+
+        with zf.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            parts = [SHEET_START, row_xml(1, headers, ' s="1"')]
+            row_number = 1
+            for values in rows:
+                row_number += 1
+                parts.append(row_xml(row_number, values))
+                if len(parts) >= ROWS_PER_WRITE:
+                    sheet.write(''.join(parts).encode('utf-8'))
+                    parts = []
+                    yield buffer.drain()
+            parts.append(SHEET_END)
+            sheet.write(''.join(parts).encode('utf-8'))
+
+        zf.writestr('xl/sharedStrings.xml', shared.xml())
+    yield buffer.drain()
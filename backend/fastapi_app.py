@@ -1,14 +1,24 @@
 """
 FastAPI integration for Django models.
 This provides a FastAPI interface that can coexist with Django.
+
+The Django ORM can't be used from the event loop, so endpoints that only
+touch the database are plain functions (run on FastAPI's thread pool), and
+those that stream the request body hand their database work to the thread
+pool with `run_in_threadpool`.
 """
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from decimal import Decimal
+import codecs
+import hashlib
 import os
 import django
 from django.conf import settings
@@ -17,7 +27,15 @@ from django.conf import settings
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'automation_db.settings')
 django.setup()
 
-from automations.models import Automation, Tool, Person, AutomationPersonRole, Environment, TestData, Metrics, Artifacts
+from automations.models import Automation, Tool, AutomationPersonRole, Environment, TestData, Metrics, Artifacts
+from automations.duplicates import index_automations, TEXT_FIELDS as DUPLICATE_TEXT_FIELDS
+from automations.bulk import BATCH_SIZE, NameCache, resolve_people, update_automation as apply_update
+from automations.json_stream import NDJSON_MEDIA_TYPE, decoder_for
+from automations.decompression import StreamDecompressor, is_compressed
+from automations.write_queue import run_write
+from automations import idempotency
+from rest_framework.exceptions import ParseError
+from django.db import transaction
 
 # FastAPI app
 app = FastAPI(
@@ -109,6 +127,14 @@ class AutomationUpdate(BaseModel):
     documentation: Optional[str] = None
     modified: Optional[datetime] = None
     path: Optional[str] = None
+    # Nested data; when sent, replaces the related rows (only differences are written)
+    people: Optional[List[PersonModel]] = None
+    environments: Optional[List[EnvironmentModel]] = None
+    test_data: Optional[TestDataModel] = None
+    metrics: Optional[MetricsModel] = None
+    artifacts: Optional[ArtifactsModel] = None
+
+NESTED_UPDATE_FIELDS = ['people', 'environments', 'test_data', 'metrics', 'artifacts']
 
 class AutomationResponse(AutomationBase):
     created_at: datetime
@@ -194,27 +220,57 @@ def automation_to_dict(automation: Automation) -> dict:
         'artifacts': artifacts,
     }
 
-def create_related_data(automation: Automation, data: AutomationCreate):
+# Map display role to database role
+ROLE_MAPPING = {
+    'Project Manager': 'project_manager',
+    'Project Designer': 'project_designer',
+    'Developer': 'developer',
+    'Tester': 'tester',
+    'Business SPOC': 'business_spoc',
+    'Business Stakeholder': 'business_stakeholder',
+    'Applications-App Owner': 'app_owner',
+}
+
+def db_role(role: str) -> str:
+    return ROLE_MAPPING.get(role, role.lower().replace(' ', '_'))
+
+def nested_update_data(data: AutomationUpdate) -> dict:
+    """Nested fields that were sent, in the Django serializers' *_data format"""
+    sent = data.dict(include=set(NESTED_UPDATE_FIELDS), exclude_unset=True)
+    nested = {}
+    if 'people' in sent:
+        nested['people_data'] = [
+            {'name': person['name'], 'role': db_role(person['role'])} for person in sent['people'] or []
+        ]
+    if 'environments' in sent:
+        nested['environments_data'] = [
+            {'type': env['type'].lower(), 'vdi': env.get('vdi'), 'service_account': env.get('service_account')}
+            for env in sent['environments'] or []
+        ]
+    if 'test_data' in sent:
+        nested['test_data_data'] = sent['test_data'] or {}
+    if 'metrics' in sent:
+        nested['metrics_data'] = sent['metrics'] or {}
+    if 'artifacts' in sent:
+        nested['artifacts_data'] = sent['artifacts'] or {}
+    return nested
+
+def create_related_data(automation: Automation, data: AutomationCreate, names: Optional[NameCache] = None):
     """Create related data for an automation"""
+    # Resolve every person mentioned with one query
+    people = resolve_people(
+        [person_data.name for person_data in data.people or []]
+        + [data.test_data.spoc if data.test_data else None],
+        names
+    )
+    
     # Create people roles
     if data.people:
         for person_data in data.people:
-            person, created = Person.objects.get_or_create(name=person_data.name)
-            # Map display role to database role
-            role_mapping = {
-                'Project Manager': 'project_manager',
-                'Project Designer': 'project_designer',
-                'Developer': 'developer',
-                'Tester': 'tester',
-                'Business SPOC': 'business_spoc',
-                'Business Stakeholder': 'business_stakeholder',
-                'Applications-App Owner': 'app_owner',
-            }
-            role = role_mapping.get(person_data.role, person_data.role.lower().replace(' ', '_'))
             AutomationPersonRole.objects.create(
                 automation=automation,
-                person=person,
-                role=role
+                person_id=people[person_data.name],
+                role=db_role(person_data.role)
             )
     
     # Create environments
@@ -229,8 +285,7 @@ def create_related_data(automation: Automation, data: AutomationCreate):
     
     # Create test data
     if data.test_data and data.test_data.spoc:
-        spoc, created = Person.objects.get_or_create(name=data.test_data.spoc)
-        TestData.objects.create(automation=automation, spoc=spoc)
+        TestData.objects.create(automation=automation, spoc_id=people[data.test_data.spoc])
     
     # Create metrics
     if data.metrics and any([data.metrics.post_prod_total_cases, data.metrics.post_prod_sys_ex_count, data.metrics.post_prod_success_rate]):
@@ -258,7 +313,7 @@ async def root():
     return {"message": "Automation Database FastAPI"}
 
 @app.get("/api/automations/", response_model=List[AutomationResponse])
-async def get_automations(search: Optional[str] = None):
+def get_automations(search: Optional[str] = None):
     """Get all automations with optional search"""
     try:
         queryset = Automation.objects.select_related('tool', 'modified_by').prefetch_related(
@@ -286,7 +341,7 @@ async def get_automations(search: Optional[str] = None):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/automations/{air_id}/", response_model=AutomationResponse)
-async def get_automation(air_id: str):
+def get_automation(air_id: str):
     """Get a specific automation by AIR ID"""
     try:
         automation = Automation.objects.select_related('tool', 'modified_by').prefetch_related(
@@ -302,20 +357,116 @@ async def get_automation(air_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+class HashedBody:
+    """
+    SHA-256 of a request body, updated as the endpoint reads it by wrapping
+    the request's ASGI receive channel; `drain` hashes what it left unread.
+    """
+    def __init__(self, request: Request):
+        if hasattr(request, '_body'):
+            # Already read in full to parse a pydantic body parameter
+            self.digest = hashlib.sha256(request._body)
+            self.complete = True
+            return
+        self.digest = hashlib.sha256()
+        self.complete = False
+        self.receive = request._receive
+        request._receive = self
+    
+    async def __call__(self):
+        message = await self.receive()
+        if message['type'] == 'http.request':
+            self.digest.update(message.get('body', b''))
+            self.complete = not message.get('more_body', False)
+        elif message['type'] == 'http.disconnect':
+            self.complete = True
+        return message
+    
+    async def drain(self):
+        while not self.complete:
+            await self()
+    
+    def hexdigest(self):
+        return self.digest.hexdigest()
+
+async def run_idempotent(request: Request, handler, response_model=None):
+    """
+    Run an endpoint's handler coroutine function, honouring an Idempotency-Key
+    header (see automations/idempotency.py): the first response is stored and
+    returned again for retries with the same key. Pass the endpoint's
+    response_model so the stored response is serialized the same way. The
+    handler must keep its own ORM calls off the event loop.
+    """
+    key = request.headers.get(idempotency.HEADER)
+    if key is None:
+        return await handler()
+    
+    fingerprint = idempotency.request_fingerprint(
+        request.method,
+        request.url.path,
+        request.url.query,
+        request.headers.get('content-type', ''),
+        request.headers.get('content-length', ''),
+        request.headers.get('content-encoding', '')
+    )
+    body = HashedBody(request)
+    try:
+        record, replay = await run_in_threadpool(
+            idempotency.begin, key, f"{request.method} {request.url.path}", fingerprint
+        )
+        if replay is not None:
+            await body.drain()
+            idempotency.check_body(replay, body.hexdigest())
+    except idempotency.IdempotencyError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    if replay is not None:
+        status_code, data = idempotency.stored_response(replay)
+        return JSONResponse(data, status_code=status_code, headers={idempotency.REPLAYED_HEADER: 'true'})
+    
+    try:
+        result = await handler()
+    except HTTPException as e:
+        if idempotency.should_store(e.status_code):
+            await body.drain()
+        await run_in_threadpool(
+            idempotency.complete, record, e.status_code, {"detail": jsonable_encoder(e.detail)}, body.hexdigest()
+        )
+        raise
+    except BaseException:
+        await run_in_threadpool(idempotency.release, record)
+        raise
+    if response_model is not None:
+        data = response_model.model_validate(result).model_dump(mode='json')
+    else:
+        data = jsonable_encoder(result)
+    await body.drain()
+    await run_in_threadpool(idempotency.complete, record, 200, data, body.hexdigest())
+    return result
+
 @app.post("/api/automations/", response_model=AutomationResponse)
-async def create_automation(automation: AutomationCreate):
-    """Create a new automation"""
+async def create_automation(automation: AutomationCreate, request: Request):
+    """Create a new automation; send an Idempotency-Key header to make retries safe"""
+    return await run_idempotent(
+        request, lambda: run_in_threadpool(create_new_automation, automation), AutomationResponse
+    )
+
+def create_new_automation(automation: AutomationCreate):
     try:
         # Check if automation already exists
         if Automation.objects.filter(air_id=automation.air_id).exists():
             raise HTTPException(status_code=400, detail="Automation with this AIR ID already exists")
         
-        # Create base automation data
-        automation_data = automation.dict(exclude={'people', 'environments', 'test_data', 'metrics', 'artifacts'})
-        new_automation = Automation.objects.create(**automation_data)
+        def write():
+            # Create base automation data
+            automation_data = automation.dict(exclude={'people', 'environments', 'test_data', 'metrics', 'artifacts'})
+            new_automation = Automation.objects.create(**automation_data)
+            
+            # Create related data
+            create_related_data(new_automation, automation)
+            return new_automation
         
-        # Create related data
-        create_related_data(new_automation, automation)
+        new_automation = run_write(write)
+        index_automations([new_automation.air_id])
         
         # Fetch the created automation with all related data
         created_automation = Automation.objects.select_related('tool', 'modified_by').prefetch_related(
@@ -333,17 +484,19 @@ async def create_automation(automation: AutomationCreate):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/api/automations/{air_id}/", response_model=AutomationResponse)
-async def update_automation(air_id: str, automation: AutomationUpdate):
+def update_automation(air_id: str, automation: AutomationUpdate):
     """Update an existing automation"""
     try:
         existing_automation = Automation.objects.get(air_id=air_id)
         
-        # Update fields
-        update_data = automation.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(existing_automation, field, value)
+        def write():
+            # Update fields, writing only what changed
+            update_data = automation.dict(exclude_unset=True, exclude=set(NESTED_UPDATE_FIELDS))
+            return apply_update(existing_automation, update_data, nested_update_data(automation))
         
-        existing_automation.save()
+        changed = run_write(write)
+        if set(changed) & set(DUPLICATE_TEXT_FIELDS):
+            index_automations([air_id])
         
         # Fetch updated automation with all related data
         updated_automation = Automation.objects.select_related('tool', 'modified_by').prefetch_related(
@@ -361,57 +514,144 @@ async def update_automation(air_id: str, automation: AutomationUpdate):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.patch("/api/automations/{air_id}/", response_model=AutomationResponse)
-async def patch_automation(air_id: str, automation: AutomationUpdate):
+def patch_automation(air_id: str, automation: AutomationUpdate):
     """Partially update an existing automation"""
-    return await update_automation(air_id, automation)
+    return update_automation(air_id, automation)
 
 @app.delete("/api/automations/{air_id}/")
-async def delete_automation(air_id: str):
+def delete_automation(air_id: str):
     """Delete an automation"""
     try:
         automation = Automation.objects.get(air_id=air_id)
-        automation.delete()
+        run_write(automation.delete)
         return {"message": f"Automation {air_id} deleted successfully"}
     except Automation.DoesNotExist:
         raise HTTPException(status_code=404, detail="Automation not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/automations/bulk/")
-async def bulk_create_automations(automations: List[AutomationCreate]):
-    """Create multiple automations at once"""
-    try:
-        created_automations = []
+async def iter_request_body(request: Request):
+    """Yield the request body as it arrives, decompressed if it has a Content-Encoding"""
+    content_encoding = request.headers.get('content-encoding')
+    if not is_compressed(content_encoding):
+        async for chunk in request.stream():
+            yield chunk
+        return
+    decompressor = StreamDecompressor(content_encoding)
+    async for chunk in request.stream():
+        for piece in decompressor.feed(chunk):
+            yield piece
+    decompressor.finish()
+
+async def iter_request_rows(request: Request):
+    """Yield the elements of a JSON array or NDJSON request body as they arrive"""
+    decoder = decoder_for(request.headers.get('content-type'))
+    text = codecs.getincrementaldecoder('utf-8')()
+    async for chunk in iter_request_body(request):
+        for element in decoder.feed(text.decode(chunk)):
+            yield element
+    for element in decoder.feed(text.decode(b'', final=True), final=True):
+        yield element
+
+def create_automation_batch(automations: List[AutomationCreate], names: NameCache) -> List[dict]:
+    """
+    Create a batch of automations in one transaction, skipping AIR IDs that
+    already exist. Returns {air_id, status} per row, status being 'created'
+    or 'exists'.
+    """
+    existing = set(Automation.objects.filter(
+        air_id__in=[automation.air_id for automation in automations]
+    ).values_list('air_id', flat=True))
+    
+    created = []
+    statuses = []
+    with transaction.atomic():
         for automation_data in automations:
-            # Check if automation already exists
-            if not Automation.objects.filter(air_id=automation_data.air_id).exists():
-                # Create base automation
-                base_data = automation_data.dict(exclude={'people', 'environments', 'test_data', 'metrics', 'artifacts'})
-                new_automation = Automation.objects.create(**base_data)
-                
-                # Create related data
-                create_related_data(new_automation, automation_data)
-                
-                # Fetch created automation with related data
-                created_automation = Automation.objects.select_related('tool', 'modified_by').prefetch_related(
-                    'people_roles__person',
-                    'environments', 
-                    'test_data__spoc',
-                    'metrics',
-                    'artifacts'
-                ).get(air_id=new_automation.air_id)
-                
-                created_automations.append(automation_to_dict(created_automation))
+            if automation_data.air_id in existing:
+                statuses.append({"air_id": automation_data.air_id, "status": "exists"})
+                continue
+            existing.add(automation_data.air_id)
+            
+            # Create base automation
+            base_data = automation_data.dict(exclude={'people', 'environments', 'test_data', 'metrics', 'artifacts'})
+            new_automation = Automation.objects.create(**base_data)
+            
+            # Create related data
+            create_related_data(new_automation, automation_data, names)
+            created.append(new_automation.air_id)
+            statuses.append({"air_id": new_automation.air_id, "status": "created"})
+    index_automations(created)
+    return statuses
+
+BULK_CREATE_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {"type": "array", "items": {"$ref": "#/components/schemas/AutomationCreate"}}
+            },
+            NDJSON_MEDIA_TYPE: {"schema": {"$ref": "#/components/schemas/AutomationCreate"}},
+        },
+    }
+}
+
+@app.post("/api/automations/bulk/", openapi_extra=BULK_CREATE_BODY)
+async def bulk_create_automations(request: Request):
+    """
+    Create multiple automations at once. The body is a JSON array or NDJSON,
+    optionally with `Content-Encoding: gzip` (or zstd); it is parsed as it
+    arrives and written BATCH_SIZE rows per transaction, so batches before
+    an invalid row stay committed. Send an Idempotency-Key header so that a
+    retry gets the first response instead of writing again.
+    
+    Responds with a compact {air_id, status} per row rather than the created
+    automations, so memory use stays bounded for large bodies.
+    """
+    return await run_idempotent(request, lambda: create_automations_from_body(request))
+
+async def create_automations_from_body(request: Request):
+    try:
+        rows = []
+        created = 0
+        names = NameCache()
+        batch = []
+        index = 0
+        async for item in iter_request_rows(request):
+            try:
+                batch.append(AutomationCreate.model_validate(item))
+            except ValidationError as e:
+                raise HTTPException(status_code=422, detail={
+                    "index": index,
+                    "errors": e.errors(include_url=False, include_context=False),
+                    "created": created,
+                })
+            index += 1
+            if len(batch) == BATCH_SIZE:
+                statuses = await run_in_threadpool(create_automation_batch, batch, names)
+                rows += statuses
+                created += sum(1 for row in statuses if row["status"] == "created")
+                batch = []
+        if batch:
+            statuses = await run_in_threadpool(create_automation_batch, batch, names)
+            rows += statuses
+            created += sum(1 for row in statuses if row["status"] == "created")
         
         return {
-            "message": f"Created {len(created_automations)} automations",
-            "created": created_automations
+            "message": f"Created {created} automations",
+            "created": created,
+            "rows": rows
         }
+    except HTTPException:
+        raise
+    except ParseError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e.detail))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid request body: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/automations/bulk/")
-async def bulk_delete_automations(air_ids: List[str]):
+def bulk_delete_automations(air_ids: List[str]):
     """Delete multiple automations at once"""
     try:
         deleted_count = Automation.objects.filter(air_id__in=air_ids).delete()[0]
@@ -10,21 +10,15 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'automation_db.settings')
 django.setup()
 
-from automations.models import Automation, Person, Tool, AutomationPersonRole, Environment, TestData, Metrics, Artifacts
+from django.core.management import call_command
+from automations.models import Automation
 
 def main():
     print(f"Before clearing - Automations count: {Automation.objects.count()}")
-    
-    # Clear all data
-    AutomationPersonRole.objects.all().delete()
-    Environment.objects.all().delete()
-    TestData.objects.all().delete()
-    Metrics.objects.all().delete()
-    Artifacts.objects.all().delete()
-    Automation.objects.all().delete()
-    Person.objects.all().delete()
-    Tool.objects.all().delete()
-    
+
+    # Clear all data (automations, related rows, people, tools and the search index)
+    call_command('reset_automation_data', interactive=False)
+
     print(f"After clearing - Automations count: {Automation.objects.count()}")
     print("Database cleared successfully!")
 
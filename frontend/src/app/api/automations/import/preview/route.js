@@ -0,0 +1,25 @@
+// Import dry-run API route that proxies to Django backend
+const BACKEND_URL = process.env.BACKEND_URL || 'http://localhost:8000';
+
+export async function POST(request) {
+  try {
+    const { searchParams } = new URL(request.url);
+    const rows = await request.json();
+    
+    const response = await fetch(`${BACKEND_URL}/api/automations/import/preview/?${searchParams}`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(rows),
+    });
+    
+    const data = await response.json();
+    return Response.json(data, { status: response.status });
+  } catch (error) {
+    console.error('Import preview API error:', error);
+    return Response.json({ 
+      error: `Failed to preview import: ${error.message}` 
+    }, { status: 500 });
+  }
+}
@@ -17,10 +17,13 @@ export async function POST(request) {
     const automationData = await request.json();
     console.log('Received automation data:', automationData);
     
+    // Pass the client's Idempotency-Key through so retried creates aren't duplicated
+    const idempotencyKey = request.headers.get('Idempotency-Key');
     const response = await fetch(`${BACKEND_URL}/api/automations/`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
+        ...(idempotencyKey && { 'Idempotency-Key': idempotencyKey }),
       },
       body: JSON.stringify(automationData),
     });
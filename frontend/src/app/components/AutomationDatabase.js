@@ -1876,7 +1876,6 @@ export default function AutomationDatabase() {
         isOpen={isImportModalOpen}
         onClose={() => setIsImportModalOpen(false)}
         onImport={fetchAutomations}
-        existingAutomations={automations}
       />
       </div>
     </div>
@@ -5,7 +5,7 @@ import { XMarkIcon, DocumentArrowUpIcon, CheckCircleIcon, ExclamationTriangleIco
 import * as XLSX from 'xlsx';
 import Papa from 'papaparse';
 
-export default function ImportModal({ isOpen, onClose, onImport, existingAutomations = [] }) {
+export default function ImportModal({ isOpen, onClose, onImport }) {
   const [selectedFile, setSelectedFile] = useState(null);
   const [fileType, setFileType] = useState(null);
   const [parsedData, setParsedData] = useState([]);
@@ -101,7 +101,7 @@ export default function ImportModal({ isOpen, onClose, onImport, existingAutomat
       }
 
       setParsedData(data);
-      analyzeSyncData(data);
+      await analyzeSyncData(data);
     } catch (error) {
       alert(`Error parsing file: ${error.message}`);
     } finally {
@@ -109,56 +109,52 @@ export default function ImportModal({ isOpen, onClose, onImport, existingAutomat
     }
   };
 
-  const analyzeSyncData = (data) => {
+  const analyzeSyncData = async (data) => {
     const newRecords = [];
     const updateRecords = [];
-    const deleteRecords = [];
     const errors = [];
-    const existingAirIds = new Set(existingAutomations.map(a => a.air_id));
-    const fileAirIds = new Set();
+    const validRows = [];
 
-    // Process file data
+    // Required fields and dates are checked here; the backend classifies the rest
     data.forEach((row, index) => {
       const validation = validateRow(row, index + 1);
       if (validation.errors.length > 0) {
         errors.push(...validation.errors);
         return;
       }
+      validRows.push({ rowNumber: index + 1, record: validation.data });
+    });
 
-      const cleanedRow = validation.data;
-      fileAirIds.add(cleanedRow.air_id);
-
-      if (existingAirIds.has(cleanedRow.air_id)) {
-        const existingRecord = existingAutomations.find(a => a.air_id === cleanedRow.air_id);
-        const hasChanges = hasRecordChanges(cleanedRow, existingRecord);
-        
-        if (hasChanges) {
-          updateRecords.push({
-            ...cleanedRow,
-            existingData: existingRecord
-          });
-        }
-      } else {
-        newRecords.push(cleanedRow);
-      }
+    // Dry run against the database, so the existing records never have to be downloaded
+    const response = await fetch('/api/automations/import/preview?missing=all', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(validRows.map(({ record }) => transformDataForAPI(record))),
     });
+    const preview = await response.json();
+    if (!response.ok) {
+      throw new Error(preview.error || 'Import preview failed');
+    }
 
-    // Find records to delete (exist in DB but not in file)
-    existingAutomations.forEach(existing => {
-      if (!fileAirIds.has(existing.air_id)) {
-        deleteRecords.push(existing);
+    preview.rows.forEach(result => {
+      const { rowNumber, record } = validRows[result.index];
+      if (result.status === 'new') {
+        newRecords.push(record);
+      } else if (result.status === 'changed') {
+        updateRecords.push({ ...record, changes: result.changes });
+      } else if (result.status === 'invalid') {
+        Object.entries(result.errors).forEach(([field, messages]) => {
+          errors.push(`Row ${rowNumber}: ${field}: ${[].concat(messages).map(m => typeof m === 'object' ? JSON.stringify(m) : m).join(' ')}`);
+        });
       }
     });
 
-    setSyncPreview({ newRecords, updateRecords, deleteRecords, errors });
-  };
+    // Records that exist in the database but not in the file
+    const deleteRecords = preview.missing;
 
-  const hasRecordChanges = (newData, existingData) => {
-    return templateHeaders.some(field => {
-      const newValue = newData[field] || null;
-      const existingValue = existingData[field] || null;
-      return newValue !== existingValue;
-    });
+    setSyncPreview({ newRecords, updateRecords, deleteRecords, errors });
   };
 
   const transformDataForAPI = (csvData) => {